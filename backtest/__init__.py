@@ -1,3 +1,3 @@
 from .backtest_config import BacktestConfig
-from .backtesting import Backtesting
+from .backtesting import Backtesting, BatchBacktesting, ExcursionIndex, StreamingBacktesting
 from .portfolio import Portfolio
\ No newline at end of file
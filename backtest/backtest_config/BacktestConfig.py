@@ -7,6 +7,8 @@ class BacktestConfig:
         - position_size: Position size as a percentage of the total equity
         - margin: Margin requirement as a percentage of the total equity
         - min_signals: Minimum number of signals required to place a trade
+        - lazy_indicators: Only compute the indicators the strategies read
+        - indicator_backend: 'ta' library or 'numpy' kernels of utils.indicators
     """
     def __init__(self, 
                  initial_balance: float=10000.0, 
@@ -22,11 +24,14 @@ class BacktestConfig:
                  mode: ['one_way','hedged']= 'one_way',
                  side: ['long', 'short'] = None,
                  timeout: int=30, 
+                 lazy_indicators: bool=False,
+                 indicator_backend: ['ta', 'numpy'] = 'ta',
                  ) -> None:
         assert 0 < position_size <= 1, f"Position size must be between 0 and 1. {position_size}"
         assert 0.2 <= margin <= 1, f"Margin must be between 0 and 1. {margin}"
         assert TP is not None and SL is not None, "TP and SL must be provided."
         assert (mode=='one_way' and side is not None) or mode=='hedged', "Side must be provided for One"
+        assert indicator_backend in ['ta', 'numpy'], f"Unknown indicator backend {indicator_backend}"
         
         self.initial_balance = initial_balance
         self.cost = cost
@@ -42,6 +47,8 @@ class BacktestConfig:
         self.min_signals = min_signals
         self.timeout = timeout
         self.interval = interval
+        self.lazy_indicators = lazy_indicators
+        self.indicator_backend = indicator_backend
     
     def __str__(self):
         return f"""
@@ -1,13 +1,24 @@
 import pandas as pd
 import numpy as np
-from utils import processor
+from utils import processed_bars, SessionCalendar, TickStore
+from strategy import signal_matrix, combine_signals, SignalTensor
 from abc import ABC, abstractmethod
 from tqdm import tqdm
 from typing import List, Callable
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
 import logging
 
-from ..portfolio import Portfolio
+from ..portfolio import Portfolio, Holdings
 from ..backtest_config import BacktestConfig
+from .OrderBook import OrderBook
+
+# Backtesting run by the shard workers, inherited through fork
+_shard_backtest = None
+
+
+def _run_shard(args):
+    return _shard_backtest._run_shard(*args)
 
 
 class Backtesting:
@@ -16,7 +27,8 @@ class Backtesting:
                  strategy: List[Callable], 
                  data: pd.DataFrame, 
                  config: BacktestConfig = None,
-                 search: bool = False
+                 search: bool = False,
+                 signal_tensor: SignalTensor = None
                  ):
         
         assert config is not None, "Config must be provided"
@@ -24,44 +36,90 @@ class Backtesting:
         self.data = data
         self.config = config
 
-        self.order_book = pd.DataFrame(columns=["date", "price", "signal", "timeout"])
+        # Ticks shared read-only with other backtests, the curves are kept apart
+        self.store = data if isinstance(data, TickStore) else None
+        self._curves = None
+
+        self.order_book = OrderBook()
         self.portfolio = Portfolio(config.initial_balance, config, search=search)
         
-        self.process_data = self._process_data(config.interval)
-        self.data["equity"] = config.initial_balance
-        self.data["balance"] = config.initial_balance
+        # Signals of every strategy for every bar, looked up per tick
+        if signal_tensor is not None and signal_tensor.covers(config.interval, strategy):
+            # The tensor holds the signals of the full 'ta' indicators, whose bars may differ from these
+            assert not config.lazy_indicators, "Lazy indicators can not be used with a signal tensor"
+            assert config.indicator_backend == 'ta', "A signal tensor is built with the 'ta' indicator backend"
+
+            # Only the bar times are needed, the bars are not processed
+            self._bar_times = np.asarray(signal_tensor.bar_times(config.interval))
+            self.process_data = pd.DataFrame(index=pd.DatetimeIndex(self._bar_times.view("datetime64[ns]"), name=self.data.index.name))
+            self._select_ticks(self.process_data.index)
+            self.signal_matrix = signal_tensor.matrix(config.interval, strategy)
+        else:
+            self.process_data = self._process_data(config.interval)
+            self.signal_matrix = signal_matrix(self.process_data, strategy)
+            self._bar_times = self.process_data.index.values.astype("datetime64[ns]").view(np.int64)
+        if self.store is None:
+            self.data["equity"] = config.initial_balance
+            self.data["balance"] = config.initial_balance
         
         self.prevdate = 0
         self.position_size = 1
 
     def _process_data(self, min):
-        """Preprocess and resample data."""
-        interval = f"{min}T"
-        ohlcv = self.data.resample(interval).agg({
-            "price": "ohlc", 
-            "volume": "sum"
-        }).dropna()
-
-        ohlcv.columns = ohlcv.columns.droplevel(0)
-        # print(ohlcv.head())
-        logging.info(f"Resampled data to {min} minutes interval")
-        ohlcv = processor(ohlcv)
-        ohlcv = ohlcv.shift(1).dropna().astype(float)
+        """Preprocess and resample data, reusing the bars cached by earlier runs."""
+        ohlcv = processed_bars(
+            self.data, min,
+            columns=self._indicator_columns(),
+            backend=self.config.indicator_backend
+        )
 
         #print(ohlcv)
 
-        self.data = self.data.loc[ohlcv.index[20]:ohlcv.index[-1]]
+        self._select_ticks(ohlcv.index)
         return ohlcv
 
+    def _select_ticks(self, bars: pd.DatetimeIndex):
+        """Keep the ticks from the 21st bar to the last one."""
+        if self.store is not None:
+            # Only the index, the ticks are decoded from the store when the backtest runs
+            self._span = self.store.span(bars[20], bars[-1])
+            self.data = pd.DataFrame(index=self.store.index[self._span])
+        else:
+            self.data = self.data.loc[bars[20]:bars[-1]]
+
+    @property
+    def balance(self) -> pd.Series:
+        """Balance at every tick of self.data."""
+        return self._curve(0, "balance")
+
+    @property
+    def equity(self) -> pd.Series:
+        """Equity at every tick of self.data."""
+        return self._curve(1, "equity")
+
+    def _curve(self, k, name) -> pd.Series:
+        if self.store is None:
+            return self.data[name]
+        if self._curves is None:
+            return pd.Series(float(self.config.initial_balance), index=self.data.index, name=name)
+        return pd.Series(self._curves[k], index=self.data.index, name=name)
+
+    def _indicator_columns(self):
+        """Columns of processor read by the strategies, None for all of them."""
+        if not self.config.lazy_indicators:
+            return None
+        if not all(hasattr(function, "columns") for function in self.strategy):
+            return None
+        return sorted({column for function in self.strategy for column in function.columns})
+
     def place_order(self, order_price, signal, date):
         """Place a new order in the order book."""
-        order = {
-            "date": date,
-            "price": order_price,
-            "signal": signal,
-            "timeout": date + pd.Timedelta(minutes=self.config.timeout)
-        }
-        self.order_book = pd.concat([self.order_book, pd.DataFrame([order])], ignore_index=True)
+        self.order_book.add(
+            date=date,
+            price=order_price,
+            signal=signal,
+            timeout=date + pd.Timedelta(minutes=self.config.timeout)
+        )
 
     def check_orders(self, curr_price, bid_price, ask_price, date):
         """
@@ -69,42 +127,34 @@ class Backtesting:
             Buy at Ask price, exit at Bid price
             Sell at Bid price, Exit at Ask price
         """
-        to_remove = []
-        for i, row in self.order_book.iterrows():
-            if date >= row["timeout"]:
-                to_remove.append(i)
-            elif (
-                (row["signal"] == 1 and ask_price >= row["price"]) or 
-                (row["signal"] == -1 and bid_price <= row["price"])
-                ):
-                self.portfolio.add_position({
-                    "date": date,
-                    "price": curr_price,
-                    "signal": "buy" if row["signal"] == 1 else "sell",
-                    "position_size": self.position_size,
-                    "position": curr_price * self.config.margin * self.position_size,
-                    "TP": curr_price + self.config.TP if row["signal"] == 1 else curr_price - self.config.TP,
-                    "SL": curr_price - self.config.SL if row["signal"] == 1 else curr_price + self.config.SL,
-                    "close_price": np.nan,
-                    "close_time": np.nan,
-                    "pnl": np.nan
-                })
-                to_remove.append(i)
-        self.order_book.drop(to_remove, inplace=True)
+        if self.order_book.empty:
+            return
+
+        self.order_book.expire(date)
+
+        for _, _, signal, _ in self.order_book.match(bid_price, ask_price):
+            self.portfolio.add_position({
+                "date": date,
+                "price": curr_price,
+                "signal": "buy" if signal == 1 else "sell",
+                "position_size": self.position_size,
+                "position": curr_price * self.config.margin * self.position_size,
+                "TP": curr_price + self.config.TP if signal == 1 else curr_price - self.config.TP,
+                "SL": curr_price - self.config.SL if signal == 1 else curr_price + self.config.SL,
+                "close_price": np.nan,
+                "close_time": np.nan,
+                "pnl": np.nan
+            })
 
     def generate_signals(self, datetime):
         """Generate trading signals."""
-        process_data = self.process_data.loc[self.process_data.index <= datetime].tail(20)
+        if self.signal_matrix is None:
+            signals = self._scalar_signals(datetime)
+        else:
+            signals = self._matrix_signals(datetime)
 
-        if self.prevdate == process_data.index[-1]:
+        if signals is None:
             return 0
-        else:
-            self.prevdate = process_data.index[-1]
-        
-        signals = [
-            strategy(process_data)
-            for strategy in self.strategy
-        ]
 
         if np.abs(sum(signals)) < self.config.min_signals:
             return 0
@@ -121,68 +171,611 @@ class Backtesting:
         else:
             return signals
 
-    def run_backtest(self, name=''):
+    def _matrix_signals(self, datetime):
+        """Signals of the last bar at `datetime` from the precomputed signal matrix."""
+        bar = np.searchsorted(self._bar_times, datetime.value, side="right") - 1
+        bar_time = self._bar_times[bar]
+
+        if self.prevdate == bar_time:
+            return None
+        else:
+            self.prevdate = bar_time
+
+        return self.signal_matrix[bar].tolist()
+
+    def _scalar_signals(self, datetime):
+        """Signals of the last bar at `datetime`, calling each strategy on the last 20 bars."""
+        process_data = self.process_data.loc[self.process_data.index <= datetime].tail(20)
+
+        if self.prevdate == process_data.index[-1]:
+            return None
+        else:
+            self.prevdate = process_data.index[-1]
+
+        return [
+            strategy(process_data)
+            for strategy in self.strategy
+        ]
+
+    def _prepare_ticks(self, curves=True):
+        """Extract the tick data as NumPy arrays shared by the tick and event loops."""
+        if self.store is not None:
+            return self._prepare_store_ticks(curves)
+
+        data_len = len(self.data)
+        n_ticks = max(data_len - 20, 0)
+
+        # Orders and positions are checked against the bid/ask of the next tick
+        bid_prices = self.data["bid_price"].fillna(method="bfill").values
+        ask_prices = self.data["ask_price"].fillna(method="bfill").values
+
+        self._datetimes = self.data.index
+        self._tick_times = self.data.index.values.astype("datetime64[ns]").view(np.int64)
+        self._prices = self.data["price"].values[:n_ticks]
+        self._bids = bid_prices[1:n_ticks + 1]
+        self._asks = ask_prices[1:n_ticks + 1]
+
+        self.calendar = SessionCalendar(self.data.index[:n_ticks])
+        self._in_session = self.calendar.in_session
+        self._after_close = self.calendar.after_close
+
+        if curves:
+            self._balance_curve = np.empty(n_ticks)
+            self._unrealized_curve = np.empty(n_ticks)
+        return n_ticks
+
+    def _prepare_store_ticks(self, curves=True):
+        """Ticks of the window of the store decoded to float64, the times and the calendar are views."""
+        span = self._span
+        n_ticks = max(span.stop - span.start - 20, 0)
+
+        self._datetimes = self.data.index
+        self._tick_times = self.store.times[span]
+        self._prices = self.store.column("price", slice(span.start, span.start + n_ticks))
+        self._bids, self._asks = self.store.next_quotes(span, n_ticks)
+
+        self.calendar = self.store.calendar.window(span.start, span.start + n_ticks)
+        self._in_session = self.calendar.in_session
+        self._after_close = self.calendar.after_close
+
+        if curves:
+            self._balance_curve = np.empty(n_ticks)
+            self._unrealized_curve = np.empty(n_ticks)
+        return n_ticks
+
+    def _step(self, i):
+        """Process tick i, returns False once the portfolio is out of buying power."""
+        datetime = self._datetimes[i]
+        curr_price = self._prices[i]
+        bid_price = self._bids[i]
+        ask_price = self._asks[i]
+
+        if self.config.position_size != 1:
+            self.position_size = self.portfolio.position_sizing(curr_price)
+
+        if self._in_session[i]:
+            self.portfolio.check_position(curr_price, bid_price, ask_price, datetime)
+            buying_power = self.portfolio.buying_power(curr_price)
+
+            self.check_orders(curr_price=curr_price, bid_price=bid_price, ask_price=ask_price, date=datetime)
+
+            if buying_power >= 1 and len(self.portfolio.holdings) < self.config.max_pos:
+                signal = self.generate_signals(datetime)
+            else:
+                signal = 0
+
+            if signal != 0:
+                self.place_order(curr_price, signal, datetime)
+
+            if not self.portfolio.holdings.empty:
+                self.portfolio.force_liquidate(curr_price, bid_price, ask_price, datetime)
+
+        # Close all positions after 2:29 PM
+        if self._after_close[i]:
+            self.portfolio._close_all(curr_price, bid_price, ask_price, datetime)
+
+        # Store balance and equity updates for bulk assignment
+        self._balance_curve[i] = self.portfolio.balance
+        self._unrealized_curve[i] = self.portfolio._unrealized_pnl(curr_price)
+
+        if self.portfolio.holdings.empty and self.portfolio.balance < (curr_price * self.config.margin):
+            logging.info("Out of buying power")
+            return False
+
+        return True
+
+    def run_backtest(self, name='', event_driven=False, n_jobs=1, compressed=False, lean=False):
         """
             Run the backtesting simulation throught the data.
             Buy at Ask price, exit at Bid price
             Sell at Bid price, Exit at Ask price
+
+            With event_driven, the simulation jumps between the ticks where something
+            can happen instead of stepping through every tick, with the same results.
+            With compressed, runs of identical ticks are stepped once (see _tick_runs),
+            also with the same results.
+            With n_jobs > 1 in search mode, blocks of whole trading days run in
+            n_jobs processes and are merged into the result of a serial run.
+            With lean, only the trades are recorded (see _run_lean).
         """
-        # Extract data as NumPy arrays to speed up access
-        data_len = len(self.data)
-        prices = self.data["price"].values
-        bid_prices = self.data["bid_price"].fillna(method="bfill").values
-        ask_prices = self.data["ask_price"].fillna(method="bfill").values
-        datetimes = self.data.index
-        times = datetimes.time  # Extract time separately
-
-        balance_updates = []
-        equity_updates = []
-
-        with tqdm(total=data_len - 20, desc=f"{name}-Progress") as pbar:
-            for i in range(data_len - 20):
-                datetime = datetimes[i]
-                time = times[i]
-                curr_price = prices[i]
-                bid_price = bid_prices[i + 1] if i + 1 < data_len else bid_prices[i]
-                ask_price = ask_prices[i + 1] if i + 1 < data_len else ask_prices[i]
-
-                if self.config.position_size != 1:
-                    self.position_size = self.portfolio.position_sizing(curr_price)
-
-                if pd.to_datetime('09:15').time() <= time <= pd.to_datetime('14:30').time():
-                    self.portfolio.check_position(curr_price, bid_price, ask_price, datetime)
-                    buying_power = self.portfolio.buying_power(curr_price)
-                    
-                    self.check_orders(curr_price=curr_price, bid_price=bid_price, ask_price=ask_price, date=datetime)
-
-                    if buying_power >= 1 and len(self.portfolio.holdings) < self.config.max_pos:
-                        signal = self.generate_signals(datetime)
-                    else:
-                        signal = 0
-                    
-                    if signal != 0:
-                        self.place_order(curr_price, signal, datetime)
-
-                    if not self.portfolio.holdings.empty:
-                        self.portfolio.force_liquidate(curr_price, bid_price, ask_price, datetime)
-
-                # Close all positions after 2:29 PM
-                if time >= pd.to_datetime('14:29').time():
-                    self.portfolio._close_all(curr_price, bid_price, ask_price, datetime)
-
-                # Store balance and equity updates for bulk assignment
-                balance_updates.append((datetime, self.portfolio.balance))
-                equity_updates.append((datetime, self.portfolio.balance + self.portfolio._unrealized_pnl(curr_price)))
-
-                if self.portfolio.holdings.empty and self.portfolio.balance < (curr_price * self.config.margin):
-                    logging.info("Out of buying power")
-                    return
+        if lean:
+            self._run_lean(name)
+            return
 
-                pbar.update(1)
+        n_ticks = self._prepare_ticks()
+        event_driven = event_driven and self.signal_matrix is not None
+
+        completed = None
+        if n_jobs > 1 and self._shardable():
+            completed = self._run_sharded(n_ticks, n_jobs, event_driven)
+            if completed is None:
+                self._reset()
+
+        if completed is None and event_driven:
+            completed = self._run_events(n_ticks, name)
+        elif completed is None and compressed:
+            completed = self._run_compressed(n_ticks, name)
+        elif completed is None:
+            completed = self._run_ticks(n_ticks, name)
+
+        if not completed:
+            return
 
         # Apply batch updates to the DataFrame **after** the loop
-        for x in balance_updates:
-            self.data.loc[x[0]:, "balance"] = x[1]
-        
-        for x in equity_updates:
-            self.data.loc[x[0]:, "equity"] = x[1]
\ No newline at end of file
+        self._write_curves(self._balance_curve, self._balance_curve + self._unrealized_curve)
+
+    def _run_ticks(self, n_ticks, name=''):
+        """Step through every tick."""
+        with tqdm(total=n_ticks, desc=f"{name}-Progress") as pbar:
+            for i in range(n_ticks):
+                if not self._step(i):
+                    return False
+
+                pbar.update(1)
+        return True
+
+    def _required_balance(self):
+        """
+            Initial balance from which the balance never limits the trades of a search run:
+            the margin of a position on every bar after each of them lost the whole price range.
+            There is at most one order per bar.
+        """
+        n_bars = len(self.process_data)
+        low, high = self._price_range()
+        if np.isnan(high):
+            return 0.0
+
+        worst = 2 * n_bars * (high - low + self.config.slippage + 4 * self.config.cost)
+        return worst + self.config.margin * high * (n_bars + 1)
+
+    def _capital_unbound(self):
+        """
+            The balance never limits the trades: search mode with one contract per trade,
+            max_pos of at least the number of bars and at least the required balance.
+        """
+        return (
+            self.portfolio.search
+            and self.config.position_size == 1
+            and self.config.max_pos >= len(self.process_data)
+            and self.config.initial_balance >= self._required_balance()
+        )
+
+    def _check_lean(self):
+        """Lean runs skip every capital check, which needs the balance to never limit the trades."""
+        assert self.portfolio.search, "Lean mode requires search mode"
+        assert self.config.position_size == 1, f"Lean mode requires a position size of 1. {self.config.position_size}"
+
+        n_bars = len(self.process_data)
+        assert self.config.max_pos >= n_bars, f"Lean mode requires max_pos of at least {n_bars}. {self.config.max_pos}"
+
+        required = self._required_balance()
+        assert self.config.initial_balance >= required, f"Lean mode requires an initial balance of at least {required}. {self.config.initial_balance}"
+
+    def _price_range(self):
+        """Lowest and highest price, bid and ask of the ticks, NaN without any, reduced over the columns without copies."""
+        low = high = np.nan
+        for name in ["price", "bid_price", "ask_price"]:
+            if self.store is not None:
+                column_low, column_high = self.store.bounds(name, self._span)
+            else:
+                values = self.data[name].to_numpy()
+                column_low, column_high = np.fmin.reduce(values, initial=np.nan), np.fmax.reduce(values, initial=np.nan)
+            low, high = np.fmin(low, column_low), np.fmax(high, column_high)
+        return low, high
+
+    def _lean_step(self, i):
+        """Process tick i without buying power, margin calls or curves."""
+        datetime = self._datetimes[i]
+        curr_price = self._prices[i]
+        bid_price = self._bids[i]
+        ask_price = self._asks[i]
+
+        if self._in_session[i]:
+            self.portfolio.check_position(curr_price, bid_price, ask_price, datetime)
+            self.check_orders(curr_price=curr_price, bid_price=bid_price, ask_price=ask_price, date=datetime)
+
+            signal = self.generate_signals(datetime)
+            if signal != 0:
+                self.place_order(curr_price, signal, datetime)
+
+        # Close all positions after 2:29 PM
+        if self._after_close[i]:
+            self.portfolio._close_all(curr_price, bid_price, ask_price, datetime)
+
+    def _run_lean(self, name=''):
+        """
+            Trade list only run for searches, with the trades of a full run.
+            - No buying power, unrealized PnL, position sizing nor margin calls,
+              _check_lean asserts that the balance never limits the trades
+            - No balance and equity curves, self.balance and self.equity stay at the initial balance
+            - With a signal matrix, ticks without positions nor orders are skipped
+              up to the next tick with a signal
+            The trades are in portfolio.history, their statistics in trade_stats.
+        """
+        self._check_lean()
+        n_ticks = self._prepare_ticks(curves=False)
+
+        signal_ticks = None
+        if self.signal_matrix is not None:
+            self._schedule_signals(n_ticks)
+            signal_ticks = self._signal_ticks
+
+        portfolio = self.portfolio
+        with tqdm(total=n_ticks, desc=f"{name}-Progress") as pbar:
+            i = 0
+            while i < n_ticks:
+                self._lean_step(i)
+
+                j = i + 1
+                if signal_ticks is not None and portfolio.holdings.empty and self.order_book.empty:
+                    j = self._next_tick(signal_ticks, i, n_ticks)
+                pbar.update(j - i)
+                i = j
+
+    @property
+    def trade_stats(self) -> dict:
+        """Number of trades, winrate and mean PnL of the closed trades."""
+        pnl = self.portfolio._history.pnl[:len(self.portfolio._history)]
+        if len(pnl) == 0:
+            return {"trades": 0, "winrate": np.nan, "mean_pnl": np.nan}
+
+        return {
+            "trades": len(pnl),
+            "winrate": float((pnl > 0).mean()),
+            "mean_pnl": float(np.nanmean(pnl)) if not np.isnan(pnl).all() else np.nan
+        }
+
+    def _tick_runs(self, n_ticks):
+        """
+            First and last + 1 tick of the runs of identical ticks: same price,
+            same next bid/ask, same bar and same session flags.
+            Ticks of a run only differ by their timestamp, which the simulation
+            only reads to expire orders and to date the trades it makes.
+        """
+        if n_ticks == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+
+        bars = np.searchsorted(self._bar_times, self._tick_times[:n_ticks], side="right") - 1
+        keys = [self._prices, self._bids, self._asks, bars, self._in_session, self._after_close]
+        changed = np.zeros(n_ticks - 1, dtype=bool)
+        for key in keys:
+            changed |= key[1:] != key[:-1]
+
+        starts = np.flatnonzero(np.r_[True, changed])
+        return starts, np.r_[starts[1:], n_ticks]
+
+    def _state(self):
+        """Everything a step can change, besides the curves and expired orders."""
+        return (
+            len(self.portfolio.ledger), len(self.portfolio.holdings),
+            len(self.order_book), self.order_book._seq,
+            self.prevdate, self.position_size
+        )
+
+    def _run_compressed(self, n_ticks, name=''):
+        """
+            Step through the runs of identical ticks (see _tick_runs).
+            Once a tick of a run leaves the state unchanged, the remaining ticks
+            of the run would repeat it, they take its curve values instead.
+            Orders expiring inside the run could not have filled at its prices,
+            the next step drops them.
+        """
+        starts, ends = self._tick_runs(n_ticks)
+
+        with tqdm(total=n_ticks, desc=f"{name}-Progress") as pbar:
+            for start, end in zip(starts.tolist(), ends.tolist()):
+                i = start
+                while i < end:
+                    state = self._state()
+                    if not self._step(i):
+                        return False
+
+                    i += 1
+                    if i < end and self._state() == state:
+                        self._balance_curve[i:end] = self._balance_curve[i - 1]
+                        self._unrealized_curve[i:end] = self._unrealized_curve[i - 1]
+                        i = end
+
+                pbar.update(end - start)
+        return True
+
+    def _run_events(self, n_ticks, name=''):
+        """
+            Step only through the ticks where the state can change:
+            - the first in-session tick of a bar with a signal, and the following ticks
+              of that bar while the signal waits for buying power
+            - order fills and expiries
+            - TP/SL touches and margin calls of the open positions
+            - the 14:29 session close while positions are open
+            - running out of buying power
+            Curves of the ticks in between are filled in vectorized.
+        """
+        self._schedule_events(n_ticks)
+
+        with tqdm(total=n_ticks, desc=f"{name}-Progress") as pbar:
+            i = 0
+            while i < n_ticks:
+                if not self._step(i):
+                    return False
+
+                j = self._next_event(i, n_ticks)
+                pbar.update(j - i)
+                i = j
+        return True
+
+    def _schedule_signals(self, n_ticks):
+        """
+            Bar of every tick and the first in-session tick of every bar with a signal.
+            Returns the combined signal of every bar.
+        """
+        bar_signals = combine_signals(self.signal_matrix, self.config.min_signals, self.config.side)
+        self._tick_bars = np.searchsorted(self._bar_times, self._tick_times[:n_ticks], side="right") - 1
+        self._tick_signal = bar_signals[self._tick_bars] != 0
+
+        candidates = np.flatnonzero(self._in_session & self._tick_signal)
+        bars = self._tick_bars[candidates]
+        self._signal_ticks = candidates[np.r_[True, bars[1:] != bars[:-1]]] if len(candidates) else candidates
+        return bar_signals
+
+    def _reset(self):
+        """Start again from an empty portfolio and order book."""
+        self.order_book = OrderBook()
+        self.portfolio = Portfolio(self.config.initial_balance, self.config, search=self.portfolio.search)
+        self.prevdate = 0
+        self.position_size = 1
+
+    def _shardable(self):
+        """
+            Trading days are independent simulations when the balance never limits
+            the trades (see _capital_unbound), every shard starts from the initial balance.
+        """
+        return self._capital_unbound() and "fork" in multiprocessing.get_all_start_methods()
+
+    def _shard_starts(self, n_ticks, n_jobs):
+        """
+            First tick of every shard, at most n_jobs shards of similar size.
+            A shard starts on a trading day when the previous day ended flat:
+            its last tick closed every position, and the orders left from it
+            expire before the first in-session tick of the day.
+        """
+        starts = self.calendar.day_starts[1:]
+        starts = starts[starts < n_ticks]
+        if len(starts) == 0 or n_jobs <= 1:
+            return np.zeros(1, dtype=np.int64)
+
+        session_ticks = np.flatnonzero(self._in_session)
+        k = np.searchsorted(session_ticks, starts, side="left")
+        last = self._tick_times[session_ticks[np.maximum(k - 1, 0)]]
+        first = self._tick_times[session_ticks[np.minimum(k, len(session_ticks) - 1)]]
+        timeout = pd.Timedelta(minutes=self.config.timeout).value
+
+        flat = self._after_close[starts - 1]
+        expired = (k == 0) | (k == len(session_ticks)) | (first >= last + timeout)
+        starts = starts[flat & expired]
+        if len(starts) == 0:
+            return np.zeros(1, dtype=np.int64)
+
+        # Closest valid day to the start of every block of an even split of the days
+        targets = np.array([block.start for block in self.calendar.day_blocks(n_jobs)[1:]])
+        if len(targets) == 0:
+            return np.zeros(1, dtype=np.int64)
+        chosen = starts[np.abs(starts[None, :] - targets[:, None]).argmin(axis=1)]
+        return np.unique(np.r_[0, chosen]).astype(np.int64)
+
+    def _prevdate_before(self, start):
+        """
+            Bar of the last in-session tick before `start`, where the serial run
+            last generated signals since the balance never blocks them.
+        """
+        session_ticks = np.flatnonzero(self._in_session[:start])
+        if len(session_ticks) == 0:
+            return 0
+
+        bar = np.searchsorted(self._bar_times, self._tick_times[session_ticks[-1]], side="right") - 1
+        if self.signal_matrix is None:
+            return self.process_data.index[bar]
+        return self._bar_times[bar]
+
+    def _run_shard(self, start, end, prevdate, event_driven):
+        """
+            Run ticks start:end from an empty portfolio, in a shard worker.
+            Returns None when the portfolio runs out of buying power.
+        """
+        self._reset()
+        self.prevdate = prevdate
+
+        # Number of balance changes applied after each tick
+        settled = np.full(end - start, -1, dtype=np.int64)
+        i = start
+        while i < end:
+            if not self._step(i):
+                return None
+
+            settled[i - start] = len(self.portfolio.ledger)
+            i = self._next_event(i, end) if event_driven else i + 1
+
+        return (
+            self.portfolio, self.order_book, self.prevdate,
+            np.maximum.accumulate(settled), self._unrealized_curve[start:end]
+        )
+
+    def _run_sharded(self, n_ticks, n_jobs, event_driven):
+        """
+            Run blocks of trading days in a process pool and merge them in order.
+            The shards start from an empty portfolio, the balance curve is then
+            rebuilt by applying the balance changes of every shard one by one.
+            Returns None when the run cannot be sharded or a shard ran out of buying power.
+        """
+        global _shard_backtest
+
+        starts = self._shard_starts(n_ticks, n_jobs)
+        if len(starts) <= 1:
+            return None
+
+        ends = np.r_[starts[1:], n_ticks]
+        if event_driven:
+            self._schedule_events(n_ticks)
+
+        tasks = [(int(a), int(b), self._prevdate_before(a), event_driven) for a, b in zip(starts, ends)]
+        _shard_backtest = self
+        try:
+            with ProcessPoolExecutor(max_workers=len(tasks), mp_context=multiprocessing.get_context("fork")) as pool:
+                shards = list(pool.map(_run_shard, tasks))
+        finally:
+            _shard_backtest = None
+
+        if any(shard is None for shard in shards):
+            logging.info("Out of buying power in a shard, running serially")
+            return None
+
+        ledger, settled = [], []
+        portfolio = shards[-1][0]
+        history = Holdings()
+        for shard_portfolio, _, _, shard_settled, unrealized in shards:
+            settled.append(shard_settled + len(ledger))
+            ledger += shard_portfolio.ledger
+            history.merge(shard_portfolio._history)
+
+        # Balance after each change, starting from the initial balance
+        balance = self.config.initial_balance
+        path = np.empty(len(ledger) + 1)
+        path[0] = balance
+        for k, value in enumerate(ledger):
+            balance += value
+            path[k + 1] = balance
+
+        self._balance_curve[:] = path[np.concatenate(settled)]
+        self._unrealized_curve[:] = np.concatenate([shard[4] for shard in shards])
+
+        portfolio.balance = balance
+        portfolio.ledger = ledger
+        portfolio._history = history
+        portfolio._history_frame = None
+        self.portfolio = portfolio
+        self.order_book, self.prevdate = shards[-1][1], shards[-1][2]
+        return True
+
+    def _schedule_events(self, n_ticks):
+        """Ticks the event loop jumps between."""
+        self._schedule_signals(n_ticks)
+        self._session_ticks = np.flatnonzero(self._in_session)
+        self._close_ticks = np.flatnonzero(self._after_close)
+
+    def _next_tick(self, ticks, after, default):
+        """First tick of the sorted `ticks` strictly after `after`."""
+        k = np.searchsorted(ticks, after, side="right")
+        return ticks[k] if k < len(ticks) else default
+
+    def _next_event(self, i, n_ticks, chunk=256):
+        """Fill the curves of the quiet ticks after tick i and return the next event tick."""
+        portfolio = self.portfolio
+        holdings = portfolio.holdings
+
+        # Ticks where an event is known in advance
+        horizon = self._next_tick(self._signal_ticks, i, n_ticks)
+        if not holdings.empty:
+            horizon = min(horizon, self._next_tick(self._close_ticks, i, n_ticks))
+        if not self.order_book.empty:
+            first = np.searchsorted(self._tick_times, self.order_book.next_timeout().value, side="left")
+            horizon = min(horizon, self._next_tick(self._session_ticks, max(first, i + 1) - 1, n_ticks))
+
+        # The signal of the bar of tick i is still waiting for buying power
+        bar = self._tick_bars[i]
+        pending_end = i + 1
+        if self._in_session[i] and self._tick_signal[i] and self.prevdate != self._bar_times[bar]:
+            pending_end = np.searchsorted(self._tick_bars, bar, side="right")
+
+        balance = portfolio.balance
+        margin = self.config.margin
+        n_open = len(holdings)
+        buy_TP, buy_SL, sell_TP, sell_SL = portfolio.triggers.bounds()
+        buy_limit, sell_limit = self.order_book.best_prices()
+
+        start = i + 1
+        while start < horizon:
+            end = min(start + chunk, horizon)
+            prices = self._prices[start:end]
+            bids = self._bids[start:end]
+            asks = self._asks[start:end]
+            session = self._in_session[start:end]
+
+            # Unrealized PnL summed position by position as in Portfolio._unrealized_pnl
+            unrealized = np.zeros(end - start)
+            for k in range(n_open):
+                if holdings.side[k] == 1:
+                    unrealized = unrealized + (prices - holdings.price[k]) * holdings.position_size[k]
+                else:
+                    unrealized = unrealized + (holdings.price[k] - prices) * holdings.position_size[k]
+
+            if n_open:
+                touched = (bids >= buy_TP) | (bids <= buy_SL) | (asks <= sell_TP) | (asks >= sell_SL)
+                margin_call = (balance + unrealized) < margin * prices * n_open
+                event = session & (touched | margin_call)
+            else:
+                event = balance < (prices * margin)
+
+            if not self.order_book.empty:
+                event |= session & ((asks >= buy_limit) | (bids <= sell_limit))
+
+            if start < pending_end and n_open < self.config.max_pos:
+                available = (balance + unrealized) - margin * prices * n_open
+                buying_power = np.trunc(available / (prices * margin))
+                in_bar = np.arange(start, end) < pending_end
+                event |= session & in_bar & (buying_power >= 1)
+
+            hits = np.flatnonzero(event)
+            stop = start + hits[0] if len(hits) else end
+
+            self._balance_curve[start:stop] = balance
+            self._unrealized_curve[start:stop] = unrealized[:stop - start]
+
+            if len(hits):
+                return stop
+
+            start = end
+            chunk *= 2
+
+        return horizon
+
+    def _write_curves(self, balance_curve, equity_curve):
+        """Attach the recorded curves to self.data in one step."""
+        if len(balance_curve) == 0:
+            return
+
+        rows = self._curve_rows(len(balance_curve))
+        if self.store is not None:
+            self._curves = (balance_curve[rows], equity_curve[rows])
+            return
+
+        self.data["balance"] = balance_curve[rows]
+        self.data["equity"] = equity_curve[rows]
+
+    def _curve_rows(self, n_ticks):
+        """
+            Recorded tick each row of self.data takes its curve value from.
+            Each row takes the last value recorded at or before its timestamp,
+            rows after the last recorded tick carry the last value forward.
+        """
+        times = self.data.index.values
+        last = np.searchsorted(times, times, side="right") - 1
+        return np.minimum(last, n_ticks - 1)
@@ -0,0 +1,267 @@
+import pandas as pd
+import numpy as np
+from strategy import combine_signals
+from tqdm import tqdm
+from typing import List, Callable
+import logging
+
+from ..portfolio import Holdings, TriggerIndex
+from ..backtest_config import BacktestConfig
+from .Backtesting import Backtesting
+
+
+class BatchHoldings(Holdings):
+    """Holdings of several configurations, each row tagged with the index of its config."""
+    _SCHEMA = Holdings._SCHEMA + [("config", np.int64)]
+
+    def append(self, position: dict) -> int:
+        i = super().append(position)
+        self.config[i] = position["config"]
+        return i
+
+
+class BatchBacktesting(Backtesting):
+    """
+        Backtesting of several configurations in a single pass over the ticks.
+        The configurations must share the strategies, interval, min_signals, side and mode,
+        they may differ in TP, SL, position_size, max_pos, initial_balance, cost, slippage,
+        margin and timeout. The state of every configuration is held in NumPy vectors,
+        and each configuration ends with the same history and curves as its own Backtesting run.
+    """
+    SHARED = ["interval", "min_signals", "side", "mode"]
+
+    def __init__(self,
+                 strategy: List[Callable],
+                 data: pd.DataFrame,
+                 configs: List[BacktestConfig] = None,
+                 search: bool = False
+                 ):
+
+        assert configs, "Configs must be provided"
+        for field in self.SHARED:
+            assert len({getattr(config, field) for config in configs}) == 1, f"Configs must share {field}"
+
+        super().__init__(strategy=strategy, data=data, config=configs[0], search=search)
+        assert self.signal_matrix is not None, "Every strategy must have a vectorized form"
+
+        self.configs = configs
+        self.search = search
+
+        self.histories: List[pd.DataFrame] = None
+        self.balances: List[pd.Series] = None
+        self.equities: List[pd.Series] = None
+
+    def _vector(self, field, dtype=float):
+        return np.array([getattr(config, field) for config in self.configs], dtype=dtype)
+
+    def _calculate_pnl(self, rows, bid_price, ask_price):
+        """Calculate the profit or loss of the positions at `rows`."""
+        h = self.holdings
+        price = h.price[rows]
+        config = h.config[rows]
+        pnl = np.where(h.side[rows] == 1, bid_price - price, price - ask_price)
+
+        pnl -= self.slippage[config]
+        pnl -= self.cost[config] * 2
+
+        if not self.search:
+            pnl *= h.position_size[rows]
+        return pnl
+
+    def _unrealized_pnl(self, curr_price):
+        """Unrealized PnL of every configuration."""
+        unrealized = np.zeros(len(self.configs))
+        h = self.holdings
+        n = len(h)
+        if n == 0:
+            return unrealized
+
+        price = h.price[:n]
+        pnl = np.where(h.side[:n] == 1, curr_price - price, price - curr_price) * h.position_size[:n]
+        # ufunc.at adds in row order, matching the per position sum of Portfolio
+        np.add.at(unrealized, h.config[:n], pnl)
+        return unrealized
+
+    def _close(self, rows, bid_price, ask_price, date, cost=False):
+        """Close the positions at `rows`, `cost` charges the extra session close cost."""
+        h = self.holdings
+        config = h.config[rows]
+        pnl = self._calculate_pnl(rows, bid_price, ask_price)
+
+        np.add.at(self._balances, config, pnl - self.cost[config] * 2 if cost else pnl)
+        np.subtract.at(self.count, config, 1)
+
+        close_price = np.where(h.side[rows] == 1, bid_price, ask_price)
+        self.history.extend(h, rows, close_price, date, pnl)
+        self.triggers.remove(h.id[rows])
+        h.remove(rows)
+
+    def _force_liquidate(self, curr_price, bid_price, ask_price, date):
+        """Force liquidation of the configurations that do not meet margin requirements."""
+        equity = self._balances + self._unrealized_pnl(curr_price)
+        failing = np.flatnonzero((self.count > 0) & (equity < self.margin * curr_price * self.count))
+
+        for k in failing:
+            while self.count[k] > 0:
+                h = self.holdings
+                rows = np.flatnonzero(h.config[:len(h)] == k)
+
+                price = h.price[rows]
+                unrealized = np.where(h.side[rows] == 1, curr_price - price, price - curr_price) * h.position_size[rows]
+                if self._balances[k] + sum(unrealized.tolist()) >= self.margin[k] * curr_price * self.count[k]:
+                    break
+
+                pnl = self._calculate_pnl(rows, bid_price, ask_price)
+                self._close(rows[[np.argmin(pnl)]], bid_price, ask_price, date)
+
+    def run_backtest(self, name=''):
+        """
+            Run every configuration through the data in one pass.
+            Buy at Ask price, exit at Bid price
+            Sell at Bid price, Exit at Ask price
+        """
+        n = len(self.configs)
+        self.TP = self._vector("TP")
+        self.SL = self._vector("SL")
+        self.cost = self._vector("cost")
+        self.slippage = self._vector("slippage")
+        self.margin = self._vector("margin")
+        self.max_pos = self._vector("max_pos")
+        self.fraction = self._vector("position_size")
+        self.timeout = np.array([pd.Timedelta(minutes=config.timeout).value for config in self.configs], dtype=np.int64)
+        sizing = np.flatnonzero(self.fraction != 1)
+
+        self._balances = self._vector("initial_balance")
+        self.count = np.zeros(n, dtype=np.int64)
+        self.holdings = BatchHoldings()
+        self.history = BatchHoldings()
+        self.triggers = TriggerIndex()
+        position_size = np.ones(n, dtype=np.int64)
+        prevdate = np.zeros(n, dtype=np.int64)
+        active = np.ones(n, dtype=bool)
+        finished = np.ones(n, dtype=bool)
+
+        # Pending orders of every configuration, in the order they were placed
+        order_config = np.empty(0, dtype=np.int64)
+        order_price = np.empty(0)
+        order_signal = np.empty(0, dtype=np.int8)
+        order_timeout = np.empty(0, dtype=np.int64)
+
+        # Ticks as NumPy arrays, from the DataFrame or decoded from the store
+        n_ticks = self._prepare_ticks(curves=False)
+        prices, bid_prices, ask_prices = self._prices, self._bids, self._asks
+        datetimes = self._datetimes
+        tick_times = self._tick_times
+
+        bar_signals = combine_signals(self.signal_matrix, self.config.min_signals, self.config.side)
+        bars = np.searchsorted(self._bar_times, tick_times, side="right") - 1
+
+        balance_curve = np.empty((n, n_ticks))
+        equity_curve = np.empty((n, n_ticks))
+
+        with tqdm(total=n_ticks, desc=f"{name}-Progress") as pbar:
+            for i in range(n_ticks):
+                datetime = datetimes[i]
+                curr_price = prices[i]
+                bid_price = bid_prices[i]
+                ask_price = ask_prices[i]
+
+                if len(sizing):
+                    balance = self._balances[sizing]
+                    new_size = np.trunc((balance * self.fraction[sizing]) / (curr_price * self.margin[sizing]))
+                    new_size[(new_size < 1) & (balance > (curr_price * self.margin[sizing]))] = 1
+                    position_size[sizing] = new_size
+
+                if self._in_session[i]:
+                    if len(self.holdings):
+                        triggered = self.triggers.triggered(bid_price, ask_price)
+                        if len(triggered):
+                            self._close(self.holdings.locate(triggered), bid_price, ask_price, datetime)
+
+                    required_margin = self.margin * curr_price * self.count
+                    equity = self._balances + self._unrealized_pnl(curr_price)
+                    buying_power = np.trunc((equity - required_margin) / (curr_price * self.margin))
+
+                    if len(order_config):
+                        expired = order_timeout <= tick_times[i]
+                        filled = ~expired & (
+                            ((order_signal == 1) & (ask_price >= order_price)) |
+                            ((order_signal == -1) & (bid_price <= order_price))
+                        )
+                        for k, signal in zip(order_config[filled].tolist(), order_signal[filled].tolist()):
+                            size = int(position_size[k])
+                            j = self.holdings.append({
+                                "date": datetime,
+                                "price": curr_price,
+                                "signal": "buy" if signal == 1 else "sell",
+                                "position_size": size,
+                                "position": curr_price * self.margin[k] * size,
+                                "TP": curr_price + self.TP[k] if signal == 1 else curr_price - self.TP[k],
+                                "SL": curr_price - self.SL[k] if signal == 1 else curr_price + self.SL[k],
+                                "config": k
+                            })
+                            h = self.holdings
+                            self.triggers.add(h.id[j], h.side[j], h.TP[j], h.SL[j])
+                            self.count[k] += 1
+
+                        keep = ~(expired | filled)
+                        order_config, order_price = order_config[keep], order_price[keep]
+                        order_signal, order_timeout = order_signal[keep], order_timeout[keep]
+
+                    # Configurations that generate a signal on this bar
+                    bar = bars[i]
+                    generate = active & (buying_power >= 1) & (self.count < self.max_pos) & (prevdate != self._bar_times[bar])
+                    prevdate[generate] = self._bar_times[bar]
+
+                    signal = bar_signals[bar]
+                    if signal != 0 and generate.any():
+                        placed = np.flatnonzero(generate)
+                        order_config = np.concatenate([order_config, placed])
+                        order_price = np.concatenate([order_price, np.full(len(placed), curr_price)])
+                        order_signal = np.concatenate([order_signal, np.full(len(placed), signal, dtype=np.int8)])
+                        order_timeout = np.concatenate([order_timeout, tick_times[i] + self.timeout[placed]])
+
+                    if len(self.holdings):
+                        self._force_liquidate(curr_price, bid_price, ask_price, datetime)
+
+                # Close all positions after 2:29 PM
+                if self._after_close[i] and len(self.holdings):
+                    self._close(np.arange(len(self.holdings)), bid_price, ask_price, datetime, cost=True)
+
+                balance_curve[:, i] = self._balances
+                equity_curve[:, i] = self._balances + self._unrealized_pnl(curr_price)
+
+                out = active & (self.count == 0) & (self._balances < (curr_price * self.margin))
+                if out.any():
+                    logging.info(f"Out of buying power: configs {np.flatnonzero(out).tolist()}")
+                    active &= ~out
+                    finished &= ~out
+
+                    keep = active[order_config]
+                    order_config, order_price = order_config[keep], order_price[keep]
+                    order_signal, order_timeout = order_signal[keep], order_timeout[keep]
+
+                    if not active.any():
+                        break
+
+                pbar.update(1)
+
+        self._write_results(balance_curve, equity_curve, finished)
+
+    def _write_results(self, balance_curve, equity_curve, finished):
+        """Split the history per configuration and attach the curves to the data index."""
+        frame = self.history.to_frame()
+        config = self.history.config[:len(self.history)]
+        self.histories = [frame[config == k].reset_index(drop=True) for k in range(len(self.configs))]
+
+        rows = self._curve_rows(balance_curve.shape[1]) if balance_curve.shape[1] else None
+        self.balances, self.equities = [], []
+        for k, config in enumerate(self.configs):
+            # Like Backtesting, a configuration that ran out of buying power keeps its initial curves
+            if finished[k] and rows is not None:
+                balance, equity = balance_curve[k][rows], equity_curve[k][rows]
+            else:
+                balance = equity = np.full(len(self.data), config.initial_balance, dtype=float)
+
+            self.balances.append(pd.Series(balance, index=self.data.index, name="balance"))
+            self.equities.append(pd.Series(equity, index=self.data.index, name="equity"))
@@ -0,0 +1,247 @@
+import pandas as pd
+import numpy as np
+from typing import Tuple
+
+from ..portfolio import Holdings
+from .Backtesting import Backtesting
+
+
+class ExcursionIndex:
+    """
+        Favorable and adverse excursion path of every entry of a search backtest.
+        When capital never binds (see Backtesting._capital_unbound), the entries
+        (fill tick, price, side) do not depend on TP and SL. For every entry the index keeps the ticks where
+        the exit price (bid for buy, ask for sell) makes a new high or a new low
+        until the 14:29 session close. The exit of any TP/SL pair is then the first
+        record crossing its level, found with a search instead of a simulation.
+        - Records are kept in a signed price space (bid for buy, -ask for sell)
+          so that favorable records always increase
+        - max_excursion stops the records once the excursion exceeds it,
+          TP and SL looked up must not be larger
+    """
+    NO_EXIT = np.iinfo(np.int64).max
+
+    def __init__(self, bt: Backtesting, max_excursion: float = None):
+        assert bt.portfolio.search, "Excursion index requires a search backtest"
+        assert bt.signal_matrix is not None, "Every strategy must have a vectorized form"
+        assert bt.config.position_size == 1, "Excursion index requires a fixed position size"
+        assert bt._capital_unbound(), f"Excursion index requires max_pos of at least the number of bars and an initial balance of at least {bt._required_balance()}"
+
+        self.bt = bt
+        self.config = bt.config
+        self.max_excursion = np.inf if max_excursion is None else max_excursion
+
+        self.n_ticks = bt._prepare_ticks()
+        bar_signals = bt._schedule_signals(self.n_ticks)
+        self._entries(bar_signals)
+        self._excursions()
+
+    def __len__(self) -> int:
+        return len(self.tick)
+
+    def _entries(self, bar_signals):
+        """Fill tick of the order placed on every signal bar, in the order Portfolio holds them."""
+        bt = self.bt
+        placed = bt._signal_ticks
+        signal = bar_signals[bt._tick_bars[placed]]
+        limit = bt._prices[placed]
+
+        # Orders expire at the first tick at or after their timeout
+        timeout = bt._tick_times[placed] + pd.Timedelta(minutes=self.config.timeout).value
+        expiry = np.searchsorted(bt._tick_times[:self.n_ticks], timeout, side="left")
+
+        fills = np.full(len(placed), -1, dtype=np.int64)
+        for n in range(len(placed)):
+            window = slice(placed[n] + 1, expiry[n])
+            if signal[n] == 1:
+                hit = bt._asks[window] >= limit[n]
+            else:
+                hit = bt._bids[window] <= limit[n]
+
+            hit = np.flatnonzero(hit & bt._in_session[window])
+            if len(hit):
+                fills[n] = placed[n] + 1 + hit[0]
+
+        # Orders filled on the same tick are added in the order they were placed
+        filled = np.flatnonzero(fills >= 0)
+        order = filled[np.lexsort((placed[filled], fills[filled]))]
+
+        self.tick = fills[order]
+        self.side = signal[order].astype(np.int8)
+        self.price = bt._prices[self.tick]
+
+        # -1 when no session close follows the entry
+        close_ticks = np.flatnonzero(bt._after_close)
+        k = np.searchsorted(close_ticks, self.tick, side="left")
+        self.close_tick = np.append(close_ticks, -1)[k]
+
+    def _excursions(self):
+        """Record ticks of the signed exit price between every entry and its session close."""
+        bt = self.bt
+        favorable = ([], [])
+        adverse = ([], [])
+        fav_offsets = [0]
+        adv_offsets = [0]
+
+        for e in range(len(self)):
+            k, side, price = self.tick[e], self.side[e], self.price[e]
+            end = self.close_tick[e] if self.close_tick[e] >= 0 else self.n_ticks - 1
+
+            # TP and SL are only checked in session, from the tick after the fill
+            path = slice(k + 1, end + 1)
+            signed = bt._bids[path] if side == 1 else -bt._asks[path]
+            signed = np.where(bt._in_session[path], signed, np.nan)
+
+            cap = price + self.max_excursion if side == 1 else -(price - self.max_excursion)
+            self._records(signed, cap, k + 1, favorable, fav_offsets)
+            cap = -(price - self.max_excursion) if side == 1 else price + self.max_excursion
+            self._records(-signed, cap, k + 1, adverse, adv_offsets)
+
+        self._fav = self._concat(favorable, fav_offsets)
+        self._adv = self._concat(adverse, adv_offsets)
+
+    @staticmethod
+    def _records(values, cap, first_tick, store, offsets):
+        """Append the ticks where `values` makes a new high, up to the first one beyond `cap`."""
+        running = np.fmax.accumulate(values) if len(values) else values
+
+        # NaN until the first in-session tick, which must still be a record
+        previous = np.concatenate([[-np.inf], running[:-1]])
+        previous[np.isnan(previous)] = -np.inf
+        records = np.flatnonzero(running > previous)
+
+        beyond = np.flatnonzero(running[records] > cap)
+        if len(beyond):
+            records = records[:beyond[0] + 1]
+
+        store[0].append(first_tick + records)
+        store[1].append(running[records])
+        offsets.append(offsets[-1] + len(records))
+
+    @staticmethod
+    def _concat(store, offsets):
+        ticks = np.concatenate(store[0]).astype(np.int64) if store[0] else np.empty(0, dtype=np.int64)
+        values = np.concatenate(store[1]) if store[1] else np.empty(0)
+        return ticks, values, np.array(offsets, dtype=np.int64)
+
+    def _first_reached(self, records, levels) -> Tuple[np.ndarray, np.ndarray]:
+        """
+            First record of every entry reaching its levels, `levels` has one row per entry.
+            Returns the record ticks (NO_EXIT when never reached) and the record positions.
+        """
+        ticks, values, offsets = records
+        n = len(self)
+
+        # Rank the prices to search all entries at once on exact integer keys
+        ranks = np.unique(np.concatenate([values, levels.ravel()]))
+        m = len(ranks)
+        owner = np.repeat(np.arange(n, dtype=np.int64), np.diff(offsets))
+        keys = owner * m + np.searchsorted(ranks, values)
+        query = np.arange(n, dtype=np.int64)[:, None] * m + np.searchsorted(ranks, levels)
+
+        position = np.searchsorted(keys, query, side="left")
+        reached = position < offsets[1:, None]
+        position = np.minimum(position, max(len(ticks) - 1, 0))
+        first = np.where(reached, ticks[position] if len(ticks) else 0, self.NO_EXIT)
+        return first, position
+
+    def _levels(self, TP, SL):
+        """Signed TP and SL levels of every entry, one column per value."""
+        price = self.price[:, None]
+        buy = (self.side == 1)[:, None]
+        TP = np.atleast_1d(np.asarray(TP, dtype=float))[None, :]
+        SL = np.atleast_1d(np.asarray(SL, dtype=float))[None, :]
+
+        assert (TP <= self.max_excursion).all() and (SL <= self.max_excursion).all(), \
+            "TP and SL must not exceed max_excursion"
+
+        tp_levels = np.where(buy, price + TP, -(price - TP))
+        sl_levels = np.where(buy, -(price - SL), price + SL)
+        return tp_levels, sl_levels
+
+    def _exits(self, tp, sl):
+        """
+            Exit tick and price of every entry for one TP column and all SL columns.
+            Entries that are still open at the end of the data get NO_EXIT.
+        """
+        bt = self.bt
+        tp_tick, tp_pos = tp
+        sl_tick, sl_pos = sl
+        buy = (self.side == 1)[:, None]
+
+        # Exit prices of the records, and of the session close
+        tp_price = np.where(buy, 1, -1) * self._fav[1][tp_pos] if len(self._fav[1]) else np.zeros_like(tp_pos, dtype=float)
+        sl_price = np.where(buy, -1, 1) * self._adv[1][sl_pos] if len(self._adv[1]) else np.zeros_like(sl_pos, dtype=float)
+        close = np.maximum(self.close_tick, 0)
+        close_price = np.where(self.side == 1, bt._bids[close], bt._asks[close])[:, None]
+        close_tick = np.where(self.close_tick >= 0, self.close_tick, self.NO_EXIT)[:, None]
+
+        triggered = np.minimum(tp_tick, sl_tick)
+        exit_tick = np.where(triggered != self.NO_EXIT, triggered, close_tick)
+        exit_price = np.where(tp_tick < sl_tick, tp_price, np.where(sl_tick < tp_tick, sl_price, close_price))
+        return exit_tick, exit_price, triggered == self.NO_EXIT
+
+    def _pnl(self, exit_price):
+        """PnL of every entry closed at `exit_price`, as Portfolio._calculate_pnl in search mode."""
+        price = self.price[:, None]
+        pnl = np.where((self.side == 1)[:, None], exit_price - price, price - exit_price)
+        pnl -= self.config.slippage
+        pnl -= self.config.cost * 2
+        return pnl
+
+    def grid(self, TP, SL) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+            Number of trades, mean PnL and winrate of every TP × SL pair,
+            each of shape (len(TP), len(SL)).
+        """
+        TP = np.atleast_1d(np.asarray(TP, dtype=float))
+        SL = np.atleast_1d(np.asarray(SL, dtype=float))
+        tp_levels, sl_levels = self._levels(TP, SL)
+        tp = self._first_reached(self._fav, tp_levels)
+        sl = self._first_reached(self._adv, sl_levels)
+
+        count = np.zeros((len(TP), len(SL)), dtype=np.int64)
+        total = np.zeros((len(TP), len(SL)))
+        wins = np.zeros((len(TP), len(SL)), dtype=np.int64)
+
+        for a in range(len(TP)):
+            exit_tick, exit_price, _ = self._exits((tp[0][:, [a]], tp[1][:, [a]]), sl)
+            closed = exit_tick != self.NO_EXIT
+            pnl = np.where(closed, self._pnl(exit_price), 0)
+
+            count[a] = closed.sum(axis=0)
+            total[a] = pnl.sum(axis=0)
+            wins[a] = (pnl > 0).sum(axis=0)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return count, total / count, wins / count
+
+    def history(self, TP: float, SL: float) -> pd.DataFrame:
+        """Closed trades of a single TP/SL pair, laid out and ordered as Portfolio.history."""
+        tp_levels, sl_levels = self._levels(TP, SL)
+        tp = self._first_reached(self._fav, tp_levels)
+        sl = self._first_reached(self._adv, sl_levels)
+        exit_tick, exit_price, at_close = self._exits(tp, sl)
+        exit_tick, exit_price, at_close = exit_tick[:, 0], exit_price[:, 0], at_close[:, 0]
+        pnl = self._pnl(exit_price[:, None])[:, 0]
+
+        # Triggered exits come before the session close on the same tick, each in entry order
+        closed = np.flatnonzero(exit_tick != self.NO_EXIT)
+        closed = closed[np.lexsort((closed, at_close[closed], exit_tick[closed]))]
+
+        buy = self.side[closed] == 1
+        price = self.price[closed]
+        n = len(closed)
+        history = Holdings(capacity=n)
+        history.n = n
+        history.date[:n] = self.bt._tick_times[self.tick[closed]]
+        history.price[:n] = price
+        history.side[:n] = self.side[closed]
+        history.position_size[:n] = 1
+        history.position[:n] = price * self.config.margin * 1
+        history.TP[:n] = np.where(buy, price + TP, price - TP)
+        history.SL[:n] = np.where(buy, price - SL, price + SL)
+        history.close_price[:n] = exit_price[closed]
+        history.close_time[:n] = self.bt._tick_times[exit_tick[closed]]
+        history.pnl[:n] = pnl[closed]
+        return history.to_frame()
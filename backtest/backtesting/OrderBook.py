@@ -0,0 +1,81 @@
+from bisect import bisect_left, bisect_right, insort
+from heapq import heappush, heappop
+from typing import List, Tuple
+import numpy as np
+import pandas as pd
+
+
+class OrderBook:
+    """
+        Pending limit orders of the backtest.
+        - Buy orders are kept sorted by limit price, filled when ask >= price
+        - Sell orders are kept sorted by limit price, filled when bid <= price
+        - A min-heap on timeout expires stale orders without scanning the book
+        Ticks where nothing fills or expires only compare against the best prices.
+    """
+    def __init__(self):
+        self._orders = {}
+        self._buys = []
+        self._sells = []
+        self._timeouts = []
+        self._seq = 0
+
+    def __len__(self) -> int:
+        return len(self._orders)
+
+    @property
+    def empty(self) -> bool:
+        return not self._orders
+
+    def add(self, date, price, signal, timeout):
+        """Add a limit order, `signal` is 1 for buy and -1 for sell."""
+        seq = self._seq
+        self._seq += 1
+        self._orders[seq] = (date, price, signal, timeout)
+        insort(self._buys if signal == 1 else self._sells, (price, seq))
+        heappush(self._timeouts, (timeout, seq))
+
+    def expire(self, date):
+        """Drop the orders whose timeout is reached at `date`."""
+        while self._timeouts and self._timeouts[0][0] <= date:
+            _, seq = heappop(self._timeouts)
+            order = self._orders.pop(seq, None)
+
+            # Already filled
+            if order is None:
+                continue
+
+            book = self._buys if order[2] == 1 else self._sells
+            del book[bisect_left(book, (order[1], seq))]
+
+    def match(self, bid_price, ask_price) -> List[Tuple]:
+        """Remove and return the orders filled at bid/ask, in the order they were placed."""
+        filled = []
+        if self._buys and self._buys[0][0] <= ask_price:
+            k = bisect_right(self._buys, (ask_price, float("inf")))
+            filled += self._buys[:k]
+            del self._buys[:k]
+
+        if self._sells and self._sells[-1][0] >= bid_price:
+            k = bisect_left(self._sells, (bid_price, -1))
+            filled += self._sells[k:]
+            del self._sells[k:]
+
+        return [self._orders.pop(seq) for seq in sorted(seq for _, seq in filled)]
+
+    def best_prices(self) -> Tuple[float, float]:
+        """Lowest buy limit and highest sell limit, +inf / -inf when a side is empty."""
+        buy = self._buys[0][0] if self._buys else np.inf
+        sell = self._sells[-1][0] if self._sells else -np.inf
+        return buy, sell
+
+    def next_timeout(self):
+        """Earliest timeout in the heap, it may belong to an order that has already filled."""
+        return self._timeouts[0][0] if self._timeouts else None
+
+    def to_frame(self) -> pd.DataFrame:
+        """Pending orders in the order they were placed."""
+        return pd.DataFrame(
+            [self._orders[seq] for seq in sorted(self._orders)],
+            columns=["date", "price", "signal", "timeout"]
+        )
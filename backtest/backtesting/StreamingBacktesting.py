@@ -0,0 +1,293 @@
+import os
+from typing import Callable, Iterable, List
+import logging
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from utils import SessionCalendar, StreamingProcessor, RingBuffer
+
+from ..portfolio import Portfolio
+from ..backtest_config import BacktestConfig
+from .OrderBook import OrderBook
+from .Backtesting import Backtesting
+
+
+class StreamingBacktesting(Backtesting):
+    """
+        Backtesting over an iterator of tick chunks (for example one DataFrame per day)
+        instead of one DataFrame of the whole history.
+        - Bars are built and their indicators updated as the chunks arrive (utils.streaming)
+        - Only the ticks of the bar still open and a few ticks of lookahead are carried
+          from one chunk to the next, with the portfolio and the order book
+        - Balance / equity curves and closed trades are appended to CSV files in `dir`
+          after every chunk, so memory stays flat whatever the date range
+        Ticks are processed as Backtesting processes them: from the 21st bar with
+        every indicator defined, at the bid/ask of the next tick, leaving out the
+        last 20 ticks and the ticks after the start of the last bar.
+    """
+    LOOKAHEAD = 21
+
+    def __init__(self,
+                 strategy: List[Callable],
+                 chunks: Iterable[pd.DataFrame],
+                 config: BacktestConfig = None,
+                 search: bool = False,
+                 dir: str = 'streaming'
+                 ):
+
+        assert config is not None, "Config must be provided"
+        self.strategy = strategy
+        self.chunks = chunks
+        self.config = config
+        self._dir = dir
+
+        self.order_book = OrderBook()
+        self.portfolio = Portfolio(config.initial_balance, config, search=search)
+
+        self.prevdate = 0
+        self.position_size = 1
+
+        self.paths = {name: os.path.join(dir, f"{name}.csv") for name in ["history", "balance", "equity"]}
+
+    @property
+    def history(self) -> pd.DataFrame:
+        """Closed positions written by the run."""
+        if not os.path.exists(self.paths["history"]):
+            return self.portfolio.history.iloc[:0]
+        return pd.read_csv(self.paths["history"], index_col=0, parse_dates=["date", "close_time"], float_precision="round_trip")
+
+    @property
+    def balance(self) -> pd.Series:
+        return self._read_curve("balance")
+
+    @property
+    def equity(self) -> pd.Series:
+        return self._read_curve("equity")
+
+    def _read_curve(self, name) -> pd.Series:
+        if not os.path.exists(self.paths[name]):
+            return pd.Series(dtype=float, name=name)
+        return pd.read_csv(self.paths[name], index_col=0, parse_dates=True, float_precision="round_trip")[name]
+
+    def run_backtest(self, name='', event_driven=False):
+        """
+            Run the simulation chunk by chunk.
+            Buy at Ask price, exit at Bid price
+            Sell at Bid price, Exit at Ask price
+        """
+        os.makedirs(self._dir, exist_ok=True)
+        for path in self.paths.values():
+            if os.path.exists(path):
+                os.remove(path)
+
+        self._interval = pd.Timedelta(minutes=self.config.interval).value
+        self._origin = None
+        self._last_fed = None
+        self._start = None
+        self._last_row = None
+        self._curve_end = None
+
+        self._stream = StreamingProcessor(self._indicator_columns())
+        self._rows = RingBuffer(self._stream.columns, 20)
+        self._previous = None
+        self._row_times, self._row_signals = [], []
+
+        carry = None
+        with tqdm(desc=f"{name}-Progress", unit="chunk") as pbar:
+            for chunk in self.chunks:
+                if len(chunk) == 0:
+                    continue
+                buffer = chunk if carry is None else pd.concat([carry, chunk])
+                if self._origin is None:
+                    self._origin = buffer.index[0].normalize().value
+
+                carry = self._consume(buffer, event_driven)
+                pbar.update(1)
+                if carry is None:
+                    return
+
+            if carry is not None:
+                self._finish(carry, event_driven)
+
+    def _bins(self, times: np.ndarray) -> np.ndarray:
+        """Start of the bar of every tick, as int64 epoch nanoseconds."""
+        return self._origin + (times - self._origin) // self._interval * self._interval
+
+    def _feed(self, ticks: pd.DataFrame):
+        """Update the indicators with the bars of `ticks` that were not fed yet."""
+        if len(ticks) == 0:
+            return
+
+        bars = ticks.resample(f"{self.config.interval}T", origin=pd.Timestamp(self._origin)).agg({
+            "price": "ohlc",
+            "volume": "sum"
+        }).dropna()
+        bars.columns = bars.columns.droplevel(0)
+        if self._last_fed is not None:
+            bars = bars.loc[bars.index.values.astype("datetime64[ns]").view(np.int64) > self._last_fed]
+
+        for time, open, high, low, close, volume in bars.itertuples():
+            self._last_fed = pd.Timestamp(time).value
+            if not self._stream.update(time, open, high, low, close, volume):
+                continue
+
+            # Bars are shifted by one: a bar carries the indicators of the bar before it
+            if self._previous is not None:
+                self._rows.append(time, self._previous)
+                self._add_row(time)
+            self._previous = self._stream.buffer.last().copy()
+
+    def _add_row(self, time):
+        """Signals of the strategies on the 20 bars up to the new bar."""
+        self._last_row = pd.Timestamp(time).value
+        if self._rows.count <= 20:
+            return
+        if self._start is None:
+            self._start = self._last_row
+
+        frame = self._rows.frame()
+        self._row_times.append(self._last_row)
+        self._row_signals.append([strategy(frame) for strategy in self.strategy])
+
+    def _consume(self, buffer: pd.DataFrame, event_driven) -> pd.DataFrame:
+        """Process the ticks of `buffer` that can no longer change, return the ticks to carry."""
+        times = buffer.index.values.astype("datetime64[ns]").view(np.int64)
+        bins = self._bins(times)
+
+        # The last bar may still receive ticks from the next chunk
+        complete = int(np.searchsorted(bins, bins[-1], side="left"))
+        self._feed(buffer.iloc[:complete])
+        if self._start is None:
+            return buffer.iloc[complete:]
+
+        start = int(np.searchsorted(times, self._start, side="left"))
+
+        # Keep the last ticks of the complete bars, they may be the 20 ticks left out at the end
+        end = complete - self.LOOKAHEAD
+
+        # The bid/ask of the next tick must be known
+        bids = buffer["bid_price"].iloc[:complete].bfill().values
+        asks = buffer["ask_price"].iloc[:complete].bfill().values
+        unknown = np.flatnonzero(np.isnan(bids) | np.isnan(asks))
+        if len(unknown):
+            end = min(end, int(unknown[-1]))
+
+        # Ticks of one timestamp are processed together
+        if start < end < len(times):
+            end = int(np.searchsorted(times, times[end], side="left"))
+
+        if end <= start:
+            return buffer.iloc[start:]
+
+        if not self._run_segment(buffer, times, start, end, bids[start + 1:end + 1], asks[start + 1:end + 1], end, event_driven):
+            return None
+        return buffer.iloc[end:]
+
+    def _finish(self, buffer: pd.DataFrame, event_driven):
+        """Process the last ticks once the chunks are exhausted."""
+        times = buffer.index.values.astype("datetime64[ns]").view(np.int64)
+        complete = int(np.searchsorted(self._bins(times), self._last_fed, side="right")) if self._last_fed is not None else 0
+        self._feed(buffer.iloc[complete:])
+        if self._start is None:
+            logging.info("Not enough bars to backtest")
+            return
+
+        start = int(np.searchsorted(times, self._start, side="left"))
+        stop = int(np.searchsorted(times, self._last_row, side="right"))
+        if stop <= start:
+            return
+
+        n_ticks = max(stop - start - 20, 0)
+        bids = buffer["bid_price"].iloc[start:stop].bfill().values
+        asks = buffer["ask_price"].iloc[start:stop].bfill().values
+        self._run_segment(buffer, times, start, start + n_ticks, bids[1:n_ticks + 1], asks[1:n_ticks + 1], stop, event_driven)
+
+    def _run_segment(self, buffer, times, start, end, bids, asks, written, event_driven) -> bool:
+        """
+            Run ticks start:end of `buffer` and write the curves of the ticks start:written.
+            Returns False once the portfolio is out of buying power.
+        """
+        n_ticks = end - start
+        index = buffer.index[start:end]
+
+        self._datetimes = index
+        self._tick_times = times[start:end]
+        self._prices = buffer["price"].values[start:end]
+        self._bids = bids
+        self._asks = asks
+
+        self.calendar = SessionCalendar(index)
+        self._in_session = self.calendar.in_session
+        self._after_close = self.calendar.after_close
+
+        # Bars up to the last one before the first tick are no longer needed
+        if n_ticks:
+            first = max(int(np.searchsorted(self._row_times, self._tick_times[0], side="right")) - 1, 0)
+            del self._row_times[:first], self._row_signals[:first]
+        self._bar_times = np.array(self._row_times, dtype=np.int64)
+        self.signal_matrix = np.array(self._row_signals, dtype=np.int8).reshape(len(self._row_times), len(self.strategy))
+
+        self._balance_curve = np.empty(n_ticks)
+        self._unrealized_curve = np.empty(n_ticks)
+
+        completed = self._run_events_segment(n_ticks) if event_driven else self._run_ticks_segment(n_ticks)
+        if not completed:
+            logging.info("Out of buying power")
+            self._flush_history()
+            return False
+
+        self._write(buffer.index[start:written], times[start:written], n_ticks)
+        self._flush_history()
+        return True
+
+    def _run_ticks_segment(self, n_ticks) -> bool:
+        for i in range(n_ticks):
+            if not self._step(i):
+                return False
+        return True
+
+    def _run_events_segment(self, n_ticks) -> bool:
+        if n_ticks == 0:
+            return True
+
+        self._schedule_events(n_ticks)
+        i = 0
+        while i < n_ticks:
+            if not self._step(i):
+                return False
+            i = self._next_event(i, n_ticks)
+        return True
+
+    def _write(self, index, times, n_ticks):
+        """Append the curves of the rows `index`, rows past the last tick carry its values."""
+        if len(index) == 0:
+            return
+
+        if n_ticks:
+            rows = np.minimum(np.searchsorted(times, times, side="right") - 1, n_ticks - 1)
+            balance = self._balance_curve[rows]
+            equity = (self._balance_curve + self._unrealized_curve)[rows]
+            self._curve_end = (balance[-1], equity[-1])
+        elif self._curve_end is not None:
+            balance = np.full(len(index), self._curve_end[0])
+            equity = np.full(len(index), self._curve_end[1])
+        else:
+            return
+
+        for name, values in [("balance", balance), ("equity", equity)]:
+            pd.Series(values, index=index, name=name).to_csv(
+                self.paths[name], mode="a", header=not os.path.exists(self.paths[name])
+            )
+
+    def _flush_history(self):
+        """Append the positions closed so far and drop them from memory."""
+        history = self.portfolio._history
+        if len(history):
+            history.to_frame().to_csv(
+                self.paths["history"], mode="a", header=not os.path.exists(self.paths["history"])
+            )
+        history.clear()
+        self.portfolio._history_frame = None
+        self.portfolio.ledger.clear()
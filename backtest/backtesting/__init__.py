@@ -1 +1,5 @@
-from .Backtesting import Backtesting
\ No newline at end of file
+from .Backtesting import Backtesting
+from .StreamingBacktesting import StreamingBacktesting
+from .BatchBacktesting import BatchBacktesting
+from .OrderBook import OrderBook
+from .ExcursionIndex import ExcursionIndex
@@ -0,0 +1,129 @@
+import numpy as np
+import pandas as pd
+
+
+class Holdings:
+    """
+        Columnar store of positions backed by preallocated NumPy arrays.
+        - date / close_time: int64 epoch nanoseconds
+        - side: 1 for buy, -1 for sell
+        - id: sequence number of the position, increasing in insertion order
+        Rows keep their insertion order, removing rows compacts the arrays.
+    """
+    COLUMNS = [
+        "date", "price", "signal", "position_size", "position",
+        "TP", "SL", "close_price", "close_time", "pnl"
+    ]
+    _SCHEMA = [
+        ("date", np.int64), ("price", np.float64), ("side", np.int8),
+        ("position_size", np.int64), ("position", np.float64),
+        ("TP", np.float64), ("SL", np.float64), ("close_price", np.float64),
+        ("close_time", np.int64), ("pnl", np.float64), ("id", np.int64)
+    ]
+    _NAT = np.iinfo(np.int64).min
+
+    def __init__(self, capacity: int = 64):
+        self.n = 0
+        self._next_id = 0
+        self.capacity = max(int(capacity), 1)
+        for name, dtype in self._SCHEMA:
+            setattr(self, name, np.empty(self.capacity, dtype=dtype))
+
+    def __len__(self) -> int:
+        return self.n
+
+    @property
+    def empty(self) -> bool:
+        return self.n == 0
+
+    def _reserve(self, needed: int):
+        """Grow every column so that `needed` rows fit."""
+        if needed <= self.capacity:
+            return
+        capacity = self.capacity
+        while capacity < needed:
+            capacity *= 2
+        for name, dtype in self._SCHEMA:
+            column = np.empty(capacity, dtype=dtype)
+            column[:self.n] = getattr(self, name)[:self.n]
+            setattr(self, name, column)
+        self.capacity = capacity
+
+    def append(self, position: dict) -> int:
+        """Append a position given in the row format of `COLUMNS`."""
+        self._reserve(self.n + 1)
+        i = self.n
+        self.date[i] = pd.Timestamp(position["date"]).value
+        self.price[i] = position["price"]
+        self.side[i] = 1 if position["signal"] == "buy" else -1
+        self.position_size[i] = position["position_size"]
+        self.position[i] = position["position"]
+        self.TP[i] = position["TP"]
+        self.SL[i] = position["SL"]
+        self.close_price[i] = position.get("close_price", np.nan)
+        close_time = position.get("close_time", np.nan)
+        self.close_time[i] = self._NAT if pd.isna(close_time) else pd.Timestamp(close_time).value
+        self.pnl[i] = position.get("pnl", np.nan)
+        self.id[i] = self._next_id
+        self._next_id += 1
+        self.n += 1
+        return i
+
+    def extend(self, other: "Holdings", index: np.ndarray, close_price: np.ndarray, close_time, pnl: np.ndarray):
+        """Copy the rows `index` of `other` and stamp them as closed."""
+        k = len(index)
+        if k == 0:
+            return
+        self._reserve(self.n + k)
+        start, end = self.n, self.n + k
+        for name, _ in self._SCHEMA:
+            getattr(self, name)[start:end] = getattr(other, name)[index]
+        self.close_price[start:end] = close_price
+        self.close_time[start:end] = pd.Timestamp(close_time).value
+        self.pnl[start:end] = pnl
+        self.n = end
+
+    def merge(self, other: "Holdings"):
+        """Append every row of `other` as it is."""
+        k = len(other)
+        if k == 0:
+            return
+        self._reserve(self.n + k)
+        for name, _ in self._SCHEMA:
+            getattr(self, name)[self.n:self.n + k] = getattr(other, name)[:k]
+        self.n += k
+
+    def remove(self, index: np.ndarray):
+        """Drop the rows `index`, keeping the remaining rows in order."""
+        if len(index) == 0:
+            return
+        keep = np.ones(self.n, dtype=bool)
+        keep[index] = False
+        m = int(keep.sum())
+        for name, _ in self._SCHEMA:
+            column = getattr(self, name)
+            column[:m] = column[:self.n][keep]
+        self.n = m
+
+    def locate(self, ids: np.ndarray) -> np.ndarray:
+        """Row index of each position id in `ids`, which must be sorted."""
+        return np.searchsorted(self.id[:self.n], ids)
+
+    def clear(self):
+        self.n = 0
+
+    def to_frame(self) -> pd.DataFrame:
+        """Materialize the rows as the DataFrame layout used by Portfolio.history."""
+        n = self.n
+        return pd.DataFrame({
+            "date": self.date[:n].view("datetime64[ns]"),
+            "price": self.price[:n],
+            "signal": np.where(self.side[:n] == 1, "buy", "sell").astype(object),
+            "position_size": self.position_size[:n],
+            "position": self.position[:n],
+            "TP": self.TP[:n],
+            "SL": self.SL[:n],
+            "close_price": self.close_price[:n],
+            "close_time": self.close_time[:n].view("datetime64[ns]"),
+            "pnl": self.pnl[:n]
+        }, columns=self.COLUMNS)
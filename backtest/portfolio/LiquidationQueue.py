@@ -0,0 +1,46 @@
+from heapq import heappush, heappop
+import numpy as np
+
+
+class LiquidationQueue:
+    """
+        Open positions ordered by how much they lose, for forced liquidation.
+        At given bid/ask, the PnL of a position only depends on its side, entry
+        price and size, so positions are grouped by (side, size) in heaps:
+        - buy: the highest entry price loses the most
+        - sell: the lowest entry price loses the most
+        Ties go to the position opened first. The worst position overall is
+        one of the group heads, found in O(groups) after O(log n) pops.
+        Closed positions are dropped lazily when they reach the head of their heap.
+    """
+    def __init__(self):
+        self._heaps = {}
+        self._open = set()
+
+    def __len__(self) -> int:
+        return len(self._open)
+
+    def add(self, id: int, side: int, price: float, size: int):
+        heap = self._heaps.setdefault((side, size), [])
+        heappush(heap, (-price if side == 1 else price, id))
+        self._open.add(id)
+
+    def remove(self, ids: np.ndarray):
+        self._open.difference_update(ids.tolist())
+
+    def clear(self):
+        self._heaps.clear()
+        self._open.clear()
+
+    def candidates(self) -> np.ndarray:
+        """Sorted ids of the worst position of every group."""
+        heads = []
+        for key in list(self._heaps):
+            heap = self._heaps[key]
+            while heap and heap[0][1] not in self._open:
+                heappop(heap)
+            if heap:
+                heads.append(heap[0][1])
+            else:
+                del self._heaps[key]
+        return np.array(sorted(heads), dtype=np.int64)
@@ -1,80 +1,107 @@
+import numpy as np
 import pandas as pd
 from ..backtest_config import BacktestConfig
+from .Holdings import Holdings
+from .TriggerIndex import TriggerIndex
+from .LiquidationQueue import LiquidationQueue
 
 class Portfolio:
     """
         Portfolio class to manage the positions and balance of the trading account.
+        Open positions and closed trades are kept in columnar `Holdings` stores,
+        the `history` DataFrame is only built when it is requested.
+        Open positions are also indexed by TP/SL level to find triggered exits,
+        and by how much they lose to find the position to liquidate.
+        The unrealized PnL is summed once per price while the holdings are unchanged.
     """
+    # Prices whose unrealized PnL is kept for the current holdings
+    UNREALIZED_CACHE = 1024
+
     def __init__(self, initial_balance: float, config: BacktestConfig, search: bool = False):
         self.balance = initial_balance
         self.config = config
         self.search = search
-        self.holdings = pd.DataFrame(columns=[
-            "date", "price", "signal", "position_size", "position", 
-            "TP", "SL", "close_price", "close_time", "pnl"
-        ])
-        self.history = pd.DataFrame(columns=[
-            "date", "price", "signal", "position_size", "position", 
-            "TP", "SL", "close_price", "close_time", "pnl"
-        ])
+        self.holdings = Holdings()
+        self.triggers = TriggerIndex()
+        self.liquidation = LiquidationQueue()
+        self._unrealized = {}
+        self._history = Holdings()
+        self._history_frame = None
+
+        # Every change of the balance in the order it was applied
+        self.ledger = []
+
+    @property
+    def history(self) -> pd.DataFrame:
+        """Closed positions in the order they were closed."""
+        if self._history_frame is None or len(self._history_frame) != len(self._history):
+            self._history_frame = self._history.to_frame()
+        return self._history_frame
 
     def add_position(self, position):
         """Add a new position to the portfolio."""
-        self.holdings = pd.concat([self.holdings, pd.DataFrame([position])], ignore_index=True)
-    
+        i = self.holdings.append(position)
+        h = self.holdings
+        self.triggers.add(h.id[i], h.side[i], h.TP[i], h.SL[i])
+        self.liquidation.add(int(h.id[i]), int(h.side[i]), float(h.price[i]), int(h.position_size[i]))
+        self._unrealized.clear()
+
     def buying_power(self, curr_price):
         required_margin = self.config.margin * curr_price * len(self.holdings)
         equity = self.balance + self._unrealized_pnl(curr_price)
         available = equity - required_margin
         return int(available / (curr_price * self.config.margin))
-            
+
     def close_position(self, index, bid_price, ask_price, date):
-        """Close a position and update the portfolio."""
-        # print('Start Function')
-        # print(self.holdings)
-        row = self.holdings.iloc[index]
-        close_price = bid_price if row["signal"] == "buy" else ask_price
-        pnl = self._calculate_pnl(row, bid_price, ask_price)
-        # print(f"""
-        #     Close Price: {close_price}
-        #     {row["signal"]} Price: {row["price"]}
-        #     pnl: {(bid_price - row["price"]) if row["signal"] == "buy" else (row["price"] - ask_price)}
-        #     PnL: {pnl}
-        # """)   
-
-        # print(f"Calculated pnl: {pnl} for position {index}")
-        # print(f"Balance before update: {self.balance}")
-        self.balance += pnl
-        # print(f"Balance after update: {self.balance}")
-
-        row["close_price"] = close_price
-        row["close_time"] = date
-        row["pnl"] = pnl
-        self.history = pd.concat([self.history, pd.DataFrame([row])], ignore_index=True)
-
-    def _calculate_pnl(self, row,  bid_price, ask_price):
-        """Calculate the profit or loss for a position."""
-        pnl = (bid_price - row["price"]) if row["signal"] == "buy" else (row["price"] - ask_price)
-        # print(row["position_size"])
+        """Close the positions at `index` and update the portfolio."""
+        index = np.atleast_1d(index)
+        pnl = self._calculate_pnl(index, bid_price, ask_price)
+
+        # Accumulate one position at a time to keep the balance path unchanged
+        values = pnl.tolist()
+        for value in values:
+            self.balance += value
+        self.ledger += values
+
+        self._record(index, bid_price, ask_price, date, pnl)
+        self.triggers.remove(self.holdings.id[index])
+        self.liquidation.remove(self.holdings.id[index])
+        self.holdings.remove(index)
+        self._unrealized.clear()
+
+    def _record(self, index, bid_price, ask_price, date, pnl):
+        """Copy the closed positions at `index` into the history."""
+        close_price = np.where(self.holdings.side[index] == 1, bid_price, ask_price)
+        self._history.extend(self.holdings, index, close_price, date, pnl)
+
+    def _calculate_pnl(self, index, bid_price, ask_price):
+        """Calculate the profit or loss for the positions at `index`."""
+        h = self.holdings
+        price = h.price[index]
+        pnl = np.where(h.side[index] == 1, bid_price - price, price - ask_price)
 
         pnl -= self.config.slippage
         pnl -= self.config.cost * 2
-        
+
         if self.search:
-            return pnl 
+            return pnl
         else:
-            pnl *= row["position_size"]
+            pnl *= h.position_size[index]
         return pnl
 
     def force_liquidate(self, curr_price, bid_price, ask_price, date):
         """Force liquidation to meet margin requirements."""
         while not self.holdings.empty and not self._meets_margin(curr_price):
-            self.holdings["unrealized_pnl"] = self.holdings.apply(
-                lambda row: self._calculate_pnl(row, bid_price, ask_price), axis=1
-            )
-            to_liquidate = self.holdings["unrealized_pnl"].idxmin()
-            self.close_position(to_liquidate,  bid_price, ask_price, date)
-            self.holdings.drop(index=to_liquidate, inplace=True)          
+            self.close_position(self._worst_position(bid_price, ask_price), bid_price, ask_price, date)
+
+    def _worst_position(self, bid_price, ask_price) -> int:
+        """Index of the position with the lowest PnL at bid/ask, the first one on ties."""
+        if bid_price != bid_price or ask_price != ask_price:
+            # NaN quotes: argmin stops at the first NaN PnL
+            return int(np.argmin(self._calculate_pnl(np.arange(len(self.holdings)), bid_price, ask_price)))
+
+        index = self.holdings.locate(self.liquidation.candidates())
+        return int(index[np.argmin(self._calculate_pnl(index, bid_price, ask_price))])
 
     def _meets_margin(self, curr_price):
         """Check if the portfolio meets margin requirements."""
@@ -84,56 +111,57 @@ class Portfolio:
 
     def _unrealized_pnl(self, curr_price):
         """Calculate the unrealized PnL."""
-        return sum(
-            (curr_price - row["price"]) * row["position_size"] if row["signal"] == "buy" else
-            (row["price"] - curr_price) * row["position_size"]
-            for _, row in self.holdings.iterrows()
-        )
-    
+        h = self.holdings
+        n = len(h)
+        if n == 0:
+            return 0
+
+        pnl = self._unrealized.get(curr_price)
+        if pnl is None:
+            price = h.price[:n]
+            pnl = sum((np.where(h.side[:n] == 1, curr_price - price, price - curr_price) * h.position_size[:n]).tolist())
+            if len(self._unrealized) >= self.UNREALIZED_CACHE:
+                self._unrealized.clear()
+            self._unrealized[curr_price] = pnl
+        return pnl
+
     def _close_all(self, curr_price, bid_price, ask_price, date) -> float:
         """Close all positions and update the portfolio."""
         pnl = 0
-        for i, row in self.holdings.iterrows():
-            row["close_price"] = bid_price if row["signal"] == "buy" else ask_price
-            row["pnl"] = self._calculate_pnl(row, bid_price, ask_price)
-            
-            # print(self.balance)
-            self.balance += row["pnl"] - self.config.cost * 2
-            # print(self.balance)
-            
-            row["close_time"] = date
-            pnl += row["pnl"] - self.config.cost * 2
-            self.history = pd.concat([self.history, pd.DataFrame([row])], ignore_index=True)
-
-        self.holdings = pd.DataFrame(columns=[
-            "date", "price", "signal", "position_size", "position", 
-            "TP", "SL", "close_price", "close_time", "pnl"
-        ])
+        if self.holdings.empty:
+            return pnl
+
+        index = np.arange(len(self.holdings))
+        closed_pnl = self._calculate_pnl(index, bid_price, ask_price)
+        for value in closed_pnl.tolist():
+            self.balance += value - self.config.cost * 2
+            pnl += value - self.config.cost * 2
+            self.ledger.append(value - self.config.cost * 2)
+
+        self._record(index, bid_price, ask_price, date, closed_pnl)
+        self.holdings.clear()
+        self.triggers.clear()
+        self.liquidation.clear()
+        self._unrealized.clear()
 
         return pnl
-    
+
     def check_position(self, curr_price, bid_price, ask_price, date):
-        """Check if the portfolio has reached the maximum number of positions."""
-        to_close = []
-        for i, row in self.holdings.iterrows():
-            if (
-                (row["signal"] == "buy" and (bid_price >= row["TP"] or bid_price <= row['SL'])) or
-                (row["signal"] == "sell" and (ask_price <= row['TP'] or ask_price >= row['SL']))
-            ):
-                to_close.append(i)
-
-        for index in to_close:
-            self.close_position(index, bid_price, ask_price, date)
-
-        # Drop positions that were closed
-        self.holdings.drop(index=to_close, inplace=True)
-        self.holdings.reset_index(drop=True, inplace=True)
-    
+        """Close the positions whose TP or SL has been reached."""
+        if self.holdings.empty:
+            return
+
+        # Triggered ids come back sorted, which is also the holdings order
+        triggered = self.triggers.triggered(bid_price, ask_price)
+
+        if len(triggered):
+            self.close_position(self.holdings.locate(triggered), bid_price, ask_price, date)
+
     def position_sizing(self, curr_price):
         """Calculate the position size based on the current balance."""
         new_size = int((self.balance * self.config.position_size) / (curr_price * self.config.margin))
-        
+
         if new_size < 1 and self.balance > (curr_price * self.config.margin):
             return 1
-        
-        return new_size
\ No newline at end of file
+
+        return new_size
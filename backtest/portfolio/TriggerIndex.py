@@ -0,0 +1,98 @@
+import numpy as np
+
+
+class SortedLevels:
+    """
+        Price levels kept sorted together with the id of the position they belong to.
+    """
+    def __init__(self):
+        self.levels = np.empty(0, dtype=np.float64)
+        self.ids = np.empty(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self.levels)
+
+    def add(self, level: float, id: int):
+        i = np.searchsorted(self.levels, level, side="right")
+        self.levels = np.insert(self.levels, i, level)
+        self.ids = np.insert(self.ids, i, id)
+
+    def remove(self, ids: np.ndarray):
+        keep = ~np.isin(self.ids, ids)
+        self.levels = self.levels[keep]
+        self.ids = self.ids[keep]
+
+    def clear(self):
+        self.levels = self.levels[:0]
+        self.ids = self.ids[:0]
+
+    def at_most(self, price: float) -> np.ndarray:
+        """Ids whose level is <= price."""
+        if len(self.levels) == 0 or not self.levels[0] <= price:
+            return self.ids[:0]
+        return self.ids[:np.searchsorted(self.levels, price, side="right")]
+
+    def at_least(self, price: float) -> np.ndarray:
+        """Ids whose level is >= price."""
+        if len(self.levels) == 0 or not self.levels[-1] >= price:
+            return self.ids[:0]
+        return self.ids[np.searchsorted(self.levels, price, side="left"):]
+
+
+class TriggerIndex:
+    """
+        Open positions indexed by their TP and SL levels, per side.
+        - buy: triggered when bid >= TP or bid <= SL
+        - sell: triggered when ask <= TP or ask >= SL
+        Each tick costs O(log n + k) for k triggered positions.
+    """
+    def __init__(self):
+        self.buy_TP = SortedLevels()
+        self.buy_SL = SortedLevels()
+        self.sell_TP = SortedLevels()
+        self.sell_SL = SortedLevels()
+
+    def _books(self):
+        return (self.buy_TP, self.buy_SL, self.sell_TP, self.sell_SL)
+
+    def add(self, id: int, side: int, TP: float, SL: float):
+        if side == 1:
+            self.buy_TP.add(TP, id)
+            self.buy_SL.add(SL, id)
+        else:
+            self.sell_TP.add(TP, id)
+            self.sell_SL.add(SL, id)
+
+    def remove(self, ids: np.ndarray):
+        for book in self._books():
+            if len(book):
+                book.remove(ids)
+
+    def clear(self):
+        for book in self._books():
+            book.clear()
+
+    def bounds(self):
+        """
+            Closest levels of each book, a tick is quiet when
+            bid < buy_TP, bid > buy_SL, ask > sell_TP and ask < sell_SL.
+        """
+        return (
+            self.buy_TP.levels[0] if len(self.buy_TP) else np.inf,
+            self.buy_SL.levels[-1] if len(self.buy_SL) else -np.inf,
+            self.sell_TP.levels[-1] if len(self.sell_TP) else -np.inf,
+            self.sell_SL.levels[0] if len(self.sell_SL) else np.inf
+        )
+
+    def triggered(self, bid_price: float, ask_price: float) -> np.ndarray:
+        """Sorted ids of the positions whose TP or SL is reached."""
+        hits = [
+            self.buy_TP.at_most(bid_price),
+            self.buy_SL.at_least(bid_price),
+            self.sell_TP.at_least(ask_price),
+            self.sell_SL.at_most(ask_price)
+        ]
+        hits = [ids for ids in hits if len(ids)]
+        if not hits:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(hits))
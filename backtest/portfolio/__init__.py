@@ -1 +1,4 @@
 from .Portfolio import Portfolio
+from .Holdings import Holdings
+from .TriggerIndex import TriggerIndex
+from .LiquidationQueue import LiquidationQueue
@@ -26,15 +26,12 @@ main_dir = 'result'
 start_date = '2018-01-01'
 end_date = '2025-01-10'
 
-if os.path.exists(f'{start_date}-{end_date}.csv'):
-    data = pd.read_csv(f'{start_date}-{end_date}.csv')
-    data.set_index('datetime', inplace=True)
-    data.index = pd.to_datetime(data.index)
-else :
-    downloader = Downloader()
-    print('Download Data')
-    data = downloader.get_historical_data(start_date=start_date, end_date=end_date)
-    data.to_csv(f'{start_date}-{end_date}.csv')
+archive = TickArchive()
+downloader = Downloader()
+print('Sync Data')
+downloader.sync(archive, start_date=start_date, end_date=end_date)
+downloader.close()
+data = archive.read(start_date, end_date)
 
 
 print(data.head())
@@ -0,0 +1,89 @@
+import copy
+import logging
+import multiprocessing
+import random
+
+import numpy as np
+import optuna
+
+from utils import initialize_logging, frame_cache, TickStore
+from utils.shared import SharedFrame
+
+
+def _worker(owner, objective: str, spec: dict, forked: bool, study_name: str, storage: str, n_trials: int, seed: int, store: bool = False):
+    """Run n_trials trials of the study in a worker process, on its own copy of the owner."""
+    initialize_logging(owner._dir)
+
+    # The trials of the worker read the ticks, filled quotes and calendar of the shared block
+    if store:
+        owner.data = TickStore.attach(spec, forked=forked)
+    else:
+        shared = SharedFrame.attach(spec, forked=forked)
+        owner.data = shared.frame
+
+    np.random.seed(seed)
+    random.seed(seed)
+    study = optuna.load_study(
+        study_name=study_name,
+        storage=storage,
+        sampler=optuna.samplers.TPESampler(seed=seed)
+    )
+    study.optimize(getattr(owner, objective), n_trials=n_trials)
+
+    # Leave the bars of this worker to the other workers and later runs
+    frame_cache.flush()
+
+
+class TrialExecutor:
+    """
+        Runs the trials of an Optuna study in worker processes instead of threads.
+        - The tick data of the owner (Searching / Optimizer) is put once in shared memory,
+          every worker reads it through zero-copy read-only views. A TickStore shares
+          its filled quotes and calendar too, workers only attach to them
+        - Every worker holds its own copy of the owner, so concurrent trials never
+          share a Backtesting or a BacktestConfig
+        - Workers share the trials of the study through its storage, each one
+          runs its part of the n_trials so that the total never exceeds it
+    """
+    def __init__(self, owner, objective: str, n_jobs: int = 2):
+        self.owner = owner
+        self.objective = objective
+        self.n_jobs = n_jobs
+
+        # fork keeps the scripts from being re-imported in the workers
+        methods = multiprocessing.get_all_start_methods()
+        self.context = multiprocessing.get_context("fork" if "fork" in methods else "spawn")
+
+    def optimize(self, study_name: str, storage: str, n_trials: int) -> optuna.study.Study:
+        """Run n_trials more trials of the stored study and return it reloaded."""
+        store = isinstance(self.owner.data, TickStore)
+        shared = self.owner.data.share() if store else SharedFrame(self.owner.data)
+        forked = self.context.get_start_method() == "fork"
+
+        # The workers get the owner without its data and backtest
+        owner = copy.copy(self.owner)
+        owner.data = None
+        owner.bt = None
+
+        # n_trials // n_jobs trials per worker, the first ones run one more for the remainder
+        shares = [n_trials // self.n_jobs + (k < n_trials % self.n_jobs) for k in range(self.n_jobs)]
+        workers = [
+            self.context.Process(
+                target=_worker,
+                args=(owner, self.objective, shared.spec, forked, study_name, storage, share, 42 + k, store)
+            )
+            for k, share in enumerate(shares) if share > 0
+        ]
+        try:
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+        finally:
+            shared.close()
+
+        failed = [worker.exitcode for worker in workers if worker.exitcode != 0]
+        if failed:
+            logging.error(f"{len(failed)} trial workers exited with codes {failed}")
+
+        return optuna.load_study(study_name=study_name, storage=storage)
@@ -10,6 +10,8 @@ from backtest import *
 import optuna
 import random
 
+from .Executor import TrialExecutor
+
 class Optimizer:
     """
         Seaching Potential Strategies
@@ -19,7 +21,7 @@ class Optimizer:
                  path: str,
                  number_of_trials: int,
                  dir: str = 'optimizing',
-                 data: pd.DataFrame = None,
+                 data: pd.DataFrame | TickStore = None,
                  SL: Tuple[float, float] = (-3, 3),
                  TP: Tuple[float, float] = (-3, 3),
                  side: ['long', 'short'] = None,
@@ -48,7 +50,7 @@ class Optimizer:
         initialize_logging(dir)
 
         self.number_of_trials: int = number_of_trials
-        self.data: pd.DataFrame = data
+        self.data: TickStore = data if isinstance(data, TickStore) else TickStore(data)
         self.cost = cost
         self.bt = None
 
@@ -194,8 +196,8 @@ class Optimizer:
         if len(history) == 0:
             return float('-inf')
 
-        balance = self.bt.data['balance'].fillna(method='ffill')
-        equity = self.bt.data['equity'].fillna(method='ffill')
+        balance = self.bt.balance.fillna(method='ffill')
+        equity = self.bt.equity.fillna(method='ffill')
 
         # print('balance', balance)
         # print('equity', equity)
@@ -239,13 +241,18 @@ class Optimizer:
             np.random.seed(42)
             random.seed(42)
             sampler = optuna.samplers.TPESampler(seed=42)
+            storage = "sqlite:///searching.db"
             study = optuna.create_study(sampler=sampler,
                                         direction="maximize",
                                         study_name=f"optimizing_{name}",
-                                        storage="sqlite:///searching.db", 
+                                        storage=storage, 
                                         load_if_exists=True)    
 
-            study.optimize(self.seaching_objective, n_trials=self.number_of_trials, n_jobs=self.n_jobs)
+            if self.n_jobs > 1:
+                executor = TrialExecutor(self, "seaching_objective", n_jobs=self.n_jobs)
+                study = executor.optimize(study.study_name, storage, self.number_of_trials)
+            else:
+                study.optimize(self.seaching_objective, n_trials=self.number_of_trials)
 
             best_params = study.best_params
             best_params_str = "\n".join(f"{key}: {value}" for key, value in best_params.items())
@@ -10,6 +10,8 @@ from backtest import *
 import optuna
 import random
 
+from .Executor import TrialExecutor
+
 class Searching:
     """
         Seaching Potential Strategies
@@ -17,21 +19,28 @@ class Searching:
     def __init__(self, 
                  number_of_trials: int,
                  dir: str = 'searching',
-                 data: pd.DataFrame = None,
+                 data: pd.DataFrame | TickStore = None,
                  SL: Tuple[float, float] = (1, 10),
                  TP: Tuple[float, float] = (1, 10),
                  cost: float = 0.25,
                  slippage: float = 0.47,
                  side: ['long', 'short'] = None,
                  mode: ['one_way', 'hedged'] = 'one_way',
-                 n_jobs: int = 2
+                 n_jobs: int = 2,
+                 signal_tensor: SignalTensor = None,
+                 lazy_indicators: bool = False,
+                 indicator_backend: ['ta', 'numpy'] = 'ta',
+                 lean: bool = False
                  ):
+        """With lean, trials only record their trades and write no balance and equity curves."""
         
         assert data is not None, "Data must be provided"
         assert len(data) > 0, "Data must not be empty"
         assert len(data.columns) > 0, "Data must have columns"
         assert (mode == 'one_way' and side is not None) or mode == 'hedged', "Side must be provided for One way"
         assert side in ['long', 'short', None], "Side must be either 'long', 'short' or None"
+        assert signal_tensor is None or signal_tensor.matches(data), "Signal tensor must be built from the data"
+        assert signal_tensor is None or (not lazy_indicators and indicator_backend == 'ta'), "A signal tensor is built with the full 'ta' indicators"
 
         self._dir: str = dir
         self.TP = TP
@@ -45,10 +54,15 @@ class Searching:
         initialize_logging(dir)
 
         self.number_of_trials: int = number_of_trials
-        self.data: pd.DataFrame = data
+        # Ticks held once, read-only, by every trial
+        self.data: TickStore = data if isinstance(data, TickStore) else TickStore(data)
         self.bt = None
         self.cost = cost
         self.slippage = slippage
+        self.signal_tensor = signal_tensor
+        self.lazy_indicators = lazy_indicators
+        self.indicator_backend = indicator_backend
+        self.lean = lean
 
         np.random.seed(42)
         random.seed(42)
@@ -80,14 +94,17 @@ class Searching:
             min_signals=min_signals,
             initial_balance=10e19,
             mode=mode,
-            interval=interval
+            interval=interval,
+            lazy_indicators=self.lazy_indicators,
+            indicator_backend=self.indicator_backend
         )
         
         self.bt = Backtesting(
             strategy=strategies,
             data=self.data,
             config= self.bt_config,
-            search=True
+            search=True,
+            signal_tensor=self.signal_tensor
         )
         return f"""
             Strategies: {[strategy.__name__ for strategy in strategies]}
@@ -110,17 +127,50 @@ class Searching:
                 
             The find the optimal strategy, we by maximizing the objective function
         """
-        break_even_prob = (SL + 2 * self.bt_config.cost) / (SL + TP)
-        expected_pnl = TP * break_even_prob
-        
         pnl = history['pnl']
         mean_pnl = pnl.mean()
         winrate = (pnl > 0).astype(float).mean()
 
+        return self._loss(mean_pnl, winrate, TP, SL)
+
+    def _loss(self, mean_pnl, winrate, TP, SL):
+        """Loss of the objective function, works on scalars and on arrays of the TP x SL grid."""
+        break_even_prob = (SL + 2 * self.bt_config.cost) / (SL + TP)
+        expected_pnl = TP * break_even_prob
+
         loss = (winrate / break_even_prob - 1) + (mean_pnl / expected_pnl - 1)
 
         return loss
 
+    def objective_grid(self, strategies: List[Callable], interval: int = 1, step: float = 0.5) -> pd.DataFrame:
+        """
+            Objective of every TP x SL pair of the search ranges for one set of strategies.
+            The entries do not depend on TP and SL in search mode, so the pairs are
+            evaluated on an ExcursionIndex of the entries instead of one backtest each.
+            Pairs with 50 trades or less get -inf, as in seaching_objective.
+        """
+        TP = np.arange(self.TP[0], self.TP[1] + step / 2, step)
+        SL = np.arange(self.SL[0], self.SL[1] + step / 2, step)
+
+        self._configure(
+            strategies=strategies,
+            TP=TP[0],
+            SL=SL[0],
+            slippage=self.slippage,
+            side=self.side,
+            mode=self.mode,
+            interval=interval
+        )
+
+        index = ExcursionIndex(self.bt, max_excursion=max(TP[-1], SL[-1]))
+        count, mean_pnl, winrate = index.grid(TP, SL)
+
+        with np.errstate(invalid="ignore", divide="ignore"):
+            loss = self._loss(mean_pnl, winrate, TP[:, None], SL[None, :])
+        loss[count <= 50] = float('-inf')
+
+        return pd.DataFrame(loss, index=pd.Index(TP, name="TP"), columns=pd.Index(SL, name="SL"))
+
     def seaching_objective(self, trial):
         TP = trial.suggest_float("TP", self.TP[0], self.TP[1], step=0.5)
         SL = trial.suggest_float("SL", self.SL[0], self.SL[1], step=0.5)
@@ -144,21 +194,19 @@ class Searching:
         assert self.bt is not None, "Backtesting environment must be _configured"
 
         try:
-            self.bt.run_backtest(name=trial.number)
+            self.bt.run_backtest(name=trial.number, lean=self.lean)
             history = self.bt.portfolio.history
 
             if len(history) <= 50:
                 return float('-inf')
 
-            balance = self.bt.data['balance']
-            equity = self.bt.data['equity']
-            
             os.makedirs(os.path.join(self._dir, str(trial.number)), exist_ok=True)
             
             # save the history, nav and equity
             history.to_csv(os.path.join(self._dir, str(trial.number), "history.csv"))
-            balance.to_csv(os.path.join(self._dir + '/' + str(trial.number), "balance.csv"))
-            equity.to_csv(os.path.join(self._dir + '/' + str(trial.number), "equity.csv"))
+            if not self.lean:
+                self.bt.balance.to_csv(os.path.join(self._dir + '/' + str(trial.number), "balance.csv"))
+                self.bt.equity.to_csv(os.path.join(self._dir + '/' + str(trial.number), "equity.csv"))
             params = {
                 "TP": TP,
                 "SL": SL,
@@ -166,7 +214,11 @@ class Searching:
                 "interval": interval
             }
 
-            loss = self.objective(history, TP, SL)
+            if self.lean:
+                stats = self.bt.trade_stats
+                loss = self._loss(stats["mean_pnl"], stats["winrate"], TP, SL)
+            else:
+                loss = self.objective(history, TP, SL)
 
             logging.info(f"Trial {trial.number} - Strategies: {selected_strategies}, TP: {TP}, SL: {SL} - Loss: {loss}")
 
@@ -185,13 +237,19 @@ class Searching:
             np.random.seed(42)
             random.seed(42)
             sampler = optuna.samplers.TPESampler(seed=42)
+            storage = "sqlite:///searching.db"
             study = optuna.create_study(sampler=sampler,
                                         direction='maximize',
                                         study_name=f"searching_{name}",
-                                        storage="sqlite:///searching.db", 
+                                        storage=storage, 
                                         load_if_exists=True)    
 
-            study.optimize(self.seaching_objective, n_trials=self.number_of_trials, n_jobs=self.n_jobs)
+            # Trials run in processes, threads would share self.bt and serialize on the GIL
+            if self.n_jobs > 1:
+                executor = TrialExecutor(self, "seaching_objective", n_jobs=self.n_jobs)
+                study = executor.optimize(study.study_name, storage, self.number_of_trials)
+            else:
+                study.optimize(self.seaching_objective, n_trials=self.number_of_trials)
 
             best_params = study.best_params
             best_params_str = "\n".join(f"{key}: {value}" for key, value in best_params.items())
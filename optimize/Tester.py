@@ -17,7 +17,7 @@ class Tester:
                  trial_num: int,
                  path: str,
                  dir: str = 'testing',
-                 data: pd.DataFrame = None,
+                 data: pd.DataFrame | TickStore = None,
                  cost: float = 0.25
                  ):
         
@@ -30,7 +30,7 @@ class Tester:
         os.makedirs(dir, exist_ok=True)
         initialize_logging(dir)
 
-        self.data: pd.DataFrame = data
+        self.data: TickStore = data if isinstance(data, TickStore) else TickStore(data)
         self.bt: Backtesting = None
         
         self.cost = cost
@@ -156,8 +156,8 @@ class Tester:
             # if len(history) == 0:
             #     return 0
 
-            balance = self.bt.data['balance']
-            equity = self.bt.data['equity']
+            balance = self.bt.balance
+            equity = self.bt.equity
             
             os.makedirs(os.path.join(self._dir, str(self.trial_num)), exist_ok=True)
             
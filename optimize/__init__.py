@@ -1,3 +1,4 @@
 from .Searcher import Searching
 from .Optimizer import Optimizer
-from .Tester import Tester
\ No newline at end of file
+from .Tester import Tester
+from .Executor import TrialExecutor
\ No newline at end of file
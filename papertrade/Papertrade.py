@@ -1,5 +1,65 @@
-class PaperTrade():
-    def __init__(self):
-        host = {
-            
-        }
\ No newline at end of file
+import time
+from typing import Callable, Iterator, List
+import logging
+
+import pandas as pd
+
+from backtest import BacktestConfig, StreamingBacktesting
+from utils import Downloader
+
+
+class PaperTrade(StreamingBacktesting):
+    """
+        Paper trading on live ticks, run as a streaming backtest.
+        - The ticks since `start` are replayed first, to warm the indicators up
+        - The database is then polled every `poll` seconds for the ticks after the last one
+          received, each poll being one chunk of StreamingBacktesting
+        - Bars and indicators are updated one bar at a time (utils.StreamingProcessor) and the
+          strategies read the last 20 bars from its RingBuffer, nothing is recomputed on the history
+        - Trades and curves are appended to the CSV files in `dir` as they happen
+        Runs until `until`, forever without it.
+    """
+    def __init__(self,
+                 strategy: List[Callable],
+                 config: BacktestConfig = None,
+                 start: str = None,
+                 until: str = None,
+                 poll: float = 5,
+                 ticker: str = "VN30F1M",
+                 downloader: Downloader = None,
+                 dir: str = 'papertrade'
+                 ):
+        assert start is not None, "Start of the warm-up must be provided"
+        super().__init__(strategy=strategy, chunks=None, config=config, search=False, dir=dir)
+
+        self.start = pd.Timestamp(start)
+        self.until = None if until is None else pd.Timestamp(until)
+        self.poll = poll
+        self.ticker = ticker
+        self.downloader = downloader or Downloader()
+        self.chunks = self._ticks()
+
+    @staticmethod
+    def _now() -> pd.Timestamp:
+        return pd.Timestamp.now()
+
+    def _ticks(self) -> Iterator[pd.DataFrame]:
+        """New ticks of every poll, from `start` to `until`."""
+        last, seen = self.start, 0
+        while True:
+            now = self._now()
+            ticks = self.downloader.get_historical_data(start_date=str(last), end_date=str(now), ticker=self.ticker)
+            if ticks is None:
+                logging.info("No ticks received")
+            else:
+                # Ticks at the time of the last one may arrive over several polls
+                ticks = ticks.loc[last:]
+                ticks = ticks.iloc[seen:] if len(ticks) and ticks.index[0] == last else ticks
+                if len(ticks):
+                    seen = int((ticks.index == ticks.index[-1]).sum()) + (seen if ticks.index[-1] == last else 0)
+                    last = ticks.index[-1]
+                    yield ticks
+
+            if self.until is not None and now >= self.until:
+                return
+            time.sleep(self.poll)
@@ -0,0 +1 @@
+from .Papertrade import PaperTrade
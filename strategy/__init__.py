@@ -1,2 +1,4 @@
 from .technical_indicator import *
-from .strategy_name import *
\ No newline at end of file
+from .strategy_name import *
+from .vectorized_indicator import vectorized_options, signal_matrix, combine_signals
+from .signal_tensor import SignalTensor
\ No newline at end of file
@@ -0,0 +1,105 @@
+"""
+    Signals of every strategy at every interval, built once and memory-mapped.
+    The bars of all intervals are stacked in one int8 (bars, strategies) array,
+    interval i owns rows offsets[i]:offsets[i + 1]. A manifest records the
+    strategies, intervals, offsets and the fingerprint of the data it was built from.
+"""
+import json
+import os
+from typing import Callable, Iterable, List
+
+import numpy as np
+import pandas as pd
+
+from utils.cache import fingerprint, processor_version, processed_bars
+from .strategy_name import strategy_options
+from .vectorized_indicator import signal_matrix, combine_signals
+
+
+class SignalTensor:
+    """
+        Read-only memory-mapped (interval x bar x strategy) signal tensor.
+        - build() computes and writes it, the constructor opens it without loading it
+        - matrix() gives the signal matrix of a set of strategies at an interval
+        - signals() combines them with the rules of Backtesting.generate_signals
+        Pickling keeps only the directory, workers reopen the files on their side.
+    """
+    def __init__(self, directory: str):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json")) as file:
+            self.manifest = json.load(file)
+
+        self.strategies = self.manifest["strategies"]
+        self.intervals = self.manifest["intervals"]
+        self.offsets = dict(zip(self.intervals, zip(self.manifest["offsets"][:-1], self.manifest["offsets"][1:])))
+        self._columns = {name: j for j, name in enumerate(self.strategies)}
+
+        self._signals = np.load(os.path.join(directory, "signals.npy"), mmap_mode="r")
+        self.times = np.load(os.path.join(directory, "times.npy"), mmap_mode="r")
+
+    def __getstate__(self):
+        return {"directory": self.directory}
+
+    def __setstate__(self, state):
+        self.__init__(state["directory"])
+
+    @classmethod
+    def build(cls,
+              data: pd.DataFrame,
+              directory: str,
+              intervals: Iterable[int] = range(1, 61),
+              strategies: List[Callable] = None) -> "SignalTensor":
+        """Compute the signals of `strategies` (all of strategy_options by default) at every interval."""
+        strategies = strategies or [function for _, function in strategy_options]
+        intervals = list(intervals)
+
+        blocks, times, offsets = [], [], [0]
+        for interval in intervals:
+            bars = processed_bars(data, interval)
+            blocks.append(signal_matrix(bars, strategies))
+            times.append(bars.index.values.astype("datetime64[ns]").view(np.int64))
+            offsets.append(offsets[-1] + len(bars))
+
+        assert all(block is not None for block in blocks), "Every strategy must have a vectorized form"
+
+        os.makedirs(directory, exist_ok=True)
+        np.save(os.path.join(directory, "signals.npy"), np.concatenate(blocks).astype(np.int8))
+        np.save(os.path.join(directory, "times.npy"), np.concatenate(times))
+
+        # The manifest is written last, it marks the tensor as complete
+        manifest = {
+            "fingerprint": fingerprint(data),
+            "processor": processor_version(),
+            "strategies": [function.__name__ for function in strategies],
+            "intervals": intervals,
+            "offsets": offsets
+        }
+        with open(os.path.join(directory, "manifest.json"), "w") as file:
+            json.dump(manifest, file)
+
+        return cls(directory)
+
+    def matches(self, data: pd.DataFrame) -> bool:
+        """Whether the tensor was built from `data` with the current indicator pipeline."""
+        return (
+            self.manifest["fingerprint"] == fingerprint(data)
+            and self.manifest["processor"] == processor_version()
+        )
+
+    def covers(self, interval: int, strategies: List[Callable]) -> bool:
+        return interval in self.offsets and all(strategy.__name__ in self._columns for strategy in strategies)
+
+    def bar_times(self, interval: int) -> np.ndarray:
+        """Bar times of `interval` as int64 epoch nanoseconds."""
+        start, end = self.offsets[interval]
+        return self.times[start:end]
+
+    def matrix(self, interval: int, strategies: List[Callable]) -> np.ndarray:
+        """Signals of `strategies` at every bar of `interval`, shape (bars, strategies)."""
+        start, end = self.offsets[interval]
+        columns = [self._columns[strategy.__name__] for strategy in strategies]
+        return np.asarray(self._signals[start:end][:, columns])
+
+    def signals(self, interval: int, strategies: List[Callable], min_signals: int, side: str = None) -> np.ndarray:
+        """Combined signal of every bar of `interval`."""
+        return combine_signals(self.matrix(interval, strategies), min_signals, side)
@@ -1,7 +1,17 @@
 import pandas as pd
 import numpy as np
 
+
+def uses(*columns):
+    """Declare the columns of processor a strategy reads, so only those are computed."""
+    def decorate(function):
+        function.columns = columns
+        return function
+    return decorate
+
+
 # Relative Strength Index
+@uses('rsi_5', 'rsi_14', 'rsi_30')
 def RSI(df) -> int:
     rsi_5 = df['rsi_5'].iloc[-1]
     rsi_14 = df['rsi_14'].iloc[-1]
@@ -25,6 +35,7 @@ def RSI(df) -> int:
     return 0
 
 # Bollinger Bands
+@uses('upper_band', 'lower_band', 'close', 'ma20')
 def BBL(df) -> int:
     upper_bands = df['upper_band'].iloc[-1]
     lower_bands = df['lower_band'].iloc[-1]
@@ -38,6 +49,7 @@ def BBL(df) -> int:
     return upper_bands_cross - lower_bands_cross
 
 # 1 MACD
+@uses('macd_hist')
 def MACD(df) -> int:
     histogram = df['macd_hist'].iloc[-1]
     prev_histogram = df['macd_hist'].iloc[-2]
@@ -49,6 +61,7 @@ def MACD(df) -> int:
     return histogram_cross - histogram_cross_down
 
 # 2 VWAP
+@uses('vwap', 'close')
 def VWAP(df) -> int:
     vwap = df['vwap'].iloc[-1]
     close = df['close'].iloc[-1]
@@ -63,6 +76,7 @@ def VWAP(df) -> int:
     return vwap_cross - vwap_cross_down
 
 # 3 MA5
+@uses('ma5', 'ma20')
 def MA5(df):
     ma5= df['ma5'].iloc[-1]
     ma20 = df['ma20'].iloc[-1]
@@ -86,6 +100,7 @@ def MA5(df):
     return 0
 
 # 4 MA20
+@uses('ma20', 'ma50')
 def MA20(df):
     ma20 = df['ma20'].iloc[-1]
     ma50 = df['ma50'].iloc[-1]
@@ -109,6 +124,7 @@ def MA20(df):
     return 0
 
 # 5 PPO
+@uses('ppo')
 def PPO(df) -> int:
     ppo = df['ppo'].iloc[-1]
 
@@ -121,6 +137,7 @@ def PPO(df) -> int:
     return long - short
 
 # 6 ROC
+@uses('roc')
 def ROC(df) -> int:
     roc = df['roc'].iloc[-1]
     prev_roc = df['roc'].iloc[-2]
@@ -141,6 +158,7 @@ def ROC(df) -> int:
     return 0
 
 # 7 TSI
+@uses('tsi')
 def TSI(df) -> int:
     tsi = df['tsi'].iloc[-1]
     prev_tsi = df['tsi'].iloc[-2]
@@ -161,6 +179,7 @@ def TSI(df) -> int:
     return 0
 
 # 8 ATR
+@uses('atr', 'close')
 def ATR(df) -> int:
     atr = df['atr'].iloc[-1]
     close = df['close'].iloc[-1]
@@ -175,6 +194,7 @@ def ATR(df) -> int:
     return atr_cross - atr_cross_down
 
 # 9 ADX
+@uses('adx', 'di_plus', 'di_minus')
 def ADX(df) -> int:
     adx = df['adx'].iloc[-1]
     di_plus = df['di_plus'].iloc[-1]
@@ -202,6 +222,7 @@ def ADX(df) -> int:
     return 0
 
 # 10 CCI
+@uses('cci')
 def CCI(df) -> int:
     cci = df['cci'].iloc[-1]
 
@@ -212,6 +233,7 @@ def CCI(df) -> int:
     return cci_cross - cci_cross_down
 
 # 11 Momentum
+@uses('ma5', 'ma20', 'ma50', 'macd_hist')
 def Momentum(df) -> int:
     
     ma20 = df['ma20'].iloc[-1]
@@ -231,6 +253,7 @@ def Momentum(df) -> int:
     return 0
 
 # 12 Volume_MA
+@uses('volume_ma5', 'volume_ma10')
 def Volume_MA(df) -> int:
     volume_ma5 = df['volume_ma5'].iloc[-1]
     volume_ma10 = df['volume_ma10'].iloc[-1]
@@ -245,6 +268,7 @@ def Volume_MA(df) -> int:
     return volume_ma5_cross - volume_ma5_cross_down
 
 # 13 MomentumBBL
+@uses('upper_band', 'lower_band', 'close', 'macd_hist')
 def MomentumBBL(df) -> int:
     
     bl_up = df['upper_band'].iloc[-5:]
@@ -265,6 +289,7 @@ def MomentumBBL(df) -> int:
     return 0
 
 # 14 CHOP
+@uses('stoch_k', 'stoch_d')
 def SO(df) -> int:
     k = df['stoch_k'].iloc[-1]
     d = df['stoch_d'].iloc[-1]
@@ -276,6 +301,7 @@ def SO(df) -> int:
     return so_cross - so_cross_down
 
 # 15 Williams R
+@uses('williams_r')
 def W_R(df) -> int:
     wr = df['williams_r'].iloc[-1]
 
@@ -286,6 +312,7 @@ def W_R(df) -> int:
     return wr_cross - wr_cross_down
 
 # 16 PSAR
+@uses('psar', 'close')
 def PSAR(df) -> int:
     psar = df['psar'].iloc[-1]
     close = df['close'].iloc[-1]
@@ -297,6 +324,7 @@ def PSAR(df) -> int:
     return psar_cross - psar_cross_down
 
 # 17 OBV
+@uses('obv')
 def OBV(df) -> int:
     obv = df['obv'].iloc[-1]
     prev_obv = df['obv'].iloc[-2]
@@ -308,6 +336,7 @@ def OBV(df) -> int:
     return obv_cross - obv_cross_down
 
 # 18 Donchian
+@uses('donchian_hband', 'donchian_lband', 'close')
 def Donchian(df) -> int:
     upper = df['donchian_hband'].iloc[-1]
     lower = df['donchian_lband'].iloc[-1]
@@ -320,6 +349,7 @@ def Donchian(df) -> int:
     return donchian_cross - donchian_cross_down
 
 # 19 Keltner
+@uses('keltner_hband', 'keltner_lband', 'close')
 def Keltner(df) -> int:
     upper = df['keltner_hband'].iloc[-1]
     lower = df['keltner_lband'].iloc[-1]
@@ -332,6 +362,7 @@ def Keltner(df) -> int:
     return keltner_cross - keltner_cross_down
 
 # 22 UO
+@uses('uo')
 def UO(df) -> int:
     uo = df['uo'].iloc[-1]
 
@@ -342,6 +373,7 @@ def UO(df) -> int:
     return uo_cross - uo_cross_down
 
 # 23 Force Index
+@uses('force_index')
 def FI(df) -> int:
     fi = df['force_index'].iloc[-1]
     prev_fi = df['force_index'].iloc[-2]
@@ -353,6 +385,7 @@ def FI(df) -> int:
     return fi_cross - fi_cross_down
 
 # 24 Vortex
+@uses('vi_plus', 'vi_minus')
 def Vortex(df) -> int:
     vi_plus = df['vi_plus'].iloc[-1]
     vi_minus = df['vi_minus'].iloc[-1]
@@ -0,0 +1,237 @@
+"""
+    Vectorized form of every trading rule in technical_indicator.
+    Each function takes the whole processed DataFrame and returns the signal
+    of the rule for every bar at once as an int8 array, where bar i gets the
+    value the scalar rule returns on a window ending at bar i.
+"""
+import pandas as pd
+import numpy as np
+from typing import Callable, List
+
+from .technical_indicator import *
+
+def _curr(df, column) -> np.ndarray:
+    return df[column].to_numpy(dtype=float)
+
+def _prev(df, column) -> np.ndarray:
+    values = np.empty(len(df))
+    values[:1] = np.nan
+    values[1:] = df[column].to_numpy(dtype=float)[:-1]
+    return values
+
+def _signal(long, short) -> np.ndarray:
+    return np.where(long, 1, np.where(short, -1, 0)).astype(np.int8)
+
+def _diff(up, down) -> np.ndarray:
+    return (up.astype(np.int8) - down.astype(np.int8)).astype(np.int8)
+
+# Relative Strength Index
+def RSI_vectorized(df) -> np.ndarray:
+    rsi_5, rsi_14, rsi_30 = _curr(df, 'rsi_5'), _curr(df, 'rsi_14'), _curr(df, 'rsi_30')
+
+    long = (rsi_5 > rsi_14) & (rsi_14 > rsi_30) & (rsi_14 > 50)
+    short = (rsi_5 < rsi_14) & (rsi_14 < rsi_30) & (rsi_14 < 50)
+
+    return _signal(long, short)
+
+# Bollinger Bands
+def BBL_vectorized(df) -> np.ndarray:
+    close = _curr(df, 'close')
+    return _diff(close > _curr(df, 'upper_band'), close < _curr(df, 'lower_band'))
+
+# 1 MACD
+def MACD_vectorized(df) -> np.ndarray:
+    histogram, prev_histogram = _curr(df, 'macd_hist'), _prev(df, 'macd_hist')
+    return _diff((histogram > 0) & (prev_histogram < 0), (histogram < 0) & (prev_histogram > 0))
+
+# 2 VWAP
+def VWAP_vectorized(df) -> np.ndarray:
+    vwap, prev_vwap = _curr(df, 'vwap'), _prev(df, 'vwap')
+    close, prev_close = _curr(df, 'close'), _prev(df, 'close')
+
+    return _diff((close > vwap) & (prev_close < prev_vwap), (close < vwap) & (prev_close > prev_vwap))
+
+def _cross(df, fast, slow) -> np.ndarray:
+    curr_fast, curr_slow = _curr(df, fast), _curr(df, slow)
+    prev_fast, prev_slow = _prev(df, fast), _prev(df, slow)
+
+    long = (curr_fast > curr_slow) & (prev_fast < prev_slow)
+    short = (curr_fast < curr_slow) & (prev_fast > prev_slow)
+
+    return _signal(long, short)
+
+def _zero_cross(df, column) -> np.ndarray:
+    curr, prev = _curr(df, column), _prev(df, column)
+    return _signal((curr > 0) & (prev < 0), (curr < 0) & (prev > 0))
+
+# 3 MA5
+def MA5_vectorized(df) -> np.ndarray:
+    return _cross(df, 'ma5', 'ma20')
+
+# 4 MA20
+def MA20_vectorized(df) -> np.ndarray:
+    return _cross(df, 'ma20', 'ma50')
+
+# 5 PPO
+def PPO_vectorized(df) -> np.ndarray:
+    return _zero_cross(df, 'ppo')
+
+# 6 ROC
+def ROC_vectorized(df) -> np.ndarray:
+    return _zero_cross(df, 'roc')
+
+# 7 TSI
+def TSI_vectorized(df) -> np.ndarray:
+    return _zero_cross(df, 'tsi')
+
+# 8 ATR
+def ATR_vectorized(df) -> np.ndarray:
+    close, atr = _curr(df, 'close'), _curr(df, 'atr')
+    return _diff(close > atr, close < atr)
+
+# 9 ADX
+def ADX_vectorized(df) -> np.ndarray:
+    adx, di_plus, di_minus = _curr(df, 'adx'), _curr(df, 'di_plus'), _curr(df, 'di_minus')
+
+    long = (adx > 25).astype(int) + (di_plus > di_minus).astype(int) + (di_minus > di_plus).astype(int) == 3
+    short = (adx < 25).astype(int) + (di_plus < di_minus).astype(int) + (di_minus < di_plus).astype(int) == 3
+
+    return _signal(long, short)
+
+# 10 CCI
+def CCI_vectorized(df) -> np.ndarray:
+    cci = _curr(df, 'cci')
+    return _diff(cci > 100, cci < -100)
+
+# 11 Momentum
+def Momentum_vectorized(df) -> np.ndarray:
+    ma20, ma50 = _curr(df, 'ma20'), _curr(df, 'ma50')
+    histogram, prev_histogram = _curr(df, 'macd_hist'), _prev(df, 'macd_hist')
+
+    trend = _diff(ma20 > ma50, ma20 < ma50)
+    signal = MA5_vectorized(df)
+
+    long = (trend == 1) & (histogram > prev_histogram) & (signal == 1)
+    short = (trend == -1) & (histogram < prev_histogram) & (signal == -1)
+
+    return _signal(long, short)
+
+# 12 Volume_MA
+def Volume_MA_vectorized(df) -> np.ndarray:
+    return _cross(df, 'volume_ma5', 'volume_ma10')
+
+# 13 MomentumBBL
+def MomentumBBL_vectorized(df) -> np.ndarray:
+    close = _curr(df, 'close')
+    bl = _diff(close > _curr(df, 'upper_band'), close < _curr(df, 'lower_band')).astype(int)
+
+    # Sum of the band signal over the last 5 bars
+    cumsum = np.concatenate([[0], np.cumsum(bl)])
+    start = np.maximum(np.arange(len(bl)) - 4, 0)
+    bl_sum = cumsum[1:] - cumsum[start]
+
+    histogram, prev_histogram = _curr(df, 'macd_hist'), _prev(df, 'macd_hist')
+
+    return _signal((bl_sum > 0) & (histogram > prev_histogram), (bl_sum < 0) & (histogram < prev_histogram))
+
+# 14 CHOP
+def SO_vectorized(df) -> np.ndarray:
+    k, d = _curr(df, 'stoch_k'), _curr(df, 'stoch_d')
+    return _diff(k > d, k < d)
+
+# 15 Williams R
+def W_R_vectorized(df) -> np.ndarray:
+    wr = _curr(df, 'williams_r')
+    return _diff(wr < -20, wr > -80)
+
+# 16 PSAR
+def PSAR_vectorized(df) -> np.ndarray:
+    close, psar = _curr(df, 'close'), _curr(df, 'psar')
+    return _diff(close > psar, close < psar)
+
+# 17 OBV
+def OBV_vectorized(df) -> np.ndarray:
+    obv, prev_obv = _curr(df, 'obv'), _prev(df, 'obv')
+    return _diff(obv > prev_obv, obv < prev_obv)
+
+# 18 Donchian
+def Donchian_vectorized(df) -> np.ndarray:
+    close = _curr(df, 'close')
+    return _diff(close > _curr(df, 'donchian_hband'), close < _curr(df, 'donchian_lband'))
+
+# 19 Keltner
+def Keltner_vectorized(df) -> np.ndarray:
+    close = _curr(df, 'close')
+    return _diff(close > _curr(df, 'keltner_hband'), close < _curr(df, 'keltner_lband'))
+
+# 22 UO
+def UO_vectorized(df) -> np.ndarray:
+    uo = _curr(df, 'uo')
+    return _diff(uo > 50, uo < 50)
+
+# 23 Force Index
+def FI_vectorized(df) -> np.ndarray:
+    return _zero_cross(df, 'force_index')
+
+# 24 Vortex
+def Vortex_vectorized(df) -> np.ndarray:
+    vi_plus, vi_minus = _curr(df, 'vi_plus'), _curr(df, 'vi_minus')
+    return _diff(vi_plus > vi_minus, vi_plus < vi_minus)
+
+
+vectorized_options = {
+    RSI: RSI_vectorized,
+    BBL: BBL_vectorized,
+    MACD: MACD_vectorized,
+    VWAP: VWAP_vectorized,
+    MA5: MA5_vectorized,
+    MA20: MA20_vectorized,
+    PPO: PPO_vectorized,
+    ROC: ROC_vectorized,
+    TSI: TSI_vectorized,
+    ATR: ATR_vectorized,
+    ADX: ADX_vectorized,
+    CCI: CCI_vectorized,
+    Momentum: Momentum_vectorized,
+    Volume_MA: Volume_MA_vectorized,
+    MomentumBBL: MomentumBBL_vectorized,
+    Keltner: Keltner_vectorized,
+    SO: SO_vectorized,
+    W_R: W_R_vectorized,
+    PSAR: PSAR_vectorized,
+    OBV: OBV_vectorized,
+    Donchian: Donchian_vectorized,
+    UO: UO_vectorized,
+    FI: FI_vectorized,
+    Vortex: Vortex_vectorized
+}
+
+def signal_matrix(df: pd.DataFrame, strategies: List[Callable]) -> np.ndarray:
+    """
+        Signals of `strategies` for every bar of `df`, shape (bars, strategies).
+        Returns None when a strategy has no vectorized form.
+    """
+    if any(strategy not in vectorized_options for strategy in strategies):
+        return None
+
+    matrix = np.zeros((len(df), len(strategies)), dtype=np.int8)
+    for j, strategy in enumerate(strategies):
+        matrix[:, j] = vectorized_options[strategy](df)
+    return matrix
+
+def combine_signals(matrix: np.ndarray, min_signals: int, side: str = None) -> np.ndarray:
+    """
+        Combined signal of every bar, following the rules of Backtesting.generate_signals:
+        - no signal when the absolute sum of the signals is below min_signals
+        - conflicting signals cancel out
+        - the side filter keeps only long or short signals
+    """
+    total = matrix.sum(axis=1, dtype=np.int64)
+    signals = (matrix == 1).any(axis=1).astype(np.int8) - (matrix == -1).any(axis=1).astype(np.int8)
+    signals[np.abs(total) < min_signals] = 0
+
+    if side == 'long':
+        signals[signals < 0] = 0
+    elif side == 'short':
+        signals[signals > 0] = 0
+    return signals.astype(np.int8)
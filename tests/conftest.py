@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+
+def make_ticks(days: int = 3, seed: int = 0, per_day: int = 1500) -> pd.DataFrame:
+    """
+        Synthetic VN30F ticks on the 0.1 point grid, spread over the morning
+        and afternoon sessions, with a few missing bid/ask quotes.
+    """
+    rng = np.random.default_rng(seed)
+    index = []
+    for day in pd.bdate_range("2023-03-01", periods=days):
+        morning = rng.uniform(0, 2.25 * 3600, per_day // 2)
+        afternoon = rng.uniform(0, 1.5 * 3600, per_day // 2)
+        index.extend(np.sort(np.concatenate([
+            day + pd.Timedelta("9h") + pd.to_timedelta(morning, "s"),
+            day + pd.Timedelta("13h") + pd.to_timedelta(afternoon, "s")
+        ])))
+
+    n = len(index)
+    steps = rng.choice([-0.1, 0, 0, 0.1], size=n) * rng.integers(1, 6, size=n)
+    price = np.round(1200 + np.cumsum(steps), 1)
+    bid = np.round(price - rng.choice([0, 0.1], size=n), 1)
+    ask = np.round(bid + rng.choice([0.1, 0.2, 0.3], size=n), 1)
+    bid[rng.random(n) < 0.02] = np.nan
+    ask[rng.random(n) < 0.02] = np.nan
+    volume = np.cumsum(rng.integers(1, 50, size=n)).astype(float)
+
+    return pd.DataFrame(
+        {"price": price, "bid_price": bid, "ask_price": ask, "volume": volume},
+        index=pd.DatetimeIndex(index, name="datetime")
+    )
+
+
+@pytest.fixture(scope="session")
+def tick_data() -> pd.DataFrame:
+    return make_ticks()
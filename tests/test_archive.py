@@ -0,0 +1,132 @@
+import json
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import TickArchive
+from utils.archive import encodable
+
+from .conftest import make_ticks
+
+DAYS = pd.DatetimeIndex(["2023-03-01", "2023-03-02", "2023-03-03"])
+
+
+@pytest.fixture(scope="module")
+def ticks():
+    """Three days of ticks, with missing prices and volumes on top of the missing quotes."""
+    data = make_ticks(days=3, seed=2, per_day=600)
+    rng = np.random.default_rng(2)
+    data.loc[rng.random(len(data)) < 0.02, "price"] = np.nan
+    data.loc[rng.random(len(data)) < 0.02, "volume"] = np.nan
+    return data
+
+
+@pytest.fixture
+def archive(tmp_path, ticks):
+    archive = TickArchive(str(tmp_path))
+    archive.write(ticks)
+    return archive
+
+
+def test_round_trip(archive, ticks):
+    assert list(archive.days) == list(DAYS)
+    assert sum(archive.rows(day) for day in DAYS) == len(ticks)
+    pd.testing.assert_frame_equal(archive.read(), ticks, check_exact=True)
+
+    # Compact read-only partitions, missing values as the largest value of the dtype
+    for day, columns in archive.partitions():
+        assert {name: columns[name].dtype for name in TickArchive.COLUMNS} == {name: np.dtype(dtype) for name, dtype in TickArchive.COLUMNS.items()}
+        assert not any(array.flags.writeable for array in columns.values())
+        assert (columns["volume"] == np.iinfo(np.uint32).max).sum() == ticks.loc[day.strftime("%Y-%m-%d"), "volume"].isna().sum()
+
+    pd.testing.assert_frame_equal(pd.concat(archive.chunks()), ticks, check_exact=True)
+
+
+def test_replaces_stored_day(archive, ticks, tmp_path):
+    day = ticks.loc["2023-03-02"]
+    archive.write(day.iloc[::3])
+
+    assert archive.rows("2023-03-02") == len(day.iloc[::3])
+    pd.testing.assert_frame_equal(archive.read("2023-03-02", "2023-03-02"), day.iloc[::3], check_exact=True)
+    pd.testing.assert_frame_equal(archive.read("2023-03-03", "2023-03-03"), ticks.loc["2023-03-03"], check_exact=True)
+
+    # No temporary partitions are left, and a new reader sees the same days
+    assert sorted(os.listdir(os.path.join(str(tmp_path), "VN30F1M"))) == ["2023-03-01", "2023-03-02", "2023-03-03", "index.json"]
+    reopened = TickArchive(str(tmp_path))
+    assert [reopened.rows(day) for day in DAYS] == [archive.rows(day) for day in DAYS]
+
+    archive.remove("2023-03-02")
+    assert "2023-03-02" not in archive and list(archive.select()) == [DAYS[0], DAYS[2]]
+
+
+@pytest.mark.parametrize("start, end, expected", [
+    (None, None, DAYS),
+    ("2023-03-02", None, DAYS[1:]),
+    (None, "2023-03-02", DAYS[:2]),
+    ("2023-03-02", "2023-03-02", DAYS[1:2]),
+    # Times within a day select the whole day
+    ("2023-03-01 14:00", "2023-03-02 09:00", DAYS[:2]),
+    ("2023-02-01", "2023-03-01", DAYS[:1]),
+    ("2023-03-04", "2023-03-10", DAYS[:0]),
+])
+def test_select_bounds(archive, ticks, start, end, expected):
+    assert list(archive.select(start, end)) == list(expected)
+
+    data = archive.read(start, end)
+    assert list(data.columns) == list(TickArchive.COLUMNS)
+    assert (data.dtypes == np.float64).all()
+    pd.testing.assert_frame_equal(data, ticks[ticks.index.normalize().isin(expected)], check_exact=True)
+
+
+@pytest.mark.parametrize("name, value", [
+    ("price", 1200.05),
+    ("bid_price", 1200.01),
+    ("volume", 1.5),
+    ("volume", -1.0),
+    ("volume", float(np.iinfo(np.uint32).max)),
+    ("price", 3e8),
+])
+def test_rejects_unencodable(tmp_path, ticks, name, value):
+    data = ticks.loc["2023-03-01"].copy()
+    data.iloc[10, data.columns.get_loc(name)] = value
+
+    archive = TickArchive(str(tmp_path))
+    with pytest.raises(AssertionError):
+        archive.write(data)
+    assert len(archive) == 0
+
+
+def test_encodable():
+    assert encodable(np.array([1200.0, 1200.1, np.nan, -0.3]), np.int32, 10)
+    assert not encodable(np.array([1200.0, 1200.15]), np.int32, 10)
+    assert encodable(np.array([1200.15]), np.float64, 10)
+    assert encodable(np.array([np.iinfo(np.uint32).max - 1.0]), np.uint32, 1)
+    assert not encodable(np.array([np.iinfo(np.uint32).max]), np.uint32, 1)
+
+
+def test_reads_float64_archive(tmp_path, ticks):
+    # Written by hand in the layout of archives older than the compact dtypes
+    directory = os.path.join(str(tmp_path), "VN30F1M")
+    days = {}
+    for day in DAYS[:2]:
+        data = ticks.loc[day.strftime("%Y-%m-%d")]
+        os.makedirs(os.path.join(directory, day.strftime("%Y-%m-%d")))
+        np.save(os.path.join(directory, day.strftime("%Y-%m-%d"), "datetime.npy"), data.index.values.view(np.int64))
+        for name in TickArchive.COLUMNS:
+            np.save(os.path.join(directory, day.strftime("%Y-%m-%d"), f"{name}.npy"), data[name].to_numpy())
+        days[day.strftime("%Y-%m-%d")] = len(data)
+    with open(os.path.join(directory, "index.json"), "w") as file:
+        json.dump({"columns": {name: "float64" for name in TickArchive.COLUMNS}, "days": days}, file)
+
+    archive = TickArchive(str(tmp_path))
+    assert set(archive.dtypes.values()) == {np.dtype(np.float64)}
+    pd.testing.assert_frame_equal(archive.read(), ticks.loc[:"2023-03-02"], check_exact=True)
+
+    # Later days are stored in the format of the archive, off-grid prices included
+    last = ticks.loc["2023-03-03"].copy()
+    last.iloc[0, 0] = 1200.05
+    archive.write(last)
+    assert archive.arrays()["price"].dtype == np.float64
+    pd.testing.assert_frame_equal(archive.read("2023-03-03"), last, check_exact=True)
@@ -0,0 +1,131 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import BacktestConfig, Backtesting
+from strategy import strategy_options
+from utils import TickStore
+
+from .conftest import make_ticks
+
+CASES = {
+    "search_long": dict(
+        search=True, strategies=["ATR", "SO", "Vortex", "PSAR", "UO"],
+        config=dict(TP=3, SL=2, position_size=1, max_pos=10e9, side="long", min_signals=2, initial_balance=10e19, interval=1)
+    ),
+    "search_short": dict(
+        search=True, strategies=["SO", "Vortex", "PSAR", "UO", "CCI"],
+        config=dict(TP=2.5, SL=1.5, position_size=1, max_pos=10e9, side="short", min_signals=2, initial_balance=10e19, interval=2, timeout=5)
+    ),
+    "sized": dict(
+        search=False, strategies=["ATR", "SO", "Vortex", "PSAR", "UO", "OBV"],
+        config=dict(TP=4, SL=2, position_size=0.3, max_pos=5, side="long", min_signals=2, initial_balance=5000, interval=3)
+    ),
+    "liquidated": dict(
+        search=False, strategies=["SO", "Vortex", "PSAR", "UO", "CCI"],
+        config=dict(TP=40, SL=40, position_size=0.9, max_pos=4, side="short", min_signals=2, initial_balance=1000, interval=2)
+    ),
+    "hedged": dict(
+        search=False, strategies=["ATR", "SO", "Williams R", "PSAR", "UO", "OBV"],
+        config=dict(TP=3, SL=3, position_size=0.2, max_pos=4, mode="hedged", min_signals=2, initial_balance=3000, interval=4)
+    ),
+}
+
+
+@pytest.fixture(scope="module")
+def data():
+    return make_ticks(days=4, seed=1)
+
+
+@pytest.fixture(scope="module")
+def repeated(data):
+    """Ticks repeating the price, quotes and volume of an earlier tick, in runs of 5 ticks on average."""
+    rng = np.random.default_rng(1)
+    first = np.maximum.accumulate(np.where(rng.random(len(data)) < 0.2, np.arange(len(data)), 0))
+    return pd.DataFrame(data.to_numpy()[first], index=data.index, columns=data.columns)
+
+
+def make_backtest(case, data, store=False, **config) -> Backtesting:
+    case = CASES[case]
+    strategies = [function for name, function in strategy_options if name in case["strategies"]]
+    config = BacktestConfig(**{"cost": 0.25, "slippage": 0.47, "margin": 0.25, **case["config"], **config})
+    return Backtesting(strategies, TickStore(data) if store else data.copy(), config, search=case["search"])
+
+
+def run(case, data, store=False, **kwargs) -> Backtesting:
+    bt = make_backtest(case, data, store)
+    bt.run_backtest(**kwargs)
+    return bt
+
+
+def assert_same_run(result, expected):
+    """Same trades, final balance and balance/equity curves."""
+    pd.testing.assert_frame_equal(result.portfolio.history, expected.portfolio.history, check_exact=True)
+    assert result.portfolio.balance == expected.portfolio.balance
+    pd.testing.assert_series_equal(result.balance, expected.balance, check_exact=True)
+    pd.testing.assert_series_equal(result.equity, expected.equity, check_exact=True)
+
+
+@pytest.mark.parametrize("store", [False, True])
+@pytest.mark.parametrize("case", CASES)
+def test_events_match_ticks(data, case, store):
+    assert_same_run(run(case, data, store, event_driven=True), run(case, data, store))
+
+
+@pytest.mark.parametrize("event_driven", [False, True])
+@pytest.mark.parametrize("case", ["search_long", "search_short"])
+def test_shards_match_serial(data, case, event_driven):
+    bt = make_backtest(case, data)
+    assert bt._shardable()
+    assert len(bt._shard_starts(bt._prepare_ticks(), 3)) > 1
+
+    sharded = make_backtest(case, data)
+    sharded.run_backtest(n_jobs=3, event_driven=event_driven)
+    assert_same_run(sharded, run(case, data))
+
+
+def test_binding_capital_runs_serially(data):
+    bt = make_backtest("search_long", data, initial_balance=1000)
+    assert not bt._shardable()
+    bt.run_backtest(n_jobs=3)
+
+    expected = make_backtest("search_long", data, initial_balance=1000)
+    expected.run_backtest()
+    assert_same_run(bt, expected)
+
+
+@pytest.mark.parametrize("store", [False, True])
+@pytest.mark.parametrize("case", CASES)
+def test_compressed_matches_ticks(repeated, case, store):
+    bt = make_backtest(case, repeated, store)
+    n_ticks = bt._prepare_ticks()
+    assert len(bt._tick_runs(n_ticks)[0]) < n_ticks / 2
+
+    assert_same_run(run(case, repeated, store, compressed=True), run(case, repeated, store))
+
+
+@pytest.mark.parametrize("store", [False, True])
+@pytest.mark.parametrize("case", ["search_long", "search_short"])
+def test_lean_matches_trades(data, case, store):
+    bt = run(case, data, store, lean=True)
+    expected = run(case, data, store)
+
+    pd.testing.assert_frame_equal(bt.portfolio.history, expected.portfolio.history, check_exact=True)
+    pnl = expected.portfolio.history["pnl"]
+    assert bt.trade_stats == {"trades": len(pnl), "winrate": (pnl > 0).mean(), "mean_pnl": pnl.mean()}
+    assert (bt.balance == bt.config.initial_balance).all()
+
+
+@pytest.mark.parametrize("config", [
+    {"initial_balance": 1000},
+    {"position_size": 0.5},
+    {"max_pos": 5},
+])
+def test_lean_refuses_binding_capital(data, config):
+    with pytest.raises(AssertionError):
+        make_backtest("search_long", data, **config).run_backtest(lean=True)
+
+
+def test_lean_requires_search(data):
+    with pytest.raises(AssertionError):
+        run("sized", data, lean=True)
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import BarPyramid
+
+from .conftest import make_ticks
+
+
+def resampled(data, interval):
+    bars = data.resample(f"{interval}min").agg({"price": "ohlc", "volume": "sum"}).dropna()
+    bars.columns = ["open", "high", "low", "close", "volume"]
+    return bars
+
+
+def test_unpriced_minute_volume():
+    data = pd.DataFrame(
+        {"price": [1200, np.nan, 1201], "volume": [1.0, 5.0, 2.0]},
+        index=pd.DatetimeIndex(["2023-03-01 09:15", "2023-03-01 09:16", "2023-03-01 09:17"], name="datetime")
+    )
+    assert BarPyramid(data).bars(5)["volume"].tolist() == [8.0]
+
+
+@pytest.mark.parametrize("seed", range(3))
+@pytest.mark.parametrize("interval", [1, 2, 5, 7, 15, 60])
+def test_matches_resample(seed, interval):
+    rng = np.random.default_rng(seed)
+    data = make_ticks(days=3, seed=seed)
+    data.loc[rng.random(len(data)) < 0.2, "price"] = np.nan
+    data["volume"] = rng.integers(0, 30, len(data)).astype(float)
+
+    pd.testing.assert_frame_equal(BarPyramid(data).bars(interval), resampled(data, interval), check_freq=False)
@@ -0,0 +1,48 @@
+import pandas as pd
+import pytest
+
+from backtest import BacktestConfig, Backtesting, BatchBacktesting
+from strategy import strategy_options
+from utils import TickStore
+
+from .conftest import make_ticks
+
+STRATEGIES = [function for name, function in strategy_options if name in ["SO", "Vortex", "PSAR", "UO", "CCI"]]
+
+BASE = dict(cost=0.25, slippage=0.47, margin=0.25, side="long", min_signals=2, interval=2)
+VARIANTS = [
+    dict(TP=40, SL=40, max_pos=4, position_size=0.9, initial_balance=1300),
+    dict(TP=4, SL=2, max_pos=5, position_size=0.3, initial_balance=5000),
+    dict(TP=3, SL=3, max_pos=2, position_size=0.5, initial_balance=900, timeout=5),
+    dict(TP=40, SL=40, max_pos=4, position_size=0.9, initial_balance=400),
+    # Runs out of buying power after its first trades
+    dict(TP=5, SL=5, max_pos=4, position_size=0.9, initial_balance=300),
+    dict(TP=2, SL=1.5, max_pos=10e9, position_size=1, initial_balance=10e19),
+]
+
+
+@pytest.fixture(scope="module")
+def data():
+    return make_ticks(days=4, seed=2)
+
+
+@pytest.mark.parametrize("store", [False, True])
+def test_matches_single_runs(data, store):
+    configs = [BacktestConfig(**BASE, **variant) for variant in VARIANTS]
+    batch = BatchBacktesting(STRATEGIES, TickStore(data) if store else data.copy(), configs)
+    batch.run_backtest()
+
+    finished = []
+    for k, config in enumerate(configs):
+        bt = Backtesting(STRATEGIES, TickStore(data) if store else data.copy(), config)
+        bt.run_backtest()
+        # Runs out of buying power: trades, then curves left at the initial balance
+        finished.append(len(bt.portfolio.history) == 0 or not (bt.balance == config.initial_balance).all())
+
+        pd.testing.assert_frame_equal(batch.histories[k], bt.portfolio.history, check_exact=True)
+
+        # A DataFrame run that stops early keeps the integer initial balance column
+        pd.testing.assert_series_equal(batch.balances[k], bt.balance, check_exact=True, check_dtype=False)
+        pd.testing.assert_series_equal(batch.equities[k], bt.equity, check_exact=True, check_dtype=False)
+
+    assert not all(finished)
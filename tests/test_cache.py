@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import FrameCache, processed_bars
+from utils import cache as cache_module
+from utils.cache import fingerprint
+
+
+def make_frame(k, rows=100):
+    index = pd.date_range("2023-03-01 09:15", periods=rows, freq="min", name="datetime")
+    return pd.DataFrame({"close": np.arange(rows) + k * 1000.0, "RSI": np.linspace(0, 100, rows) + k}, index=index)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    # Room for two frames of 100 rows in memory
+    return FrameCache(budget=2 * 2400 + 1, directory=str(tmp_path))
+
+
+def test_evicts_least_recently_used(cache, tmp_path):
+    cache.put("a", make_frame(0))
+    cache.put("b", make_frame(1))
+    assert cache.get("a") is not None
+    cache.put("c", make_frame(2))
+
+    # b was used last before a, it leaves memory for the disk
+    assert list(cache._frames) == ["a", "c"]
+    assert cache.nbytes <= cache.budget
+    assert sorted(os.listdir(tmp_path)) == ["b.index.npy", "b.json", "b.values.npy"]
+    assert "b" in cache and "d" not in cache
+
+
+def test_spilled_frames_reload(cache):
+    for k, key in enumerate("abcd"):
+        cache.put(key, make_frame(k))
+
+    for k, key in enumerate("ab"):
+        frame = cache.get(key)
+        assert key not in cache._frames
+        # Read back memory-mapped and read-only
+        assert not frame.to_numpy().flags.writeable
+        pd.testing.assert_frame_equal(frame, make_frame(k), check_freq=False)
+
+
+def test_flushed_frames_shared(cache, tmp_path):
+    cache.put("a", make_frame(0))
+    cache.flush()
+
+    # Another process reads the frame from the same directory
+    other = FrameCache(directory=str(tmp_path))
+    pd.testing.assert_frame_equal(other.get("a"), make_frame(0), check_freq=False)
+    assert other.get("b") is None
+
+
+def test_processed_bars_cached(tick_data, tmp_path):
+    cache = FrameCache(budget=0, directory=str(tmp_path))
+    expected = processed_bars(tick_data, 5, cache=cache)
+    assert len(os.listdir(tmp_path)) == 0
+
+    # A frame over the budget stays in memory until the next one pushes it out
+    processed_bars(tick_data, 3, cache=cache)
+    cached = processed_bars(tick_data, 5, cache=FrameCache(directory=str(tmp_path)))
+    pd.testing.assert_frame_equal(cached, expected, check_freq=False)
+
+
+def test_fingerprint_hashed_once(tick_data, monkeypatch):
+    data = tick_data.copy()
+    expected = fingerprint(data)
+
+    calls = []
+    blake2b = cache_module.hashlib.blake2b
+    monkeypatch.setattr(cache_module.hashlib, "blake2b", lambda *args, **kwargs: calls.append(1) or blake2b(*args, **kwargs))
+    assert fingerprint(data) == expected
+    data["balance"] = 0.0
+    assert fingerprint(data) == expected
+    assert calls == []
+
+    # A new index or new rows are hashed again
+    data.index = data.index + pd.Timedelta(1, "s")
+    assert fingerprint(data) != expected
+    assert fingerprint(data.iloc[:-1]) != expected
+    assert fingerprint(tick_data.copy()) == expected
+    assert len(calls) == 3
@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import Downloader, TickArchive
+
+DAYS = pd.DatetimeIndex(["2024-03-04", "2024-03-05", "2024-03-06", "2024-03-07"])
+
+
+def make_rows(day, n=5):
+    """Tick rows of one day as the query returns them: datetime, price, bid, ask, quantity."""
+    start = pd.Timestamp(day) + pd.Timedelta(hours=9, minutes=15)
+    return [
+        (start + pd.Timedelta(minutes=10 * k), 1200.0 + k, 1199.9 + k, 1200.1 + k, float(k + 1))
+        for k in range(n)
+    ]
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+        self.rows = []
+
+    def execute(self, query, params):
+        start, end, ticker = params
+        if query is Downloader.DAYS_QUERY:
+            days = self.connection.days
+            self.rows = [(day.date(),) for day in days[(days >= pd.Timestamp(start)) & (days <= pd.Timestamp(end))]]
+            return
+
+        day = pd.Timestamp(start).normalize()
+        self.connection.fetched.append(day)
+        if self.connection.fail_after is not None and len(self.connection.fetched) > self.connection.fail_after:
+            raise ConnectionError("connection lost")
+        self.rows = list(self.connection.ticks.get(day, []))
+
+    def fetchmany(self, size):
+        rows, self.rows = self.rows[:size], self.rows[size:]
+        return rows
+
+    def fetchall(self):
+        return self.fetchmany(len(self.rows))
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    """DB-API connection answering the days query and the tick query from memory."""
+    def __init__(self, ticks, days=DAYS, fail_after=None):
+        self.ticks = ticks
+        self.days = days
+        self.fail_after = fail_after
+        self.fetched = []
+        self.opened = 0
+
+    def __call__(self):
+        self.opened += 1
+        return self
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def close(self):
+        pass
+
+
+def make_cursor(rows):
+    """Cursor of an executed tick query returning `rows`."""
+    cursor = FakeCursor(FakeConnection({}))
+    cursor.rows = list(rows)
+    return cursor
+
+
+@pytest.fixture
+def ticks():
+    return {day: make_rows(day) for day in DAYS}
+
+
+def test_connection_is_lazy(ticks):
+    connection = FakeConnection(ticks)
+    downloader = Downloader(connect=connection)
+    downloader.close()
+    assert connection.opened == 0
+
+
+def test_fetch_nulls_and_order():
+    day = DAYS[0]
+    rows = make_rows(day, 3)[::-1]
+    rows[0] = (rows[0][0], rows[0][1], None, None, None)
+    # Outside the trading session
+    rows.append((day + pd.Timedelta(hours=15), 1.0, 1.0, 1.0, 1.0))
+
+    result = Downloader._fetch(make_cursor(rows), batch=2)
+
+    assert list(result.columns) == Downloader.COLUMNS[1:]
+    assert result.index.is_monotonic_increasing
+    assert len(result) == 3
+    assert result.iloc[-1][["bid_price", "ask_price", "volume"]].isna().all()
+    assert result["price"].tolist() == [1200.0, 1201.0, 1202.0]
+
+
+def test_sync_stores_every_trading_day(tmp_path, ticks):
+    archive = TickArchive(str(tmp_path))
+    connection = FakeConnection(ticks)
+    downloaded = Downloader(connect=connection).sync(archive, start_date="2024-03-01", end_date="2024-03-10", n_connections=2)
+
+    assert list(downloaded) == list(DAYS)
+    assert list(archive.days) == list(DAYS)
+    assert sorted(connection.fetched) == list(DAYS)
+
+    data = archive.read("2024-03-01", "2024-03-10")
+    assert len(data) == 5 * len(DAYS)
+    np.testing.assert_array_equal(data["price"].to_numpy(), [row[1] for day in DAYS for row in ticks[day]])
+
+
+def test_sync_resumes_after_interruption(tmp_path, ticks):
+    archive = TickArchive(str(tmp_path))
+    with pytest.raises(ConnectionError):
+        Downloader(connect=FakeConnection(ticks, fail_after=2)).sync(archive, start_date="2024-03-01", end_date="2024-03-10", n_connections=1)
+    assert list(archive.days) == list(DAYS[:2])
+    assert not archive.synced("2024-03-01", "2024-03-10")
+
+    connection = FakeConnection(ticks)
+    downloaded = Downloader(connect=connection).sync(archive, start_date="2024-03-01", end_date="2024-03-10")
+    assert list(downloaded) == list(DAYS[2:])
+    assert sorted(connection.fetched) == list(DAYS[2:])
+    assert list(archive.days) == list(DAYS)
+
+
+def test_synced_range_needs_no_connection(tmp_path, ticks):
+    archive = TickArchive(str(tmp_path))
+    Downloader(connect=FakeConnection(ticks)).sync(archive, start_date="2024-03-01", end_date="2024-03-10")
+
+    connection = FakeConnection(ticks)
+    downloader = Downloader(connect=connection)
+    assert len(downloader.sync(TickArchive(str(tmp_path)), start_date="2024-03-04", end_date="2024-03-06")) == 0
+    downloader.close()
+    assert connection.opened == 0
+
+
+def test_empty_days_are_fetched_again(tmp_path, ticks):
+    archive = TickArchive(str(tmp_path))
+    late = dict(ticks)
+    late[DAYS[-1]] = []
+    Downloader(connect=FakeConnection(late)).sync(archive, start_date="2024-03-01", end_date="2024-03-10")
+    assert archive.rows(DAYS[-1]) == 0
+    assert not archive.synced("2024-03-01", "2024-03-10")
+
+    connection = FakeConnection(ticks)
+    downloaded = Downloader(connect=connection).sync(archive, start_date="2024-03-01", end_date="2024-03-10")
+    assert list(downloaded) == [DAYS[-1]]
+    assert archive.rows(DAYS[-1]) == 5
+
+
+def test_partial_and_current_days(tmp_path, ticks):
+    archive = TickArchive(str(tmp_path))
+    archive.write_day(DAYS[0], Downloader._fetch(make_cursor(ticks[DAYS[0]])))
+
+    # Written while the day was still trading
+    archive._index["fetched"][archive._day(DAYS[0])] = (DAYS[0] + pd.Timedelta(hours=10)).isoformat()
+    assert not archive.complete(DAYS[0])
+
+    today = pd.Timestamp.now().normalize()
+    days = DAYS.append(pd.DatetimeIndex([today]))
+    connection = FakeConnection({**ticks, today: make_rows(today)}, days=days)
+    downloader = Downloader(connect=connection)
+    assert list(downloader.missing_days(archive, DAYS[0], today)) == list(DAYS)
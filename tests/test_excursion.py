@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import BacktestConfig, Backtesting
+from backtest.backtesting import ExcursionIndex
+from strategy import strategy_options
+
+from .conftest import make_ticks
+
+CASES = [
+    ("long", ["ATR", "SO", "Vortex", "PSAR", "UO"], 1, 30),
+    ("short", ["SO", "Vortex", "PSAR", "UO", "CCI"], 2, 5),
+    (None, ["MACD", "RSI", "OBV"], 1, 30),
+]
+TP = np.arange(1, 6.5, 0.5)
+SL = np.arange(1, 6.5, 0.5)
+
+
+def make_config(side, interval, timeout, TP=1, SL=1):
+    return BacktestConfig(
+        cost=0.25, slippage=0.47, max_pos=10e9, TP=TP, SL=SL, position_size=1, margin=0.25,
+        side=side, mode='one_way' if side else 'hedged', min_signals=1,
+        initial_balance=10e19, interval=interval, timeout=timeout
+    )
+
+
+def gapped_ticks(seed):
+    """Ticks with pre-open ticks every morning and a day that stops before the 14:29 close."""
+    data = make_ticks(days=4, seed=seed)
+    day = data.index.normalize()
+    early = (day == day.unique()[1]) & (data.index - day >= pd.Timedelta("14h"))
+    return data[~early]
+
+
+@pytest.mark.parametrize("seed", range(2))
+@pytest.mark.parametrize("side, names, interval, timeout", CASES)
+def test_matches_search_backtests(seed, side, names, interval, timeout):
+    data = gapped_ticks(seed)
+    strategies = [function for name, function in strategy_options if name in names]
+    index = ExcursionIndex(Backtesting(strategies, data.copy(), make_config(side, interval, timeout), search=True), max_excursion=10)
+    count, mean, winrate = index.grid(TP, SL)
+
+    for a, b in [(0, 0), (4, 2), (3, 1), (10, 10), (6, 9)]:
+        bt = Backtesting(strategies, data.copy(), make_config(side, interval, timeout, TP[a], SL[b]), search=True)
+        bt.run_backtest()
+        history = bt.portfolio.history
+
+        pd.testing.assert_frame_equal(index.history(TP[a], SL[b]), history)
+        assert count[a, b] == len(history)
+        if len(history):
+            assert mean[a, b] == pytest.approx(history["pnl"].mean())
+            assert winrate[a, b] == pytest.approx((history["pnl"] > 0).mean())
+
+
+def test_first_record_after_missing_ticks():
+    ticks, values = [], []
+    ExcursionIndex._records(np.array([np.nan, 5, 4, 6]), np.inf, 10, (ticks, values), [0])
+    assert ticks[0].tolist() == [11, 13]
+    assert values[0].tolist() == [5.0, 6.0]
+
+
+def test_binding_capital_is_refused(tick_data):
+    config = BacktestConfig(
+        cost=0.25, slippage=0.47, max_pos=10e9, TP=1, SL=1, position_size=1, margin=0.25,
+        mode='hedged', min_signals=1, initial_balance=1000, interval=1
+    )
+    strategies = [function for _, function in strategy_options][:4]
+    with pytest.raises(AssertionError):
+        ExcursionIndex(Backtesting(strategies, tick_data.copy(), config, search=True))
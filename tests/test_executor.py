@@ -0,0 +1,101 @@
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+import optuna
+import pytest
+
+from optimize import TrialExecutor
+from utils import TickStore
+from utils.shared import SharedArrays, SharedFrame
+
+
+class Owner:
+    """Stand-in for Searching / Optimizer, its trials check the data they attached to."""
+    def __init__(self, data, directory, expected, fail=False):
+        self.data = data
+        self.bt = None
+        self._dir = directory
+        self.expected = expected
+        self.fail = fail
+
+    def objective(self, trial):
+        assert self.data is not None and not self.fail
+        values = self.data.arrays["price"] if isinstance(self.data, TickStore) else self.data.to_numpy()
+        assert not values.flags.writeable
+        assert self.data.index.equals(self.expected)
+
+        # Slow enough for the workers to overlap
+        time.sleep(0.02)
+        return trial.suggest_float("x", 0, 1)
+
+
+def make_study(tmp_path):
+    storage = f"sqlite:///{tmp_path / 'study.db'}"
+    optuna.create_study(study_name="test", storage=storage)
+    return storage
+
+
+def assert_unlinked(spec):
+    with pytest.raises(FileNotFoundError):
+        shared_memory.SharedMemory(name=spec["name"])
+
+
+def test_shared_arrays_attach():
+    arrays = {"times": np.arange(5, dtype=np.int64), "flags": np.array([1, 0, 1], dtype=np.int8), "empty": np.zeros(0)}
+    shared = SharedArrays(arrays, meta={"name": "ticks"})
+    attached = SharedArrays.attach(shared.spec)
+
+    assert attached.meta == {"name": "ticks"} and not attached.owner
+    for name, array in arrays.items():
+        view = attached.arrays[name]
+        assert view.dtype == array.dtype and not view.flags.writeable
+        np.testing.assert_array_equal(view, array)
+        # Every array starts on an 8-byte boundary
+        assert view.ctypes.data % 8 == 0
+
+    # Detaching keeps the block of the owner, which unlinks it
+    del view
+    attached.close()
+    np.testing.assert_array_equal(shared.arrays["flags"], arrays["flags"])
+    del attached
+    shared.close()
+    assert_unlinked(shared.spec)
+
+
+@pytest.mark.parametrize("n_trials, n_jobs", [(5, 3), (2, 4), (6, 2)])
+@pytest.mark.parametrize("store", [False, True])
+def test_runs_exactly_n_trials(tick_data, tmp_path, monkeypatch, n_trials, n_jobs, store):
+    shares = []
+    monkeypatch.setattr(SharedFrame, "close", lambda self, close=SharedFrame.close: shares.append(self.spec) or close(self))
+    monkeypatch.setattr(SharedArrays, "close", lambda self, close=SharedArrays.close: shares.append(self.spec) or close(self))
+
+    storage = make_study(tmp_path)
+    data = TickStore(tick_data) if store else tick_data
+    owner = Owner(data, str(tmp_path), tick_data.index)
+    study = TrialExecutor(owner, "objective", n_jobs=n_jobs).optimize("test", storage, n_trials)
+    assert len(study.trials) == n_trials
+    assert all(trial.state == optuna.trial.TrialState.COMPLETE for trial in study.trials)
+
+    # More trials add to the stored ones
+    study = TrialExecutor(owner, "objective", n_jobs=n_jobs).optimize("test", storage, 3)
+    assert len(study.trials) == n_trials + 3
+
+    # The owner keeps its data, the shared blocks are gone
+    assert owner.data is data
+    assert len(shares) == 2
+    for spec in shares:
+        assert_unlinked(spec)
+
+
+def test_failed_workers_release_block(tick_data, tmp_path, monkeypatch):
+    shares = []
+    monkeypatch.setattr(SharedFrame, "close", lambda self, close=SharedFrame.close: shares.append(self.spec) or close(self))
+
+    storage = make_study(tmp_path)
+    owner = Owner(tick_data, str(tmp_path), tick_data.index, fail=True)
+    study = TrialExecutor(owner, "objective", n_jobs=2).optimize("test", storage, 4)
+
+    assert all(trial.state == optuna.trial.TrialState.FAIL for trial in study.trials)
+    assert len(shares) == 1
+    assert_unlinked(shares[0])
@@ -0,0 +1,64 @@
+import numpy as np
+import pandas as pd
+
+from backtest.portfolio import Holdings
+
+
+def position(k, signal="buy"):
+    return {
+        "date": pd.Timestamp("2023-03-01 09:15") + pd.Timedelta(seconds=k), "price": 1200.0 + k,
+        "signal": signal, "position_size": k % 3 + 1, "position": 300.0 + k, "TP": 1203.0 + k, "SL": 1198.0 + k
+    }
+
+
+def test_growth_keeps_rows():
+    holdings = Holdings(capacity=2)
+    for k in range(37):
+        assert holdings.append(position(k, "buy" if k % 2 else "sell")) == k
+
+    assert len(holdings) == 37 and holdings.capacity >= 37
+    assert holdings.price[:37].tolist() == [1200.0 + k for k in range(37)]
+    assert holdings.side[:37].tolist() == [1 if k % 2 else -1 for k in range(37)]
+    assert holdings.id[:37].tolist() == list(range(37))
+    assert (holdings.close_time[:37] == Holdings._NAT).all() and np.isnan(holdings.pnl[:37]).all()
+
+
+def test_remove_keeps_order():
+    holdings = Holdings(capacity=4)
+    for k in range(10):
+        holdings.append(position(k))
+
+    holdings.remove(np.array([0, 3, 4, 9]))
+    assert holdings.id[:len(holdings)].tolist() == [1, 2, 5, 6, 7, 8]
+    assert holdings.price[:len(holdings)].tolist() == [1201.0, 1202.0, 1205.0, 1206.0, 1207.0, 1208.0]
+    np.testing.assert_array_equal(holdings.locate(np.array([2, 6, 8])), [1, 3, 5])
+
+    # Ids keep increasing after removals
+    holdings.append(position(10))
+    assert holdings.id[len(holdings) - 1] == 10
+
+    holdings.remove(np.array([], dtype=np.int64))
+    assert len(holdings) == 7
+
+
+def test_extend_and_frame():
+    holdings = Holdings()
+    for k in range(4):
+        holdings.append(position(k, "sell" if k == 2 else "buy"))
+
+    history = Holdings(capacity=1)
+    close = pd.Timestamp("2023-03-01 10:00")
+    history.extend(holdings, np.array([2, 0]), np.array([1190.0, 1210.0]), close, np.array([12.0, 10.0]))
+    frame = history.to_frame()
+
+    assert list(frame.columns) == Holdings.COLUMNS
+    assert frame["signal"].tolist() == ["sell", "buy"]
+    assert frame["price"].tolist() == [1202.0, 1200.0]
+    assert frame["close_price"].tolist() == [1190.0, 1210.0]
+    assert (frame["close_time"] == close).all()
+    assert frame["date"].tolist() == [position(2)["date"], position(0)["date"]]
+    assert frame["pnl"].tolist() == [12.0, 10.0]
+
+    history.merge(holdings)
+    assert len(history) == 6
+    assert history.id[:6].tolist() == [2, 0, 0, 1, 2, 3]
@@ -0,0 +1,31 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import BarPyramid, processor
+from utils.processor import NUMPY_INDICATORS
+
+COLUMNS = [column for column in NUMPY_INDICATORS if not column.startswith('_')]
+
+
+@pytest.fixture(scope="module")
+def bars(tick_data):
+    return BarPyramid(tick_data).bars(1)
+
+
+@pytest.mark.parametrize("column", COLUMNS)
+def test_kernel_matches_ta(bars, column):
+    expected = processor(bars, [column], backend='ta')
+    result = processor(bars, [column], backend='numpy')
+
+    pd.testing.assert_index_equal(result.index, expected.index)
+    np.testing.assert_allclose(result[column].to_numpy(), expected[column].to_numpy(), rtol=1e-9, atol=1e-9)
+
+
+def test_full_frame_matches_ta(bars):
+    expected = processor(bars, backend='ta')
+    result = processor(bars, backend='numpy')
+
+    pd.testing.assert_index_equal(result.index, expected.index)
+    assert list(result.columns) == list(expected.columns)
+    np.testing.assert_allclose(result.to_numpy(), expected.to_numpy(), rtol=1e-9, atol=1e-9)
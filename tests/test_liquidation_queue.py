@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+
+from backtest.portfolio import LiquidationQueue
+
+
+def pnl(position, bid, ask):
+    side, price, size = position
+    return (bid - price if side == 1 else price - ask) * size - 0.97 * size
+
+
+def test_group_heads():
+    queue = LiquidationQueue()
+    queue.add(0, 1, 1200.0, 1)
+    queue.add(1, 1, 1201.0, 1)
+    queue.add(2, -1, 1199.0, 1)
+    queue.add(3, -1, 1198.0, 1)
+    queue.add(4, 1, 1201.0, 2)
+    queue.add(5, 1, 1201.0, 1)
+
+    # Highest buy and lowest sell of each (side, size) group, the first one on ties
+    assert queue.candidates().tolist() == [1, 3, 4]
+
+    queue.remove(np.array([1, 3]))
+    assert queue.candidates().tolist() == [2, 4, 5]
+    assert len(queue) == 4
+
+    queue.remove(np.array([0, 2, 4, 5]))
+    assert queue.candidates().tolist() == []
+    assert queue._heaps == {}
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_worst_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    queue = LiquidationQueue()
+    positions = {}
+    for id in range(400):
+        position = (int(rng.choice([1, -1])), round(1200 + rng.integers(-10, 11) * 0.1, 1), int(rng.choice([1, 1, 2, 3])))
+        queue.add(id, *position)
+        positions[id] = position
+
+        if rng.random() < 0.4:
+            removed = rng.choice(list(positions), size=min(2, len(positions)), replace=False)
+            queue.remove(removed)
+            for r in removed.tolist():
+                del positions[r]
+
+        if not positions:
+            continue
+        bid = round(1200 + rng.integers(-10, 11) * 0.1, 1)
+        ask = round(bid + 0.1, 1)
+
+        ids = sorted(positions)
+        expected = ids[int(np.argmin([pnl(positions[i], bid, ask) for i in ids]))]
+        candidates = queue.candidates().tolist()
+        worst = candidates[int(np.argmin([pnl(positions[i], bid, ask) for i in candidates]))]
+        assert worst == expected
+        assert len(queue) == len(positions)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest.backtesting import OrderBook
+
+START = pd.Timestamp("2023-03-01 09:15")
+
+
+def minutes(k):
+    return START + pd.Timedelta(minutes=k)
+
+
+def test_fills_at_limit():
+    book = OrderBook()
+    book.add(minutes(0), 1200.0, 1, minutes(30))
+    book.add(minutes(0), 1201.0, -1, minutes(30))
+
+    assert book.match(bid_price=1201.1, ask_price=1199.9) == []
+    assert book.best_prices() == (1200.0, 1201.0)
+
+    # Buy fills once ask >= limit, sell once bid <= limit
+    assert [order[1:3] for order in book.match(bid_price=1201.1, ask_price=1200.0)] == [(1200.0, 1)]
+    assert [order[1:3] for order in book.match(bid_price=1201.0, ask_price=1199.0)] == [(1201.0, -1)]
+    assert book.empty and book.best_prices() == (np.inf, -np.inf)
+
+
+def test_fills_in_placement_order():
+    book = OrderBook()
+    book.add(minutes(0), 1202.0, 1, minutes(30))
+    book.add(minutes(1), 1200.0, -1, minutes(30))
+    book.add(minutes(2), 1199.0, 1, minutes(30))
+    book.add(minutes(3), 1203.0, 1, minutes(30))
+
+    filled = book.match(bid_price=1199.5, ask_price=1202.0)
+    assert [order[0] for order in filled] == [minutes(0), minutes(1), minutes(2)]
+    assert len(book) == 1 and book.to_frame()["price"].tolist() == [1203.0]
+
+
+def test_expiry_at_timeout():
+    book = OrderBook()
+    book.add(minutes(0), 1200.0, 1, minutes(5))
+    book.add(minutes(1), 1200.0, -1, minutes(6))
+
+    book.expire(minutes(5) - pd.Timedelta(1, "ns"))
+    assert len(book) == 2
+
+    # Expires when timeout <= date
+    book.expire(minutes(5))
+    assert book.to_frame()["signal"].tolist() == [-1]
+    assert book.next_timeout() == minutes(6)
+
+    book.expire(minutes(10))
+    assert book.empty and book.next_timeout() is None
+
+
+def test_filled_orders_do_not_expire():
+    book = OrderBook()
+    book.add(minutes(0), 1200.0, 1, minutes(5))
+    book.add(minutes(0), 1200.0, 1, minutes(6))
+    assert len(book.match(bid_price=1199.0, ask_price=1200.0)) == 2
+
+    # The heap still holds the timeouts of the filled orders
+    assert book.next_timeout() == minutes(5)
+    book.expire(minutes(10))
+    assert book.empty and book.next_timeout() is None
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    book = OrderBook()
+    orders = []
+    for k in range(400):
+        date = minutes(k)
+        book.expire(date)
+        orders = [order for order in orders if order[3] > date]
+
+        bid = round(1200 + rng.integers(-15, 16) * 0.1, 1)
+        ask = round(bid + rng.integers(1, 3) * 0.1, 1)
+        expected = [order for order in orders if (order[2] == 1 and ask >= order[1]) or (order[2] == -1 and bid <= order[1])]
+        assert book.match(bid, ask) == expected
+        orders = [order for order in orders if order not in expected]
+
+        if rng.random() < 0.5:
+            order = (date, round(1200 + rng.integers(-15, 16) * 0.1, 1), int(rng.choice([1, -1])), minutes(k + int(rng.integers(1, 10))))
+            book.add(*order)
+            orders.append(order)
+        assert len(book) == len(orders)
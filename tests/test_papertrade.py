@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from backtest import Backtesting, BacktestConfig
+from papertrade import PaperTrade
+from strategy import strategy_options
+
+STRATEGIES = [strategy for _, strategy in strategy_options][:8]
+
+
+class FakeDownloader:
+    """Ticks of `data` up to the time of each query, as the database has them."""
+    def __init__(self, data):
+        self.data = data
+        self.queries = 0
+
+    def get_historical_data(self, start_date, end_date, ticker):
+        self.queries += 1
+        return self.data.loc[pd.Timestamp(start_date):pd.Timestamp(end_date)]
+
+
+def test_matches_backtesting(tick_data, tmp_path, monkeypatch):
+    config = dict(
+        cost=0.25, slippage=0.47, max_pos=50, TP=3, SL=3, position_size=0.5, margin=0.25,
+        mode='hedged', min_signals=1, initial_balance=2000, interval=5
+    )
+    bt = Backtesting(STRATEGIES, tick_data.copy(), BacktestConfig(**config))
+    bt.run_backtest()
+
+    # Polls every 7 minutes and 30 seconds of the data
+    clock = iter(pd.date_range(tick_data.index[0], tick_data.index[-1] + pd.Timedelta("1h"), freq="450s"))
+    monkeypatch.setattr(PaperTrade, "_now", staticmethod(lambda: next(clock)))
+
+    downloader = FakeDownloader(tick_data)
+    paper = PaperTrade(
+        STRATEGIES, BacktestConfig(**config), start=tick_data.index[0], until=tick_data.index[-1],
+        poll=0, downloader=downloader, dir=str(tmp_path)
+    )
+    paper.run_backtest()
+
+    assert downloader.queries > 100
+    np.testing.assert_array_equal(paper.history["pnl"].to_numpy(dtype=float), bt.portfolio.history["pnl"].to_numpy(dtype=float))
+    np.testing.assert_array_equal(paper.balance.to_numpy(), bt.balance.to_numpy())
+    np.testing.assert_array_equal(paper.equity.to_numpy(), bt.equity.to_numpy())
+
+
+class ScriptedDownloader:
+    def __init__(self, responses):
+        self.responses = iter(responses)
+
+    def get_historical_data(self, start_date, end_date, ticker):
+        return next(self.responses)
+
+
+def test_ticks_of_one_time_over_two_polls(tmp_path, monkeypatch):
+    times = pd.DatetimeIndex(["2023-03-01 09:15:00", "2023-03-01 09:15:01", "2023-03-01 09:15:01", "2023-03-01 09:15:02"])
+    ticks = pd.DataFrame({"price": [1.0, 2.0, 3.0, 4.0], "bid_price": 1.0, "ask_price": 1.0, "volume": 1.0}, index=times)
+    clock = iter(pd.date_range("2023-03-01 09:15:00", periods=3, freq="1s"))
+    monkeypatch.setattr(PaperTrade, "_now", staticmethod(lambda: next(clock)))
+
+    downloader = ScriptedDownloader([ticks.iloc[:2], None, ticks.iloc[1:]])
+    config = BacktestConfig(cost=0.25, slippage=0.47, max_pos=50, TP=3, SL=3, position_size=1, margin=0.25, mode='hedged', min_signals=1, initial_balance=2000, interval=1)
+    paper = PaperTrade(STRATEGIES, config, start=times[0], until="2023-03-01 09:15:02", poll=0, downloader=downloader, dir=str(tmp_path))
+
+    assert [chunk["price"].tolist() for chunk in paper.chunks] == [[1.0, 2.0], [3.0, 4.0]]
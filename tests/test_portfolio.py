@@ -0,0 +1,78 @@
+import random
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import BacktestConfig
+from backtest.portfolio import Portfolio
+
+
+class LinearPortfolio(Portfolio):
+    """Portfolio scanning every open position to liquidate and to sum the unrealized PnL."""
+    def _worst_position(self, bid_price, ask_price) -> int:
+        return int(np.argmin(self._calculate_pnl(np.arange(len(self.holdings)), bid_price, ask_price)))
+
+    def _unrealized_pnl(self, curr_price):
+        h = self.holdings
+        n = len(h)
+        if n == 0:
+            return 0
+        price = h.price[:n]
+        return sum((np.where(h.side[:n] == 1, curr_price - price, price - curr_price) * h.position_size[:n]).tolist())
+
+
+def simulate(portfolio_class, seed, steps=400):
+    """Random opens, TP/SL exits, margin calls and session closes, with every observable value on the way."""
+    r = random.Random(seed)
+    search = r.random() < 0.3
+    config = BacktestConfig(
+        cost=0.25, slippage=0.47, max_pos=50, TP=r.choice([2, 5, 40]), SL=r.choice([2, 5, 40]),
+        position_size=0.5, margin=0.25, mode='hedged', min_signals=1,
+        initial_balance=r.choice([500, 2000, 8000]), interval=1
+    )
+    portfolio = portfolio_class(config.initial_balance, config, search=search)
+
+    price = 1200.0
+    date = pd.Timestamp('2023-03-01 09:15')
+    trace = []
+    for _ in range(steps):
+        price = round(price + r.choice([-0.3, -0.1, 0, 0, 0.1, 0.2, 0.5, -1.0]) * r.randint(1, 4), 1)
+        bid = round(price - r.choice([0, 0.1]), 1)
+        ask = round(bid + r.choice([0.1, 0.2]), 1)
+        if r.random() < 0.01:
+            bid = np.nan
+        date += pd.Timedelta(seconds=5)
+
+        portfolio.check_position(price, bid, ask, date)
+        trace.append(portfolio._unrealized_pnl(price))
+        if portfolio.balance == portfolio.balance:
+            trace.append(portfolio.buying_power(price))
+
+        if r.random() < 0.4 and len(portfolio.holdings) < 40:
+            side = r.choice([1, -1])
+            size = r.choice([1, 1, 2, 3, 5])
+            portfolio.add_position({
+                "date": date, "price": price, "signal": "buy" if side == 1 else "sell",
+                "position_size": size, "position": price * 0.25 * size,
+                "TP": price + config.TP * side, "SL": price - config.SL * side,
+                "close_price": np.nan, "close_time": np.nan, "pnl": np.nan
+            })
+
+        portfolio.force_liquidate(price, bid, ask, date)
+        trace.append(portfolio._unrealized_pnl(price))
+        if r.random() < 0.01:
+            portfolio._close_all(price, bid, ask, date)
+
+    return portfolio, trace
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_matches_linear_scan(seed):
+    portfolio, trace = simulate(Portfolio, seed)
+    expected, expected_trace = simulate(LinearPortfolio, seed)
+
+    np.testing.assert_array_equal(trace, expected_trace)
+    np.testing.assert_array_equal(portfolio.ledger, expected.ledger)
+    np.testing.assert_array_equal(portfolio.balance, expected.balance)
+    pd.testing.assert_frame_equal(portfolio.history, expected.history)
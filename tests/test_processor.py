@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import BacktestConfig, Backtesting
+from strategy import strategy_options
+from utils import BarPyramid, processor
+from utils.processor import INDICATORS, LazyBars
+
+STRATEGIES = dict(strategy_options)
+
+
+@pytest.fixture(scope="module")
+def bars(tick_data):
+    return BarPyramid(tick_data).bars(1)
+
+
+@pytest.fixture(scope="module")
+def full(bars):
+    return processor(bars)
+
+
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_computes_only_used_columns(bars, name):
+    columns = STRATEGIES[name].columns
+    lazy = LazyBars(bars.copy())
+    frame = lazy.frame(columns)
+
+    computed = {column for column in lazy.columns if column not in bars.columns and not column.startswith('_')}
+    assert computed == set(columns) - set(bars.columns)
+    # In the layout of the full processor frame
+    assert list(frame.columns) == list(bars.columns) + [column for column in INDICATORS if column in computed]
+
+
+@pytest.mark.parametrize("name", STRATEGIES)
+def test_lazy_matches_full(bars, full, name):
+    columns = list(STRATEGIES[name].columns)
+    lazy = processor(bars, columns)
+
+    # Same warm-up cut, the lazy frame may only keep extra rows
+    assert lazy.index[0] == full.index[0]
+    assert full.index.isin(lazy.index).all()
+    pd.testing.assert_frame_equal(lazy.loc[full.index, columns], full[columns], check_exact=True)
+
+    # The strategy reads nothing but its declared columns and the bars
+    for end in np.linspace(20, len(full), 25, dtype=int):
+        bar = full.index[end - 1]
+        assert STRATEGIES[name](lazy.loc[:bar].tail(20)) == STRATEGIES[name](full.loc[:bar].tail(20))
+
+
+def test_lazy_backtest_matches(tick_data):
+    strategies = [STRATEGIES[name] for name in ["RSI", "MACD", "Bollinger Bands", "SO", "OBV"]]
+    runs = []
+    for lazy in [False, True]:
+        config = BacktestConfig(
+            cost=0.25, slippage=0.47, max_pos=10, TP=3, SL=2, position_size=0.2, margin=0.25, side="long",
+            min_signals=2, initial_balance=5000, interval=3, lazy_indicators=lazy
+        )
+        bt = Backtesting(strategies, tick_data.copy(), config)
+        bt.run_backtest()
+        runs.append(bt)
+
+    assert set(runs[1].process_data.columns) < set(runs[0].process_data.columns)
+    pd.testing.assert_frame_equal(runs[1].portfolio.history, runs[0].portfolio.history, check_exact=True)
+    pd.testing.assert_series_equal(runs[1].equity, runs[0].equity, check_exact=True)
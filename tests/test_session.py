@@ -0,0 +1,33 @@
+import pandas as pd
+
+from utils import SessionCalendar
+
+from .conftest import make_ticks
+
+
+def test_holidays_from_untraded_days():
+    # Third Thursday of March 2023 without ticks
+    data = make_ticks(days=15, per_day=20)
+    data = data[data.index.normalize() != pd.Timestamp("2023-03-16")]
+    calendar = SessionCalendar(data.index)
+
+    assert list(calendar.holidays) == [pd.Timestamp("2023-03-16")]
+    assert list(calendar.expiry_days(calendar.days)) == [pd.Timestamp("2023-03-15")]
+    assert set(calendar.index[calendar.expiry].normalize()) == {pd.Timestamp("2023-03-15")}
+
+
+def test_given_holidays():
+    data = make_ticks(days=15, per_day=20)
+    calendar = SessionCalendar(data.index, holidays=["2023-03-16"])
+
+    assert list(calendar.expiry_days(calendar.days)) == [pd.Timestamp("2023-03-15")]
+    assert calendar.holiday.sum() == 20
+
+
+def test_day_blocks_cover_whole_days():
+    calendar = SessionCalendar(make_ticks(days=7, per_day=20).index)
+    blocks = calendar.day_blocks(3)
+
+    assert [block.start for block in blocks] == [0, 40, 100]
+    assert blocks[-1].stop == len(calendar.index)
+    assert all(block.start in calendar.day_starts for block in blocks)
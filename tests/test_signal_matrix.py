@@ -0,0 +1,21 @@
+import numpy as np
+import pytest
+
+from strategy import strategy_options, signal_matrix
+from utils import FrameCache, processed_bars
+
+
+@pytest.fixture(scope="module", params=[1, 5])
+def bars(request, tick_data, tmp_path_factory):
+    cache = FrameCache(directory=str(tmp_path_factory.mktemp("frames")))
+    return processed_bars(tick_data, request.param, cache=cache)
+
+
+@pytest.mark.parametrize("name, strategy", strategy_options, ids=[name for name, _ in strategy_options])
+def test_matches_scalar_rules(bars, name, strategy):
+    """Every bar of the matrix gives the signal of the scalar rule on the 20 bars up to it."""
+    matrix = signal_matrix(bars, [strategy])
+    assert matrix is not None, f"{name} has no vectorized form"
+
+    scalar = np.array([strategy(bars.iloc[max(i - 19, 0):i + 1]) for i in range(20, len(bars))])
+    np.testing.assert_array_equal(matrix[20:, 0], scalar)
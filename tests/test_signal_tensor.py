@@ -0,0 +1,48 @@
+import importlib
+
+import numpy as np
+import pytest
+
+from backtest import BacktestConfig
+from backtest.backtesting import Backtesting
+from strategy import strategy_options, SignalTensor
+from utils import TickStore
+
+# The module, shadowed by its class in the package
+backtesting_module = importlib.import_module("backtest.backtesting.Backtesting")
+
+STRATEGIES = [strategy for _, strategy in strategy_options][:6]
+
+
+def make_config(**kwargs):
+    return BacktestConfig(
+        cost=0.25, slippage=0.47, max_pos=50, TP=3, SL=3, position_size=0.5, margin=0.25,
+        mode='hedged', min_signals=1, initial_balance=5000, interval=5, **kwargs
+    )
+
+
+@pytest.fixture(scope="module")
+def tensor(tick_data, tmp_path_factory):
+    return SignalTensor.build(tick_data, str(tmp_path_factory.mktemp("tensor")), intervals=[5], strategies=STRATEGIES)
+
+
+@pytest.mark.parametrize("store", [False, True])
+def test_tensor_run_skips_bars(tick_data, tensor, monkeypatch, store):
+    data = TickStore(tick_data) if store else tick_data.copy()
+    expected = Backtesting(STRATEGIES, data, make_config())
+    expected.run_backtest()
+
+    monkeypatch.setattr(backtesting_module, "processed_bars", lambda *args, **kwargs: pytest.fail("bars processed"))
+    bt = Backtesting(STRATEGIES, data if store else tick_data.copy(), make_config(), signal_tensor=tensor)
+    bt.run_backtest()
+
+    assert bt.data.index.equals(expected.data.index)
+    np.testing.assert_array_equal(bt.process_data.index, expected.process_data.index)
+    np.testing.assert_array_equal(bt.balance, expected.balance)
+    assert bt.portfolio.history.equals(expected.portfolio.history)
+
+
+@pytest.mark.parametrize("kwargs", [{"lazy_indicators": True}, {"indicator_backend": "numpy"}])
+def test_tensor_rejects_other_indicators(tick_data, tensor, kwargs):
+    with pytest.raises(AssertionError):
+        Backtesting(STRATEGIES, tick_data.copy(), make_config(**kwargs), signal_tensor=tensor)
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import TickStore
+from utils.cache import fingerprint
+
+from .conftest import make_ticks
+
+
+def test_compact_columns(tick_data):
+    store = TickStore(tick_data)
+
+    assert {name: store.arrays[name].dtype for name in store.COLUMNS} == {
+        "price": np.int32, "bid_price": np.int32, "ask_price": np.int32, "volume": np.uint32
+    }
+    pd.testing.assert_frame_equal(store.frame, tick_data)
+    assert store.fingerprint == fingerprint(tick_data)
+
+
+def test_unencodable_column_stays_float(tick_data):
+    data = tick_data.copy()
+    data["volume"] = data["volume"] + 0.5
+    store = TickStore(data)
+
+    assert store.arrays["volume"].dtype == np.float64
+    pd.testing.assert_frame_equal(store.frame, data)
+
+
+@pytest.mark.parametrize("seed", range(3))
+def test_window_matches_frame(seed):
+    rng = np.random.default_rng(seed)
+    data = make_ticks(days=2, seed=seed)
+    data.loc[rng.random(len(data)) < 0.3, "bid_price"] = np.nan
+    store = TickStore(data)
+
+    for start, stop in rng.integers(0, len(data), size=(20, 2)):
+        start, stop = sorted((int(start), int(stop)))
+        span = slice(start, stop)
+        n_ticks = max(stop - start - 20, 0)
+        window = data.iloc[span]
+
+        bids, asks = store.next_quotes(span, n_ticks)
+        np.testing.assert_array_equal(bids, window["bid_price"].bfill().to_numpy()[1:n_ticks + 1])
+        np.testing.assert_array_equal(asks, window["ask_price"].bfill().to_numpy()[1:n_ticks + 1])
+
+        for name in store.COLUMNS:
+            values = window[name].to_numpy()
+            np.testing.assert_array_equal(store.column(name, span), values)
+            np.testing.assert_array_equal(store.bounds(name, span), (np.fmin.reduce(values, initial=np.nan), np.fmax.reduce(values, initial=np.nan)))
+
+
+def test_shared_store(tick_data):
+    store = TickStore(tick_data)
+    shared = store.share()
+    try:
+        attached = TickStore.attach(shared.spec)
+        assert attached.fingerprint == store.fingerprint
+        assert all(attached.arrays[name].dtype == store.arrays[name].dtype for name in store.arrays)
+        pd.testing.assert_frame_equal(attached.frame, tick_data)
+    finally:
+        shared.close()
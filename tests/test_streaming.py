@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from backtest import Backtesting, BacktestConfig, StreamingBacktesting
+from strategy import strategy_options
+from utils import BarPyramid, StreamingProcessor, processor
+from utils.streaming import INDICATORS
+
+STRATEGIES = [strategy for _, strategy in strategy_options][:8]
+
+
+@pytest.mark.parametrize("position_size", [0.1, 0.5])
+def test_matches_backtesting_exactly(tick_data, tmp_path, position_size):
+    """The history and curves read back from the CSV files equal those of a Backtesting run."""
+    config = dict(
+        cost=0.25, slippage=0.47, max_pos=50, TP=3, SL=3, position_size=position_size, margin=0.25,
+        mode='hedged', min_signals=1, initial_balance=2000, interval=5
+    )
+    bt = Backtesting(STRATEGIES, tick_data.copy(), BacktestConfig(**config))
+    bt.run_backtest()
+
+    chunks = iter([chunk for _, chunk in tick_data.groupby(tick_data.index.normalize())])
+    streaming = StreamingBacktesting(strategy=STRATEGIES, chunks=chunks, config=BacktestConfig(**config), dir=str(tmp_path))
+    streaming.run_backtest()
+
+    np.testing.assert_array_equal(streaming.history["pnl"].to_numpy(dtype=float), bt.portfolio.history["pnl"].to_numpy(dtype=float))
+    np.testing.assert_array_equal(streaming.balance.to_numpy(), bt.balance.to_numpy())
+    np.testing.assert_array_equal(streaming.equity.to_numpy(), bt.equity.to_numpy())
+
+
+@pytest.fixture(scope="module", params=[1, 5])
+def bars(request, tick_data):
+    return BarPyramid(tick_data).bars(request.param)
+
+
+@pytest.mark.parametrize("column", INDICATORS)
+def test_processor_bar_by_bar(bars, column):
+    """Every bar processor keeps has the value the streaming indicator had once that bar was fed."""
+    expected = processor(bars, [column])
+
+    stream = StreamingProcessor([column])
+    times, values = [], []
+    for time, open, high, low, close, volume in bars[["open", "high", "low", "close", "volume"]].itertuples():
+        if stream.update(time, open, high, low, close, volume):
+            times.append(time)
+            values.append(stream.buffer.last()[stream.columns.index(column)])
+
+    result = pd.Series(values, index=pd.DatetimeIndex(times))
+    assert expected.index.isin(result.index).all()
+    np.testing.assert_allclose(result[expected.index].to_numpy(), expected[column].to_numpy(), rtol=1e-8, atol=1e-8)
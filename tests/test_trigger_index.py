@@ -0,0 +1,67 @@
+import numpy as np
+import pytest
+
+from backtest.portfolio import TriggerIndex
+
+
+def brute_force(positions, bid, ask):
+    return sorted(
+        id for id, (side, TP, SL) in positions.items()
+        if (side == 1 and (bid >= TP or bid <= SL)) or (side == -1 and (ask <= TP or ask >= SL))
+    )
+
+
+@pytest.fixture
+def index():
+    index = TriggerIndex()
+    index.add(0, 1, TP=1205.0, SL=1195.0)
+    index.add(1, -1, TP=1195.0, SL=1205.0)
+    return index
+
+
+@pytest.mark.parametrize("bid, ask, expected", [
+    (1205.0, 1200.0, [0]),
+    (1195.0, 1200.0, [0]),
+    (1200.0, 1195.0, [1]),
+    (1200.0, 1205.0, [1]),
+    (1205.0, 1205.0, [0, 1]),
+    (1204.9, 1195.1, []),
+    (1195.1, 1204.9, []),
+])
+def test_exact_levels(index, bid, ask, expected):
+    assert index.triggered(bid, ask).tolist() == expected
+
+
+def test_removed_positions(index):
+    index.add(2, 1, TP=1205.0, SL=1190.0)
+    index.remove(np.array([0]))
+    assert index.triggered(1205.0, 1200.0).tolist() == [2]
+    assert index.triggered(1195.0, 1200.0).tolist() == []
+
+    index.remove(np.array([1, 2]))
+    assert index.triggered(1300.0, 1300.0).tolist() == []
+    assert index.bounds() == (np.inf, -np.inf, -np.inf, np.inf)
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_matches_brute_force(seed):
+    rng = np.random.default_rng(seed)
+    index = TriggerIndex()
+    positions = {}
+    for id in range(300):
+        price = round(1200 + rng.integers(-20, 21) * 0.1, 1)
+        side = int(rng.choice([1, -1]))
+        TP, SL = round(rng.integers(1, 20) * 0.1, 1), round(rng.integers(1, 20) * 0.1, 1)
+        levels = (price + TP, price - SL) if side == 1 else (price - TP, price + SL)
+        index.add(id, side, *levels)
+        positions[id] = (side, *levels)
+
+        if rng.random() < 0.3:
+            removed = rng.choice(list(positions), size=min(3, len(positions)), replace=False)
+            index.remove(np.sort(removed))
+            for r in removed.tolist():
+                del positions[r]
+
+        bid = round(1200 + rng.integers(-25, 26) * 0.1, 1)
+        ask = round(bid + rng.integers(1, 3) * 0.1, 1)
+        assert index.triggered(bid, ask).tolist() == brute_force(positions, bid, ask)
@@ -1,4 +1,10 @@
 from .downloader import Downloader
 from .processor import processor
+from .session import SessionCalendar
+from .cache import FrameCache, frame_cache, processed_bars, bar_pyramid
+from .bars import BarPyramid
+from .streaming import StreamingProcessor, RingBuffer
+from .archive import TickArchive
+from .store import TickStore
 from .visualize import *
 from .helpers import *
@@ -0,0 +1,275 @@
+"""
+    Local tick store partitioned by trading day.
+    Each day is a directory of one .npy file per column, next to an index.json
+    listing the stored days, their number of ticks and the column dtypes:
+
+        directory/ticker/index.json
+        directory/ticker/2023-03-01/datetime.npy   int64 epoch nanoseconds
+        directory/ticker/2023-03-01/price.npy      int32 ticks of 0.1 point
+        directory/ticker/2023-03-01/volume.npy     uint32
+        ...
+
+    Prices are stored as integer multiples of the 0.1 point tick size of VN30F,
+    missing prices and volumes as the largest value of their dtype, and they are
+    converted back to float64 only when read as a DataFrame.
+    Reads open only the partitions of the requested days, memory-mapped.
+    The index also keeps when each day was written and the ranges of days a
+    sync fetched entirely, so that a covered range is read without the database.
+"""
+import json
+import os
+import shutil
+import threading
+from typing import Dict, Iterator, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def missing(dtype: np.dtype):
+    """Stored value of a missing value in an integer column."""
+    return np.iinfo(dtype).max
+
+
+def encodable(values: np.ndarray, dtype, scale: int) -> bool:
+    """Whether the float64 `values` are exactly multiples of 1/scale in the range of the integer `dtype`."""
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return True
+
+    present = np.where(np.isnan(values), 0, values)
+    scaled = np.rint(present * scale)
+    return bool(
+        np.array_equal(scaled / scale, present)
+        and scaled.min(initial=0) >= np.iinfo(dtype).min
+        and scaled.max(initial=0) < missing(dtype)
+    )
+
+
+def encode(values: np.ndarray, dtype, scale: int) -> np.ndarray:
+    """Integer multiples of 1/scale of the float64 `values`, missing values as the largest value of `dtype`."""
+    dtype = np.dtype(dtype)
+    if dtype.kind == "f":
+        return values.astype(dtype)
+
+    nan = np.isnan(values)
+    return np.where(nan, missing(dtype), np.rint(np.where(nan, 0, values) * scale)).astype(dtype)
+
+
+def decode(stored: np.ndarray, scale: int) -> np.ndarray:
+    """float64 values of the `stored` column, NaN where missing."""
+    if stored.dtype.kind == "f":
+        return np.asarray(stored, dtype=np.float64)
+
+    values = stored / scale
+    values[stored == missing(stored.dtype)] = np.nan
+    return values
+
+
+class TickArchive:
+    """
+        Ticks of one ticker stored by trading day under `directory`.
+        - write() splits a tick DataFrame by day and replaces the partitions of those days
+        - read() gives the ticks of a range of days as a DataFrame
+        - partitions() yields the stored read-only memory-mapped arrays day by day, without copies
+        - chunks() yields one DataFrame per day, as StreamingBacktesting consumes them
+        Partitions are written under a temporary name and the index last,
+        so readers never see a partial day.
+        - complete() tells the days that were written with ticks after they were over
+        - mark_synced() and synced() record and check the ranges of days a sync fetched
+    """
+    COLUMNS = {
+        "price": np.int32,
+        "bid_price": np.int32,
+        "ask_price": np.int32,
+        "volume": np.uint32
+    }
+
+    # Stored integer = value * scale
+    SCALE = {
+        "price": 10,
+        "bid_price": 10,
+        "ask_price": 10,
+        "volume": 1
+    }
+
+    def __init__(self, directory: str = os.path.join(".cache", "ticks"), ticker: str = "VN30F1M"):
+        self.directory = os.path.join(directory, ticker)
+        self.ticker = ticker
+        self._lock = threading.Lock()
+        self._index = self._read_index()
+
+        # Archives written before the compact format keep their float64 columns
+        self.dtypes = {name: np.dtype(dtype) for name, dtype in self._index["columns"].items()}
+
+    def __len__(self) -> int:
+        return len(self._index["days"])
+
+    def __contains__(self, day) -> bool:
+        return self._day(day) in self._index["days"]
+
+    @property
+    def days(self) -> pd.DatetimeIndex:
+        """Stored trading days, sorted."""
+        return pd.DatetimeIndex(sorted(self._index["days"]))
+
+    def rows(self, day) -> int:
+        return self._index["days"][self._day(day)]
+
+    @staticmethod
+    def _day(day) -> str:
+        return pd.Timestamp(day).strftime("%Y-%m-%d")
+
+    def _path(self, *names) -> str:
+        return os.path.join(self.directory, *names)
+
+    def _read_index(self) -> dict:
+        if not os.path.exists(self._path("index.json")):
+            index = {"columns": {name: np.dtype(dtype).name for name, dtype in self.COLUMNS.items()}, "days": {}}
+        else:
+            with open(self._path("index.json")) as file:
+                index = json.load(file)
+
+        # Write times of the days and synced ranges, missing from older archives
+        index.setdefault("fetched", {})
+        index.setdefault("synced", [])
+        return index
+
+    def _write_index(self):
+        tmp = self._path(f"index.json.{os.getpid()}.{threading.get_ident()}.tmp")
+        with open(tmp, "w") as file:
+            json.dump(self._index, file, sort_keys=True)
+        os.replace(tmp, self._path("index.json"))
+
+    def encode(self, name: str, values: np.ndarray) -> np.ndarray:
+        """Stored form of the float64 `values` of column `name`."""
+        dtype = self.dtypes[name]
+        assert encodable(values, dtype, self.SCALE[name]), f"{name} must be a multiple of 1/{self.SCALE[name]} in the range of {dtype}"
+        return encode(values, dtype, self.SCALE[name])
+
+    def decode(self, name: str, stored: np.ndarray) -> np.ndarray:
+        """float64 values of the stored column `name`, NaN where missing."""
+        return decode(stored, self.SCALE[name])
+
+    def write(self, data: pd.DataFrame):
+        """Store the ticks of `data`, one partition per day, replacing the days already stored."""
+        if data is None or len(data) == 0:
+            return
+
+        data = data.sort_index(kind="stable")
+        days = data.index.normalize()
+        bounds = np.flatnonzero(np.r_[True, days[1:] != days[:-1], True])
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            self.write_day(days[start], data.iloc[start:end])
+
+    def write_day(self, day, data: pd.DataFrame):
+        """Store the ticks of one trading day, safe to call from several threads."""
+        day = self._day(day)
+        arrays = {"datetime": data.index.values.astype("datetime64[ns]").view(np.int64)}
+        for name in self.COLUMNS:
+            arrays[name] = self.encode(name, data[name].to_numpy(dtype=np.float64))
+
+        # Written under a temporary name so that readers never see a partial day
+        tmp = self._path(f"{day}.{os.getpid()}.{threading.get_ident()}.tmp")
+        os.makedirs(tmp, exist_ok=True)
+        for name, array in arrays.items():
+            np.save(os.path.join(tmp, f"{name}.npy"), np.ascontiguousarray(array))
+
+        with self._lock:
+            if os.path.exists(self._path(day)):
+                shutil.rmtree(self._path(day))
+            os.replace(tmp, self._path(day))
+            self._index["days"][day] = len(data)
+            self._index["fetched"][day] = pd.Timestamp.now().isoformat()
+            self._write_index()
+
+    def remove(self, day):
+        """Drop the partition of one trading day."""
+        day = self._day(day)
+        with self._lock:
+            self._index["fetched"].pop(day, None)
+            if self._index["days"].pop(day, None) is not None:
+                self._write_index()
+            if os.path.exists(self._path(day)):
+                shutil.rmtree(self._path(day))
+
+    def complete(self, day) -> bool:
+        """
+            Stored with ticks and written after the day was over.
+            Days stored before the write time was recorded are complete when they have ticks.
+        """
+        day = self._day(day)
+        if not self._index["days"].get(day):
+            return False
+
+        fetched = self._index["fetched"].get(day)
+        return fetched is None or pd.Timestamp(fetched) >= pd.Timestamp(day) + pd.Timedelta(days=1)
+
+    def mark_synced(self, start, end):
+        """Record that every trading day from `start` to `end` was fetched."""
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        if start > end:
+            return
+
+        with self._lock:
+            ranges = sorted([(pd.Timestamp(a), pd.Timestamp(b)) for a, b in self._index["synced"]] + [(start, end)])
+            merged = [ranges[0]]
+            for a, b in ranges[1:]:
+                if a <= merged[-1][1] + pd.Timedelta(days=1):
+                    merged[-1] = (merged[-1][0], max(merged[-1][1], b))
+                else:
+                    merged.append((a, b))
+
+            self._index["synced"] = [[self._day(a), self._day(b)] for a, b in merged]
+            self._write_index()
+
+    def synced(self, start, end) -> bool:
+        """A sync fetched every trading day from `start` to `end` and all of them are complete."""
+        start, end = pd.Timestamp(start).normalize(), pd.Timestamp(end).normalize()
+        if not any(pd.Timestamp(a) <= start and end <= pd.Timestamp(b) for a, b in self._index["synced"]):
+            return False
+        return all(self.complete(day) for day in self.select(start, end))
+
+    def select(self, start=None, end=None) -> pd.DatetimeIndex:
+        """Stored days from `start` to `end`, both included."""
+        days = self.days
+        if start is not None:
+            days = days[days >= pd.Timestamp(start).normalize()]
+        if end is not None:
+            days = days[days <= pd.Timestamp(end).normalize()]
+        return days
+
+    def partition(self, day) -> Dict[str, np.ndarray]:
+        """Read-only memory-mapped stored columns of one day, `datetime` as int64 epoch nanoseconds."""
+        day = self._day(day)
+        assert day in self._index["days"], f"{day} is not stored"
+        return {
+            name: np.load(self._path(day, f"{name}.npy"), mmap_mode="r")
+            for name in ["datetime", *self.COLUMNS]
+        }
+
+    def partitions(self, start=None, end=None) -> Iterator[Tuple[pd.Timestamp, Dict[str, np.ndarray]]]:
+        """(day, columns) of every stored day in the range, without copies."""
+        for day in self.select(start, end):
+            yield day, self.partition(day)
+
+    def arrays(self, start=None, end=None) -> Dict[str, np.ndarray]:
+        """Stored columns of the days in the range, concatenated, still in their compact dtypes."""
+        parts = [columns for _, columns in self.partitions(start, end)]
+        return {
+            name: np.concatenate([part[name] for part in parts]) if parts else np.empty(0, dtype=dtype)
+            for name, dtype in [("datetime", np.dtype(np.int64)), *self.dtypes.items()]
+        }
+
+    def _frame(self, arrays: Dict[str, np.ndarray]) -> pd.DataFrame:
+        index = pd.DatetimeIndex(np.asarray(arrays["datetime"]).view("datetime64[ns]"), name="datetime")
+        return pd.DataFrame({name: self.decode(name, arrays[name]) for name in self.COLUMNS}, index=index)
+
+    def read(self, start=None, end=None) -> pd.DataFrame:
+        """Ticks of the days from `start` to `end` (both included) as a DataFrame indexed by datetime."""
+        return self._frame(self.arrays(start, end))
+
+    def chunks(self, start=None, end=None) -> Iterator[pd.DataFrame]:
+        """One DataFrame of ticks per stored day in the range."""
+        for _, columns in self.partitions(start, end):
+            yield self._frame(columns)
@@ -0,0 +1,115 @@
+"""
+    OHLCV bars aggregated from the ticks once and derived from each other afterwards.
+    The ticks are reduced to 1-minute bars over precomputed bucket boundaries,
+    every N-minute bar is then built from the 1-minute bars it covers,
+    without going back to the ticks.
+"""
+import numpy as np
+import pandas as pd
+
+MINUTE = pd.Timedelta(minutes=1).value
+COLUMNS = ["open", "high", "low", "close", "volume"]
+
+
+def _aggregate(keys: np.ndarray, open, high, low, close, volume):
+    """First row and OHLCV columns of the bars of the consecutive equal `keys`."""
+    starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]]) if len(keys) else np.empty(0, dtype=np.int64)
+    ends = np.r_[starts[1:], len(keys)].astype(np.int64)
+    if len(starts) == 0:
+        return starts, [np.empty(0) for _ in COLUMNS]
+
+    return starts, [
+        open[starts],
+        np.maximum.reduceat(high, starts),
+        np.minimum.reduceat(low, starts),
+        close[ends - 1],
+        np.add.reduceat(volume, starts)
+    ]
+
+
+class BarPyramid:
+    """
+        Bars of one tick DataFrame (price, volume) at every resolution.
+        - 1-minute bars are built from the ticks in the constructor, minutes
+          without ticks (lunch break, nights, holidays) have no bar
+        - bars(N) derives N-minute bars from the 1-minute bars, as
+          data.resample(f"{N}T").agg({"price": "ohlc", "volume": "sum"}).dropna()
+          buckets them: from midnight of the first day, left closed and left labelled
+        - tick_bars, volume_bars and value_bars close a bar every `size` ticks,
+          traded volume or traded value
+        Volumes are summed minute by minute, equal to the tick sums for the
+        whole-number quantities of the feed. Built frames are kept and must not be modified.
+    """
+    def __init__(self, data: pd.DataFrame):
+        self.index_name = data.index.name
+        self._times = data.index.values.astype("datetime64[ns]").view(np.int64)
+        self._prices = data["price"].to_numpy(dtype=np.float64)
+        self._volumes = np.nan_to_num(data["volume"].to_numpy(dtype=np.float64))
+        self._frames = {}
+
+        # Ticks without a price do not make bars, their volume still counts in their minute
+        minutes = self._times // MINUTE
+        priced = ~np.isnan(self._prices)
+        prices = self._prices[priced]
+        starts, (self.open, self.high, self.low, self.close, _) = _aggregate(
+            minutes[priced], prices, prices, prices, prices, prices
+        )
+        self.minutes = minutes[priced][starts]
+
+        # Volume of every minute with ticks, priced or not, and of the minutes with a bar
+        starts, volume = _aggregate(minutes, *[self._volumes] * 5)
+        self.volume_minutes, self.minute_volume = minutes[starts], volume[4]
+        self.volume = self.minute_volume[np.searchsorted(self.volume_minutes, self.minutes)]
+
+        # Buckets of every resolution start from midnight of the first day, as in resample
+        self.origin = (self._times[0] // (1440 * MINUTE)) * 1440 if len(self._times) else 0
+
+    def __len__(self) -> int:
+        return len(self.minutes)
+
+    def _frame(self, times: np.ndarray, columns) -> pd.DataFrame:
+        index = pd.DatetimeIndex(times.view("datetime64[ns]"), name=self.index_name)
+        return pd.DataFrame(dict(zip(COLUMNS, columns)), index=index)
+
+    def bars(self, interval: int) -> pd.DataFrame:
+        """OHLCV bars of `interval` minutes."""
+        interval = int(interval)
+        assert interval >= 1, "Interval must be at least 1 minute"
+        if interval in self._frames:
+            return self._frames[interval]
+
+        keys = (self.minutes - self.origin) // interval
+        starts, columns = _aggregate(keys, self.open, self.high, self.low, self.close, self.volume)
+
+        # Minutes without prices still add their volume to the bar covering them
+        volume_keys = (self.volume_minutes - self.origin) // interval
+        volume_starts, volume = _aggregate(volume_keys, *[self.minute_volume] * 5)
+        columns[4] = volume[4][np.searchsorted(volume_keys[volume_starts], keys[starts])]
+
+        frame = self._frame((self.origin + keys[starts] * interval) * MINUTE, columns)
+
+        self._frames[interval] = frame
+        return frame
+
+    def _bars_by(self, keys: np.ndarray) -> pd.DataFrame:
+        """Bars of the runs of equal `keys` over the priced ticks, labelled with their first tick."""
+        priced = ~np.isnan(self._prices)
+        prices = self._prices[priced]
+        starts, columns = _aggregate(keys[priced], prices, prices, prices, prices, self._volumes[priced])
+        return self._frame(self._times[priced][starts], columns)
+
+    def tick_bars(self, size: int) -> pd.DataFrame:
+        """Bars of `size` ticks."""
+        return self._bars_by(np.arange(len(self._times)) // size)
+
+    def volume_bars(self, size: float) -> pd.DataFrame:
+        """Bars closing once `size` contracts have traded since the previous bar."""
+        traded = np.cumsum(self._volumes)
+        return self._bars_by(np.floor((traded - self._volumes) / size).astype(np.int64))
+
+    def value_bars(self, size: float) -> pd.DataFrame:
+        """Bars closing once a value of `size` (price x volume) has traded since the previous bar."""
+        value = np.nan_to_num(self._prices) * self._volumes
+        traded = np.cumsum(value)
+        return self._bars_by(np.floor((traded - value) / size).astype(np.int64))
+
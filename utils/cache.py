@@ -0,0 +1,201 @@
+from collections import OrderedDict
+import hashlib
+import inspect
+import json
+import logging
+import os
+import weakref
+
+import numpy as np
+import pandas as pd
+
+from . import indicators as _kernels
+from . import processor as _pipeline
+from .processor import processor
+from .bars import BarPyramid
+
+
+# Hashes of the last tick DataFrames, keyed by id and checked against a weak reference
+_fingerprints = OrderedDict()
+
+
+def fingerprint(data: pd.DataFrame, columns=("price", "volume"), capacity: int = 8) -> str:
+    """
+        Hash of the index and `columns` of the tick data.
+        - The hash of a DataFrame is kept while the frame is alive, its ticks
+          must not be modified in place once hashed
+        - Frames whose index or length changed are hashed again
+    """
+    # A TickStore hashes its ticks once
+    if hasattr(data, "fingerprint") and tuple(columns) == ("price", "volume"):
+        return data.fingerprint
+
+    memo = isinstance(data, pd.DataFrame)
+    key = (id(data), tuple(columns))
+    if memo and key in _fingerprints:
+        ref, index, length, value = _fingerprints[key]
+        if ref() is data and index() is data.index and len(data) == length:
+            _fingerprints.move_to_end(key)
+            return value
+
+    digest = hashlib.blake2b(digest_size=16)
+    digest.update(np.ascontiguousarray(data.index.values.astype("datetime64[ns]")).view(np.uint8))
+    for column in columns:
+        digest.update(np.ascontiguousarray(data[column].to_numpy(dtype=np.float64)).view(np.uint8))
+    value = digest.hexdigest()
+
+    if memo:
+        _fingerprints[key] = (weakref.ref(data), weakref.ref(data.index), len(data), value)
+        while len(_fingerprints) > capacity:
+            _fingerprints.popitem(last=False)
+    return value
+
+
+def processor_version() -> str:
+    """Hash of the source of the indicator pipeline, so edits to it miss the cache."""
+    source = inspect.getsource(_pipeline) + inspect.getsource(_kernels)
+    return hashlib.blake2b(source.encode(), digest_size=8).hexdigest()
+
+
+class FrameCache:
+    """
+        Cache of the resampled and processed bars of every interval.
+        - Keys are (data fingerprint, interval, processor version, indicator columns, backend)
+        - Frames are kept in memory under a byte budget, least recently used first out
+        - Evicted frames spill to `directory` as .npy files, read back memory-mapped,
+          so later trials, later runs and other processes reuse them
+        Frames must be all float64 with a DatetimeIndex, as Backtesting produces them.
+        Cached frames are shared between users and must not be modified.
+    """
+    def __init__(self, budget: int = 1 << 30, directory: str = os.path.join(".cache", "frames")):
+        self.budget = budget
+        self.directory = directory
+        self.nbytes = 0
+        self._frames = OrderedDict()
+        self._version = processor_version()
+
+    def key(self, data: pd.DataFrame, interval, columns=None, backend="ta") -> str:
+        key = f"{fingerprint(data)}-{interval}-{self._version}"
+        if columns is not None:
+            # Frames of a subset of the indicators are kept apart from the full frames
+            digest = hashlib.blake2b(",".join(sorted(columns)).encode(), digest_size=8).hexdigest()
+            key = f"{key}-{digest}"
+        if backend != "ta":
+            key = f"{key}-{backend}"
+        return key
+
+    def __contains__(self, key) -> bool:
+        return key in self._frames or os.path.exists(self._path(key, "json"))
+
+    def get(self, key) -> pd.DataFrame:
+        """Frame of `key` from memory or from disk, None when it is not cached."""
+        if key in self._frames:
+            self._frames.move_to_end(key)
+            return self._frames[key]
+        return self._load(key)
+
+    def put(self, key, frame: pd.DataFrame):
+        """Keep `frame` in memory, spilling the least recently used frames over the budget."""
+        if key in self._frames:
+            self.nbytes -= self._size(self._frames.pop(key))
+
+        self._frames[key] = frame
+        self.nbytes += self._size(frame)
+
+        while self.nbytes > self.budget and len(self._frames) > 1:
+            old_key, old_frame = self._frames.popitem(last=False)
+            self.nbytes -= self._size(old_frame)
+            self._spill(old_key, old_frame)
+
+    def flush(self):
+        """Write every frame held in memory to disk."""
+        for key, frame in self._frames.items():
+            self._spill(key, frame)
+
+    def clear(self):
+        self._frames.clear()
+        self.nbytes = 0
+
+    @staticmethod
+    def _size(frame: pd.DataFrame) -> int:
+        return int(frame.memory_usage(index=True).sum())
+
+    def _path(self, key, suffix) -> str:
+        return os.path.join(self.directory, f"{key}.{suffix}")
+
+    def _spill(self, key, frame: pd.DataFrame):
+        """Write `frame` unless it is already on disk, the manifest is written last."""
+        if os.path.exists(self._path(key, "json")):
+            return
+
+        os.makedirs(self.directory, exist_ok=True)
+        arrays = {
+            "values": frame.to_numpy(dtype=np.float64),
+            "index": frame.index.values.astype("datetime64[ns]").view(np.int64)
+        }
+        for name, array in arrays.items():
+            # Written under a temporary name so that readers never see a partial file
+            tmp = self._path(key, f"{name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as file:
+                np.save(file, array)
+            os.replace(tmp, self._path(key, f"{name}.npy"))
+
+        manifest = {"columns": list(frame.columns), "index_name": frame.index.name}
+        tmp = self._path(key, f"json.{os.getpid()}.tmp")
+        with open(tmp, "w") as file:
+            json.dump(manifest, file)
+        os.replace(tmp, self._path(key, "json"))
+
+    def _load(self, key) -> pd.DataFrame:
+        """Read-only memory-mapped frame of `key`, None when it is not on disk."""
+        if not os.path.exists(self._path(key, "json")):
+            return None
+
+        with open(self._path(key, "json")) as file:
+            manifest = json.load(file)
+        values = np.load(self._path(key, "values.npy"), mmap_mode="r")
+        index = np.load(self._path(key, "index.npy"), mmap_mode="r")
+
+        index = pd.DatetimeIndex(np.asarray(index).view("datetime64[ns]"), name=manifest["index_name"])
+        return pd.DataFrame(values, index=index, columns=manifest["columns"], copy=False)
+
+
+# Cache shared by every Backtesting of the process
+frame_cache = FrameCache()
+
+# Bar pyramids of the last tick DataFrames, shared by every user of the process
+_pyramids = OrderedDict()
+
+
+def bar_pyramid(data: pd.DataFrame, capacity: int = 4) -> BarPyramid:
+    """BarPyramid of `data`, built on the first request for the same ticks."""
+    key = fingerprint(data)
+    if key in _pyramids:
+        _pyramids.move_to_end(key)
+        return _pyramids[key]
+
+    pyramid = _pyramids[key] = BarPyramid(data)
+    while len(_pyramids) > capacity:
+        _pyramids.popitem(last=False)
+    return pyramid
+
+
+def processed_bars(data: pd.DataFrame, interval, cache: FrameCache = frame_cache, columns=None, backend="ta") -> pd.DataFrame:
+    """
+        OHLCV bars of `data` at `interval` minutes with the indicators of `processor`,
+        shifted by one bar so that each bar only sees the closed bars before it.
+        With `columns`, only those indicators are computed, backend selects
+        their implementation (see processor).
+    """
+    key = cache.key(data, interval, columns, backend)
+    ohlcv = cache.get(key)
+    if ohlcv is not None:
+        return ohlcv
+
+    ohlcv = bar_pyramid(data).bars(interval)
+    logging.info(f"Resampled data to {interval} minutes interval")
+    ohlcv = processor(ohlcv, columns, backend)
+    ohlcv = ohlcv.shift(1).dropna().astype(float)
+
+    cache.put(key, ohlcv)
+    return ohlcv
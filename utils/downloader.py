@@ -1,9 +1,54 @@
 from typing import Callable, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+import logging
 import pg8000
+import numpy as np
 import pandas as pd
 
+from .session import SessionCalendar
+from .archive import TickArchive
+from .bars import BarPyramid
+
 class Downloader:
-    def __init__(self, processor: Callable=None):
+    COLUMNS = ["datetime", "price", "bid_price", "ask_price", "volume"]
+
+    QUERY = """
+        SELECT
+            m.datetime,
+            m.price,
+            bp.price as bid_price,
+            ap.price as ask_price,
+            v.quantity
+        FROM quote.matched m
+        JOIN
+            quote.futurecontractcode fc ON DATE(m.datetime) = fc.datetime AND m.tickersymbol = fc.tickersymbol
+        LEFT JOIN
+            quote.total v ON v.datetime = m.datetime AND v.tickersymbol = m.tickersymbol
+        LEFT JOIN
+            quote.bidprice bp ON bp.datetime = m.datetime AND bp.tickersymbol = m.tickersymbol
+        LEFT JOIN
+            quote.askprice ap ON ap.datetime = m.datetime AND ap.tickersymbol = m.tickersymbol
+        WHERE
+            m.datetime BETWEEN %s AND %s
+            AND fc.futurecode = %s
+            AND bp.depth=1 AND ap.depth=1
+        ORDER BY m.datetime
+    """
+
+    DAYS_QUERY = """
+        SELECT DISTINCT fc.datetime
+        FROM quote.futurecontractcode fc
+        WHERE
+            fc.datetime BETWEEN %s AND %s
+            AND fc.futurecode = %s
+        ORDER BY fc.datetime
+    """
+
+    def __init__(self, processor: Callable=None, connect: Callable=None):
+        """
+            `connect` returns a new DB-API connection, pg8000 to the algotrade database by default.
+            The connection is only opened on the first query.
+        """
         self._info = {
             "host": "api.algotrade.vn",
             "port": 5432,
@@ -12,11 +57,11 @@ class Downloader:
         }
 
         self._processor = processor
+        self._new_connection = connect or self._pg8000_connection
+        self._conn = None
 
-        self._connect()
-    
-    def _connect(self) -> None:
-        self.conn = pg8000.connect(
+    def _pg8000_connection(self):
+        return pg8000.connect(
             host=self._info["host"],
             port=self._info["port"],
             user=self._info["user"],
@@ -24,6 +69,43 @@ class Downloader:
             database = "algotradeDB",
             )
 
+    def _connect(self) -> None:
+        self._conn = self._new_connection()
+
+    @property
+    def conn(self):
+        if self._conn is None:
+            self._connect()
+        return self._conn
+
+    @classmethod
+    def _fetch(cls, cur, batch: int = 50_000) -> pd.DataFrame:
+        """
+            Rows of the executed tick query read `batch` at a time into typed arrays,
+            sorted and restricted to the trading session.
+        """
+        times, columns = [], [[] for _ in cls.COLUMNS[1:]]
+        while True:
+            rows = cur.fetchmany(batch)
+            if not rows:
+                break
+
+            fields = list(zip(*rows))
+            times.append(pd.DatetimeIndex(fields[0]).values.astype("datetime64[ns]"))
+            for column, values in zip(columns, fields[1:]):
+                # NULLs of the outer joins become NaN
+                column.append(np.array([np.nan if value is None else value for value in values], dtype=np.float64))
+
+        index = pd.DatetimeIndex(np.concatenate(times) if times else np.empty(0, dtype="datetime64[ns]"), name="datetime")
+        result = pd.DataFrame({
+            name: np.concatenate(column) if column else np.empty(0)
+            for name, column in zip(cls.COLUMNS[1:], columns)
+        }, index=index)
+        result.sort_index(inplace=True, kind="stable")
+
+        # Keep the ticks from the opening auction to the end of continuous trading
+        return result[SessionCalendar(result.index).trading]
+
     def get_historical_data(self, 
                   end_date: str=None, 
                   start_date: str="2023-01-01",
@@ -32,61 +114,13 @@ class Downloader:
         try:
             cur = self.conn.cursor()
             
-            query = """
-                SELECT
-                    m.datetime,
-                    m.price,
-                    bp.price as bid_price,
-                    ap.price as ask_price,
-                    v.quantity
-                FROM quote.matched m
-                JOIN
-                    quote.futurecontractcode fc ON DATE(m.datetime) = fc.datetime AND m.tickersymbol = fc.tickersymbol
-                LEFT JOIN
-                    quote.total v ON v.datetime = m.datetime AND v.tickersymbol = m.tickersymbol
-                LEFT JOIN
-                    quote.bidprice bp ON bp.datetime = m.datetime AND bp.tickersymbol = m.tickersymbol
-                LEFT JOIN
-                    quote.askprice ap ON ap.datetime = m.datetime AND ap.tickersymbol = m.tickersymbol
-                WHERE
-                    m.datetime BETWEEN %s AND %s
-                    AND fc.futurecode = %s
-                    AND bp.depth=1 AND ap.depth=1
-                ORDER BY m.datetime
-            """
-            
             # Execute a query
-            cur.execute(query, (start_date, end_date, ticker))
-            result = cur.fetchall()
+            cur.execute(self.QUERY, (start_date, end_date, ticker))
+            result = self._fetch(cur)
             cur.close()
 
-            # Return the result 
-            result = pd.DataFrame(result, columns=["datetime", "price", "bid_price", "ask_price", "volume"])
-            result.set_index("datetime", inplace=True)
-            result.index = pd.to_datetime(result.index)
-            result = result.astype(float)
-            result.sort_index(inplace=True)
-            # #print(result)
-
-            # Convert the DatetimeIndex to just the time component
-            times = result.index.time
-
-            # Create a boolean mask for times outside the range 14:30 to 09:15
-            # Since the range crosses midnight, we handle it in two parts:
-            # 1. Times after 14:30 on day 1
-            # 2. Times before 09:15 on day 2
-            mask = (times <= pd.to_datetime('14:30').time()) & (times >= pd.to_datetime('09:00').time())
-
-            # Filter the DataFrame to keep rows outside the specified time range
-            result = result[mask]
-
             if interval:
-                result = result.resample(interval).agg({
-                    "price": "ohlc",
-                    "quantity": "sum"
-                }).dropna()
-
-                result.columns = result.columns.droplevel(0)
+                result = BarPyramid(result).bars(pd.Timedelta(interval) // pd.Timedelta(minutes=1))
 
             if self._processor:
                 result = self._processor(result)
@@ -97,6 +131,69 @@ class Downloader:
             #print(f"An error occurred: {e}")
             return None
         
+    def trading_days(self, start_date: str, end_date: str, ticker: str="VN30F1M") -> pd.DatetimeIndex:
+        """Days on which `ticker` maps to a contract, from start_date to end_date."""
+        cur = self.conn.cursor()
+        cur.execute(self.DAYS_QUERY, (start_date, end_date, ticker))
+        days = [row[0] for row in cur.fetchall()]
+        cur.close()
+        return pd.DatetimeIndex(days).normalize()
+
+    def missing_days(self, archive: TickArchive, start_date: str, end_date: str, ticker: str="VN30F1M") -> pd.DatetimeIndex:
+        """
+            Trading days of the range that are not completely stored in `archive` yet:
+            not stored, stored without ticks or stored before the day was over.
+            The current day is left out until it is over.
+        """
+        days = self.trading_days(start_date, end_date, ticker)
+        days = days[days < pd.Timestamp.now().normalize()]
+        return days[[not archive.complete(day) for day in days]]
+
+    def _download_days(self, archive: TickArchive, days: pd.DatetimeIndex, ticker: str, batch: int) -> int:
+        """Fetch `days` on a connection of their own, storing each day as soon as it arrives."""
+        conn = self._new_connection()
+        try:
+            for day in days:
+                cur = conn.cursor()
+                cur.execute(self.QUERY, (day, day + pd.Timedelta(days=1) - pd.Timedelta(microseconds=1), ticker))
+                archive.write_day(day, self._fetch(cur, batch))
+                cur.close()
+                logging.info(f"Downloaded {ticker} ticks of {day.date()}")
+        finally:
+            conn.close()
+        return len(days)
+
+    def sync(self,
+             archive: TickArchive,
+             end_date: str,
+             start_date: str="2023-01-01",
+             ticker: str="VN30F1M",
+             n_connections: int=4,
+             batch: int=50_000) -> pd.DatetimeIndex:
+        """
+            Download the trading days of the range missing from `archive`.
+            - The missing days are split in contiguous ranges over `n_connections`
+              connections fetching in parallel
+            - Rows are read `batch` at a time into typed arrays
+            - Each day is written to the archive as soon as it is fetched,
+              an interrupted sync resumes from the days not stored yet
+            - A range the archive already covers (see TickArchive.synced) is not
+              queried at all, the database is not needed to read it
+            Returns the days that were downloaded.
+        """
+        if archive.synced(start_date, end_date):
+            return pd.DatetimeIndex([])
+
+        missing = self.missing_days(archive, start_date, end_date, ticker)
+        if len(missing):
+            groups = [group for group in np.array_split(np.arange(len(missing)), max(min(n_connections, len(missing)), 1)) if len(group)]
+            with ThreadPoolExecutor(max_workers=len(groups)) as pool:
+                list(pool.map(lambda group: self._download_days(archive, missing[group], ticker, batch), groups))
+
+        # The trading days before the current one are final
+        archive.mark_synced(start_date, min(pd.Timestamp(end_date), pd.Timestamp.now().normalize() - pd.Timedelta(days=1)))
+        return missing
+
     def query(self, query: str) -> pd.DataFrame:
         try:
             cur = self.conn.cursor()
@@ -109,4 +206,6 @@ class Downloader:
             return None
     
     def close(self) -> None:
-        self.conn.close()
\ No newline at end of file
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
\ No newline at end of file
@@ -19,4 +19,12 @@ def train_test_split(data: pd.DataFrame, ratio: float) -> tuple:
     train_size = int(ratio * len(data))
     train_data = data.iloc[:train_size].copy()
     test_data = data.iloc[train_size:].copy()
-    return train_data, test_data
\ No newline at end of file
+    return train_data, test_data
+
+def read_tick_chunks(path: str, chunksize: int = 100_000):
+    """
+        Reads a tick CSV written by Downloader in chunks of `chunksize` rows,
+        for StreamingBacktesting. Yields DataFrames indexed by datetime.
+    """
+    for chunk in pd.read_csv(path, chunksize=chunksize, index_col=0, parse_dates=True, float_precision="round_trip"):
+        yield chunk
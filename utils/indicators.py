@@ -0,0 +1,293 @@
+"""
+    NumPy kernels of the indicators used by processor, reproducing the ta library.
+    Every kernel takes float64 arrays and returns float64 arrays of the same length,
+    NaN where ta gives NaN. Rolling windows are vectorized over strided views,
+    recursive indicators (EMA, Wilder smoothing, ADX, ATR, PSAR) run one loop
+    over plain Python floats, with the same operations in the same order as ta and pandas.
+"""
+import math
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+def shift(values: np.ndarray, periods: int = 1, fill=np.nan) -> np.ndarray:
+    out = np.full(len(values), fill, dtype=np.float64)
+    if periods < len(values):
+        out[periods:] = values[:len(values) - periods]
+    return out
+
+
+def rolling(values: np.ndarray, window: int, how: str = "mean") -> np.ndarray:
+    """Rolling `how` (mean, sum, max, min, std) over full windows, NaN when a window has a NaN."""
+    out = np.full(len(values), np.nan)
+    if len(values) >= window:
+        out[window - 1:] = getattr(np, how)(sliding_window_view(values, window), axis=1)
+    return out
+
+
+def expanding_head(values: np.ndarray, window: int) -> np.ndarray:
+    """Rolling mean that averages the available values over the first window - 1 bars."""
+    out = rolling(values, window)
+    head = min(window - 1, len(values))
+    out[:head] = np.cumsum(values[:head]) / np.arange(1, head + 1)
+    return out
+
+
+def ema(values: np.ndarray, span: float = None, alpha: float = None, min_periods: int = 0) -> np.ndarray:
+    """pandas ewm(adjust=False).mean(), starting at the first value that is not NaN."""
+    alpha = 2.0 / (span + 1.0) if alpha is None else alpha
+    factor = 1.0 - alpha
+    min_periods = max(min_periods, 1)
+
+    out = [math.nan] * len(values)
+    weighted, weight, nobs = math.nan, 1.0, 0
+    for i, value in enumerate(values.tolist()):
+        observed = value == value
+        nobs += observed
+        if weighted == weighted:
+            weight *= factor
+            if observed:
+                if weighted != value:
+                    weighted = (weight * weighted + alpha * value) / (weight + alpha)
+                weight = 1.0
+        elif observed:
+            weighted = value
+        if nobs >= min_periods:
+            out[i] = weighted
+    return np.array(out)
+
+
+def true_range(high: np.ndarray, low: np.ndarray, prev_close: np.ndarray) -> np.ndarray:
+    """Largest of the three ranges, ignoring the NaN of the first previous close."""
+    return np.fmax(np.fmax(high - low, np.abs(high - prev_close)), np.abs(low - prev_close))
+
+
+def rsi(close: np.ndarray, window: int = 14) -> np.ndarray:
+    diff = close - shift(close)
+    up = np.where(diff > 0, diff, 0.0)
+    down = -np.where(diff < 0, diff, 0.0)
+    ema_up = ema(up, alpha=1 / window, min_periods=window)
+    ema_down = ema(down, alpha=1 / window, min_periods=window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(ema_down == 0, 100, 100 - (100 / (1 + ema_up / ema_down)))
+
+
+def stochrsi(close: np.ndarray, window: int = 14, smooth1: int = 3, smooth2: int = 3, rsi_values: np.ndarray = None):
+    """%K and %D of the stochastic RSI, `rsi_values` reuses an RSI of the same window."""
+    rsi_values = rsi(close, window) if rsi_values is None else rsi_values
+    lowest = rolling(rsi_values, window, "min")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        stoch = (rsi_values - lowest) / (rolling(rsi_values, window, "max") - lowest)
+    k = rolling(stoch, smooth1)
+    return k, rolling(k, smooth2)
+
+
+def macd(close: np.ndarray, window_slow: int = 26, window_fast: int = 12, window_sign: int = 9):
+    """MACD line and histogram."""
+    line = ema(close, window_fast, min_periods=window_fast) - ema(close, window_slow, min_periods=window_slow)
+    return line, line - ema(line, window_sign, min_periods=window_sign)
+
+
+def ppo_hist(close: np.ndarray, window_slow: int = 26, window_fast: int = 12, window_sign: int = 9) -> np.ndarray:
+    fast = ema(close, window_fast, min_periods=window_fast)
+    slow = ema(close, window_slow, min_periods=window_slow)
+    line = ((fast - slow) / slow) * 100
+    return line - ema(line, window_sign, min_periods=window_sign)
+
+
+def tsi(close: np.ndarray, window_slow: int = 25, window_fast: int = 13) -> np.ndarray:
+    diff = close - shift(close)
+    smoothed = ema(ema(diff, window_slow, min_periods=window_slow), window_fast, min_periods=window_fast)
+    smoothed_abs = ema(ema(np.abs(diff), window_slow, min_periods=window_slow), window_fast, min_periods=window_fast)
+    out = smoothed / smoothed_abs
+    out *= 100
+    return out
+
+
+def roc(close: np.ndarray, window: int = 12) -> np.ndarray:
+    previous = shift(close, window)
+    return ((close - previous) / previous) * 100
+
+
+def bollinger(close: np.ndarray, window: int = 20, window_dev: int = 2):
+    """Upper and lower Bollinger bands."""
+    mean = rolling(close, window)
+    std = rolling(close, window, "std")
+    return mean + window_dev * std, mean - window_dev * std
+
+
+def vwap(high, low, close, volume, window: int = 14) -> np.ndarray:
+    typical = (high + low + close) / 3.0
+    return rolling(typical * volume, window, "sum") / rolling(volume, window, "sum")
+
+
+def atr(high, low, close, window: int = 14, tr: np.ndarray = None) -> np.ndarray:
+    """Wilder average of the true range, zero over the first window - 1 bars as in ta."""
+    tr = true_range(high, low, shift(close)) if tr is None else tr
+    out = [0.0] * len(close)
+    if len(close) >= window:
+        out[window - 1] = tr[:window].mean()
+    values = tr.tolist()
+    for i in range(window, len(out)):
+        out[i] = (out[i - 1] * (window - 1) + values[i]) / float(window)
+    return np.array(out)
+
+
+def _wilder_sum(values: list, first: float, length: int, window: int) -> list:
+    """Wilder running sum of ta's ADX, the last entry is left at zero."""
+    out = [0.0] * length
+    out[0] = first
+    for i in range(1, length - 1):
+        out[i] = out[i - 1] - (out[i - 1] / float(window)) + values[window + i]
+    return out
+
+
+def adx(high, low, close, window: int = 14):
+    """ADX, +DI and -DI with the offsets and zero padding of ta's ADXIndicator."""
+    n = len(close)
+    length = n - (window - 1)
+    prev_close = shift(close)
+
+    movement = np.amax([high, prev_close], axis=0) - np.amin([low, prev_close], axis=0)
+    up = high - shift(high)
+    down = shift(low) - low
+    pos = np.where((up > down) & (up > 0), up, 0.0)
+    neg = np.where((down > up) & (down > 0), down, 0.0)
+    pos[0] = neg[0] = np.nan
+
+    def smoothed(values):
+        first = values[~np.isnan(values)][:window].sum()
+        return np.array(_wilder_sum(values.tolist(), first, length, window))
+
+    trs, dip, din = smoothed(movement), smoothed(pos), smoothed(neg)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        di_pos = np.where(trs != 0, 100 * (dip / trs), 0)
+        di_neg = np.where(trs != 0, 100 * (din / trs), 0)
+        total = di_pos + di_neg
+        dx = np.where(total != 0, 100 * np.abs((di_pos - di_neg) / total), 0)
+
+    series = [0.0] * length
+    series[window] = dx[:window].mean()
+    dx = dx.tolist()
+    for i in range(window + 1, length):
+        series[i] = ((series[i - 1] * (window - 1)) + dx[i - 1]) / float(window)
+    adx_values = np.concatenate((np.zeros(window - 1), series))
+
+    # ta skips the first and the last smoothed values for the directional indicators
+    plus, minus = np.zeros(n), np.zeros(n)
+    steps = np.arange(1, length - 1)
+    plus[steps + window] = di_pos[steps]
+    minus[steps + window] = di_neg[steps]
+    return adx_values, plus, minus
+
+
+def cci(high, low, close, window: int = 20, constant: float = 0.015) -> np.ndarray:
+    typical = (high + low + close) / 3.0
+    mean = rolling(typical, window)
+    mad = np.full(len(typical), np.nan)
+    if len(typical) >= window:
+        windows = sliding_window_view(typical, window)
+        mad[window - 1:] = np.mean(np.abs(windows - np.mean(windows, axis=1, keepdims=True)), axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (typical - mean) / (constant * mad)
+
+
+def williams_r(high, low, close, lbp: int = 14) -> np.ndarray:
+    highest = rolling(high, lbp, "max")
+    lowest = rolling(low, lbp, "min")
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -100 * (highest - close) / (highest - lowest)
+
+
+def psar(high, low, close, step: float = 0.02, max_step: float = 0.20) -> np.ndarray:
+    """Parabolic SAR, the loop of ta's PSARIndicator over Python floats."""
+    high, low = high.tolist(), low.tolist()
+    out = close.tolist()
+    if not out:
+        return np.array(out)
+
+    up_trend = True
+    acceleration = step
+    up_trend_high = high[0]
+    down_trend_low = low[0]
+
+    for i in range(2, len(out)):
+        reversal = False
+        max_high = high[i]
+        min_low = low[i]
+
+        if up_trend:
+            value = out[i - 1] + (acceleration * (up_trend_high - out[i - 1]))
+            if min_low < value:
+                reversal = True
+                value = up_trend_high
+                down_trend_low = min_low
+                acceleration = step
+            else:
+                if max_high > up_trend_high:
+                    up_trend_high = max_high
+                    acceleration = min(acceleration + step, max_step)
+                if low[i - 2] < value:
+                    value = low[i - 2]
+                elif low[i - 1] < value:
+                    value = low[i - 1]
+        else:
+            value = out[i - 1] - (acceleration * (out[i - 1] - down_trend_low))
+            if max_high > value:
+                reversal = True
+                value = down_trend_low
+                up_trend_high = max_high
+                acceleration = step
+            else:
+                if min_low < down_trend_low:
+                    down_trend_low = min_low
+                    acceleration = min(acceleration + step, max_step)
+                if high[i - 2] > value:
+                    value = high[i - 2]
+                elif high[i - 1] > value:
+                    value = high[i - 1]
+
+        out[i] = value
+        up_trend = up_trend != reversal
+
+    return np.array(out)
+
+
+def obv(close, volume) -> np.ndarray:
+    return np.cumsum(np.where(close < shift(close), -volume, volume))
+
+
+def force_index(close, volume, window: int = 13) -> np.ndarray:
+    return ema((close - shift(close)) * volume, window, min_periods=window)
+
+
+def donchian(high, low, window: int = 20):
+    """Upper and lower Donchian bands."""
+    return rolling(high, window, "max"), rolling(low, window, "min")
+
+
+def keltner(high, low, close, window: int = 20):
+    """Upper and lower bands of the original Keltner channel, averaged from the first bar."""
+    return (
+        expanding_head(((4 * high) - (2 * low) + close) / 3.0, window),
+        expanding_head(((-2 * high) + (4 * low) + close) / 3.0, window)
+    )
+
+
+def ultimate_oscillator(high, low, close, windows=(7, 14, 28), weights=(4.0, 2.0, 1.0), tr: np.ndarray = None) -> np.ndarray:
+    prev_close = shift(close)
+    tr = true_range(high, low, prev_close) if tr is None else tr
+    pressure = close - np.minimum(low, prev_close)
+    averages = [rolling(pressure, window, "sum") / rolling(tr, window, "sum") for window in windows]
+    return 100.0 * sum(weight * average for weight, average in zip(weights, averages)) / sum(weights)
+
+
+def vortex(high, low, close, window: int = 14):
+    """VI+ and VI-, the first previous close is filled with the mean close as in ta."""
+    tr = true_range(high, low, shift(close, fill=close.mean()))
+    trn = rolling(tr, window, "sum")
+    plus = rolling(np.abs(high - shift(low)), window, "sum") / trn
+    minus = rolling(np.abs(low - shift(high)), window, "sum") / trn
+    return plus, minus
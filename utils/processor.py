@@ -1,70 +1,223 @@
+import numpy as np
 import pandas as pd
 import ta
-from abc import ABC, abstractmethod
+from typing import Iterable
 
 import ta.trend
 
-def processor(df) -> pd.DataFrame:
-    data = df.copy()
+from . import indicators as kernels
 
+
+def _ma(window):
+    return lambda data: data['close'].rolling(window=window).mean()
+
+def _ema(window):
+    return lambda data: data["close"].ewm(span=window, adjust=False).mean()
+
+def _hlc(data):
+    return data['high'], data['low'], data['close']
+
+# Indicator columns in the order processor lays them out, each computed from
+# the OHLCV bars and the other columns it reads
+INDICATORS = {
     # Relative Strength Index
-    for i in [5, 14, 30]:
-        data[f'rsi_{i}'] = ta.momentum.rsi(data['close'], window=i)
+    'rsi_5': lambda data: ta.momentum.rsi(data['close'], window=5),
+    'rsi_14': lambda data: ta.momentum.rsi(data['close'], window=14),
+    'rsi_30': lambda data: ta.momentum.rsi(data['close'], window=30),
 
     # Bollinger Bands
-    data['upper_band'] = ta.volatility.bollinger_hband(data['close'], window=20)
-    data['lower_band'] = ta.volatility.bollinger_lband(data['close'], window=20)
-    data['ma20'] = ta.volatility.bollinger_mavg(data['close'], window=20)
+    'upper_band': lambda data: ta.volatility.bollinger_hband(data['close'], window=20),
+    'lower_band': lambda data: ta.volatility.bollinger_lband(data['close'], window=20),
 
     # Moving Average and Exponential Moving Average
-    for i in [5, 10, 15, 20, 25, 50]:
-        data[f'ma{i}'] = data['close'].rolling(window=i).mean()
-        data[f'ema{i}'] = data["close"].ewm(span=i, adjust=False).mean()
-    
+    'ma20': _ma(20),
+    'ma5': _ma(5), 'ema5': _ema(5),
+    'ma10': _ma(10), 'ema10': _ema(10),
+    'ma15': _ma(15), 'ema15': _ema(15),
+    'ema20': _ema(20),
+    'ma25': _ma(25), 'ema25': _ema(25),
+    'ma50': _ma(50), 'ema50': _ema(50),
+
     # MACD
-    data['macd'] = ta.trend.macd(data['close'])
-    data['macd_hist'] = ta.trend.macd_diff(data['close'])
+    'macd': lambda data: ta.trend.macd(data['close']),
+    'macd_hist': lambda data: ta.trend.macd_diff(data['close']),
 
     # VWAP
-    data['vwap'] = ta.volume.volume_weighted_average_price(data['high'], data['low'], data['close'], data['volume'], window=14)
-    
-    data['ppo'] = ta.momentum.ppo_hist(data['close'])
-    
-    data["tsi"] = ta.momentum.tsi(data['close'])
-    
-    data['roc'] = ta.momentum.roc(data['close'])
-    
-    data['atr'] = ta.volatility.average_true_range(data['high'], data['low'], data['close'])
-    
-    data["adx"] = ta.trend.adx(data['high'], data['low'], data['close'])
-    data['di_plus'] = ta.trend.adx_pos(data['high'], data['low'], data['close'])
-    data['di_minus'] = ta.trend.adx_neg(data['high'], data['low'], data['close'])
-    
-    data["cci"] = ta.trend.cci(data['high'], data['low'], data['close'])
-    
-    data["volume_ma5"] = data['volume'].rolling(window=5).mean()
-    data["volume_ma10"] = data['volume'].rolling(window=10).mean()
-    
-    data["stoch_k"] = ta.momentum.stochrsi_k(data['close'])
-    data["stoch_d"] = ta.momentum.stochrsi_d(data['close'])
-    
-    data["williams_r"] = ta.momentum.williams_r(data['high'], data['low'], data['close'])
-    
-    data["psar"] = ta.trend.PSARIndicator(data['high'], data['low'], data['close']).psar()
-    
-    data["obv"] = ta.volume.on_balance_volume(data['close'], data['volume'])
-    
-    data["donchian_hband"] = ta.volatility.donchian_channel_hband(data["high"], data["low"], data['close'], window=20)
-    data["donchian_lband"] = ta.volatility.donchian_channel_lband(data["high"], data["low"], data['close'], window=20)
-    
-    data["uo"] = ta.momentum.ultimate_oscillator(data['high'], data['low'], data['close'])
-    
-    data['force_index'] = ta.volume.force_index(data['close'], data['volume'])
-    
-    data["keltner_hband"] = ta.volatility.keltner_channel_hband(data["high"], data["low"], data['close'], window=20)
-    data["keltner_lband"] = ta.volatility.keltner_channel_lband(data["high"], data["low"], data['close'], window=20)
-    
-    data['vi_plus'] = ta.trend.vortex_indicator_pos(data['high'], data['low'], data['close'])
-    data['vi_minus'] = ta.trend.vortex_indicator_neg(data['high'], data['low'], data['close'])
-    
-    return data.dropna()
\ No newline at end of file
+    'vwap': lambda data: ta.volume.volume_weighted_average_price(*_hlc(data), data['volume'], window=14),
+
+    'ppo': lambda data: ta.momentum.ppo_hist(data['close']),
+    'tsi': lambda data: ta.momentum.tsi(data['close']),
+    'roc': lambda data: ta.momentum.roc(data['close']),
+    'atr': lambda data: ta.volatility.average_true_range(*_hlc(data)),
+
+    'adx': lambda data: ta.trend.adx(*_hlc(data)),
+    'di_plus': lambda data: ta.trend.adx_pos(*_hlc(data)),
+    'di_minus': lambda data: ta.trend.adx_neg(*_hlc(data)),
+
+    'cci': lambda data: ta.trend.cci(*_hlc(data)),
+
+    'volume_ma5': lambda data: data['volume'].rolling(window=5).mean(),
+    'volume_ma10': lambda data: data['volume'].rolling(window=10).mean(),
+
+    'stoch_k': lambda data: ta.momentum.stochrsi_k(data['close']),
+    'stoch_d': lambda data: ta.momentum.stochrsi_d(data['close']),
+
+    'williams_r': lambda data: ta.momentum.williams_r(*_hlc(data)),
+
+    'psar': lambda data: ta.trend.PSARIndicator(*_hlc(data)).psar(),
+
+    'obv': lambda data: ta.volume.on_balance_volume(data['close'], data['volume']),
+
+    'donchian_hband': lambda data: ta.volatility.donchian_channel_hband(*_hlc(data), window=20),
+    'donchian_lband': lambda data: ta.volatility.donchian_channel_lband(*_hlc(data), window=20),
+
+    'uo': lambda data: ta.momentum.ultimate_oscillator(*_hlc(data)),
+
+    'force_index': lambda data: ta.volume.force_index(data['close'], data['volume']),
+
+    'keltner_hband': lambda data: ta.volatility.keltner_channel_hband(*_hlc(data), window=20),
+    'keltner_lband': lambda data: ta.volatility.keltner_channel_lband(*_hlc(data), window=20),
+
+    'vi_plus': lambda data: ta.trend.vortex_indicator_pos(*_hlc(data)),
+    'vi_minus': lambda data: ta.trend.vortex_indicator_neg(*_hlc(data)),
+}
+
+
+def _array(column):
+    return lambda data: data[column].to_numpy(dtype=np.float64)
+
+def _hlc_arrays(data):
+    return data['_high'], data['_low'], data['_close']
+
+# The same columns from the NumPy kernels of utils.indicators. Entries starting
+# with an underscore are intermediates shared by several columns and never output
+NUMPY_INDICATORS = {
+    '_high': _array('high'), '_low': _array('low'), '_close': _array('close'), '_volume': _array('volume'),
+    '_prev_close': lambda data: kernels.shift(data['_close']),
+    '_true_range': lambda data: kernels.true_range(data['_high'], data['_low'], data['_prev_close']),
+
+    'rsi_5': lambda data: kernels.rsi(data['_close'], 5),
+    'rsi_14': lambda data: kernels.rsi(data['_close'], 14),
+    'rsi_30': lambda data: kernels.rsi(data['_close'], 30),
+
+    '_bollinger': lambda data: kernels.bollinger(data['_close'], 20),
+    'upper_band': lambda data: data['_bollinger'][0],
+    'lower_band': lambda data: data['_bollinger'][1],
+
+    'ma20': lambda data: kernels.rolling(data['_close'], 20),
+    'ma5': lambda data: kernels.rolling(data['_close'], 5), 'ema5': lambda data: kernels.ema(data['_close'], 5),
+    'ma10': lambda data: kernels.rolling(data['_close'], 10), 'ema10': lambda data: kernels.ema(data['_close'], 10),
+    'ma15': lambda data: kernels.rolling(data['_close'], 15), 'ema15': lambda data: kernels.ema(data['_close'], 15),
+    'ema20': lambda data: kernels.ema(data['_close'], 20),
+    'ma25': lambda data: kernels.rolling(data['_close'], 25), 'ema25': lambda data: kernels.ema(data['_close'], 25),
+    'ma50': lambda data: kernels.rolling(data['_close'], 50), 'ema50': lambda data: kernels.ema(data['_close'], 50),
+
+    '_macd': lambda data: kernels.macd(data['_close']),
+    'macd': lambda data: data['_macd'][0],
+    'macd_hist': lambda data: data['_macd'][1],
+
+    'vwap': lambda data: kernels.vwap(*_hlc_arrays(data), data['_volume'], window=14),
+
+    'ppo': lambda data: kernels.ppo_hist(data['_close']),
+    'tsi': lambda data: kernels.tsi(data['_close']),
+    'roc': lambda data: kernels.roc(data['_close']),
+    'atr': lambda data: kernels.atr(*_hlc_arrays(data), tr=data['_true_range']),
+
+    '_adx': lambda data: kernels.adx(*_hlc_arrays(data)),
+    'adx': lambda data: data['_adx'][0],
+    'di_plus': lambda data: data['_adx'][1],
+    'di_minus': lambda data: data['_adx'][2],
+
+    'cci': lambda data: kernels.cci(*_hlc_arrays(data)),
+
+    'volume_ma5': lambda data: kernels.rolling(data['_volume'], 5),
+    'volume_ma10': lambda data: kernels.rolling(data['_volume'], 10),
+
+    '_stochrsi': lambda data: kernels.stochrsi(data['_close'], rsi_values=data['rsi_14']),
+    'stoch_k': lambda data: data['_stochrsi'][0],
+    'stoch_d': lambda data: data['_stochrsi'][1],
+
+    'williams_r': lambda data: kernels.williams_r(*_hlc_arrays(data)),
+
+    'psar': lambda data: kernels.psar(*_hlc_arrays(data)),
+
+    'obv': lambda data: kernels.obv(data['_close'], data['_volume']),
+
+    '_donchian': lambda data: kernels.donchian(data['_high'], data['_low'], window=20),
+    'donchian_hband': lambda data: data['_donchian'][0],
+    'donchian_lband': lambda data: data['_donchian'][1],
+
+    'uo': lambda data: kernels.ultimate_oscillator(*_hlc_arrays(data), tr=data['_true_range']),
+
+    'force_index': lambda data: kernels.force_index(data['_close'], data['_volume']),
+
+    '_keltner': lambda data: kernels.keltner(*_hlc_arrays(data), window=20),
+    'keltner_hband': lambda data: data['_keltner'][0],
+    'keltner_lband': lambda data: data['_keltner'][1],
+
+    '_vortex': lambda data: kernels.vortex(*_hlc_arrays(data)),
+    'vi_plus': lambda data: data['_vortex'][0],
+    'vi_minus': lambda data: data['_vortex'][1],
+}
+
+# Indicator implementations selectable through the backend argument of processor
+BACKENDS = {
+    'ta': INDICATORS,
+    'numpy': NUMPY_INDICATORS,
+}
+
+
+class LazyBars:
+    """
+        OHLCV bars whose indicator columns are computed on first access.
+        Every column is computed once and shared by the columns that read it.
+    """
+    def __init__(self, df: pd.DataFrame, backend: str = 'ta'):
+        assert backend in BACKENDS, f"Unknown indicator backend {backend}, choose from {list(BACKENDS)}"
+        self.df = df
+        self.indicators = BACKENDS[backend]
+        self.columns = {column: df[column] for column in df.columns}
+
+    def __getitem__(self, column):
+        if column not in self.columns:
+            self.columns[column] = self.indicators[column](self)
+        return self.columns[column]
+
+    def frame(self, columns: Iterable[str]) -> pd.DataFrame:
+        """The OHLCV bars and `columns`, in the layout of processor."""
+        columns = set(columns)
+        for column in columns:
+            self[column]
+
+        layout = list(self.df.columns) + [column for column in INDICATORS if column in columns]
+        return pd.DataFrame({column: self.columns[column] for column in layout}, index=self.df.index)
+
+
+def _warmup(df, backend='ta', prefix=256) -> int:
+    """
+        Number of leading bars dropped by the full set of indicators.
+        Indicators only look back, so the bars of a prefix are enough to find it.
+    """
+    while True:
+        head = LazyBars(df.iloc[:prefix], backend).frame(INDICATORS).dropna()
+        if len(head) or prefix >= len(df):
+            break
+        prefix *= 2
+    return df.index.get_loc(head.index[0]) if len(head) else len(df)
+
+
+def processor(df, columns: Iterable[str] = None, backend: str = 'ta') -> pd.DataFrame:
+    """
+        Indicators of the OHLCV bars `df`, without the bars where they are undefined.
+        With `columns`, only those indicators and the ones they read are computed.
+        The warm-up bars are cut where the full set of indicators cuts them, later
+        bars are only dropped for missing values in the computed columns.
+        backend selects the ta library ('ta') or the kernels of utils.indicators ('numpy').
+    """
+    bars = LazyBars(df.copy(), backend)
+
+    if columns is None:
+        return bars.frame(INDICATORS).dropna()
+
+    data = bars.frame(columns)
+    return data.iloc[_warmup(df, backend):].dropna()
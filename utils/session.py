@@ -0,0 +1,139 @@
+from typing import Dict, Iterable, List
+import numpy as np
+import pandas as pd
+
+
+class SessionCalendar:
+    """
+        Trading session of the VN30 index futures, precomputed over a tick index.
+        - 09:00 - 09:15: opening auction (ATO), kept by the downloader
+        - 09:15 - 14:30: continuous trading used by the backtester
+        - 11:30 - 13:00: lunch break
+        - 14:29: positions are closed before the closing auction
+        - 14:30 - 14:45: closing auction (ATC)
+        - Contracts expire on the third Thursday of the month, or the trading day before it
+        Without a list of holidays, the weekdays without ticks between the first and
+        the last day of the index are taken as holidays, gaps in the data included.
+        Every mask is a boolean array aligned with the index and every day boundary
+        is an integer position in it, so per tick checks are array lookups.
+    """
+    PRE_OPEN = "09:00"
+    OPEN = "09:15"
+    LUNCH = ("11:30", "13:00")
+    CLOSE = "14:29"
+    END = "14:30"
+    ATC = ("14:30", "14:45")
+
+    def __init__(self, index: pd.DatetimeIndex, holidays: Iterable = None):
+        self.index = pd.DatetimeIndex(index)
+
+        # Time of day at microsecond resolution, as compared through datetime.time
+        days = self.index.normalize()
+        self.time_of_day = (self.index - days).values.view(np.int64) // 1000 * 1000
+
+        self.trading = self.between(self.PRE_OPEN, self.END)
+        self.in_session = self.between(self.OPEN, self.END)
+        self.after_close = self.time_of_day >= self._time(self.CLOSE)
+        self.lunch = (self.time_of_day >= self._time(self.LUNCH[0])) & (self.time_of_day < self._time(self.LUNCH[1]))
+        self.atc = self.between(*self.ATC)
+
+        # Day boundaries: ticks of day d are day_starts[d]:day_ends[d]
+        day_values = days.values.view(np.int64)
+        self.day_starts = np.flatnonzero(np.r_[True, day_values[1:] != day_values[:-1]]) if len(days) else np.empty(0, dtype=np.int64)
+        self.day_ends = np.r_[self.day_starts[1:], len(days)].astype(np.int64)
+        self.days = days[self.day_starts]
+        self.day_of_tick = np.repeat(np.arange(len(self.day_starts)), self.day_ends - self.day_starts)
+
+        if holidays is None:
+            holidays = self.untraded_days(self.days)
+        self.holidays = pd.DatetimeIndex(list(holidays)).normalize()
+        self.holiday = days.isin(self.holidays)
+        self.expiry = days.isin(self.expiry_days(self.days))
+
+    @staticmethod
+    def _time(value: str) -> int:
+        return pd.Timedelta(f"{value}:00").value
+
+    def between(self, start: str, end: str) -> np.ndarray:
+        """Mask of the ticks with start <= time of day <= end."""
+        return (self.time_of_day >= self._time(start)) & (self.time_of_day <= self._time(end))
+
+    def __len__(self) -> int:
+        return len(self.day_starts)
+
+    # Per tick and per day arrays, enough to rebuild the calendar of the same index
+    ARRAYS = [
+        "time_of_day", "trading", "in_session", "after_close", "lunch", "atc",
+        "holiday", "expiry", "day_starts", "day_ends", "day_of_tick"
+    ]
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.ARRAYS}
+
+    @classmethod
+    def from_arrays(cls, index: pd.DatetimeIndex, arrays: Dict[str, np.ndarray], holidays: Iterable = ()) -> "SessionCalendar":
+        """Calendar of `index` around the `arrays` of a calendar of the same index, without copies."""
+        calendar = object.__new__(cls)
+        calendar.index = index
+        calendar.holidays = pd.DatetimeIndex(list(holidays)).normalize()
+        for name in cls.ARRAYS:
+            setattr(calendar, name, arrays[name])
+        calendar.days = index[calendar.day_starts].normalize()
+        return calendar
+
+    def window(self, start: int, stop: int) -> "SessionCalendar":
+        """Calendar of the ticks start:stop, its masks are views of this calendar."""
+        calendar = object.__new__(SessionCalendar)
+        calendar.index = self.index[start:stop]
+        calendar.holidays = self.holidays
+        calendar.time_of_day = self.time_of_day[start:stop]
+        for name in ["trading", "in_session", "after_close", "lunch", "atc", "holiday", "expiry"]:
+            setattr(calendar, name, getattr(self, name)[start:stop])
+
+        # Days overlapping the window, cut to it
+        first = int(self.day_of_tick[start]) if stop > start else 0
+        last = int(self.day_of_tick[stop - 1]) + 1 if stop > start else 0
+        calendar.day_starts = np.maximum(self.day_starts[first:last] - start, 0)
+        calendar.day_ends = np.minimum(self.day_ends[first:last], stop) - start
+        calendar.days = self.days[first:last]
+        calendar.day_of_tick = self.day_of_tick[start:stop] - first
+        return calendar
+
+    def day_blocks(self, n_blocks: int) -> List[slice]:
+        """Split the ticks into at most n_blocks contiguous blocks of whole days."""
+        n_days = len(self)
+        if n_days == 0:
+            return []
+
+        bounds = np.unique(np.linspace(0, n_days, min(n_blocks, n_days) + 1).round().astype(int))
+        return [slice(int(self.day_starts[a]), int(self.day_ends[b - 1])) for a, b in zip(bounds[:-1], bounds[1:])]
+
+    @staticmethod
+    def untraded_days(days) -> pd.DatetimeIndex:
+        """Weekdays between the first and the last of the trading `days` that are not among them."""
+        days = pd.DatetimeIndex(days)
+        if len(days) == 0:
+            return pd.DatetimeIndex([])
+
+        weekdays = pd.bdate_range(days[0], days[-1])
+        return weekdays[~weekdays.isin(days)]
+
+    def expiry_days(self, days) -> pd.DatetimeIndex:
+        """Expiry day of the front month contract of every month spanned by `days`."""
+        days = pd.DatetimeIndex(days)
+        if len(days) == 0:
+            return pd.DatetimeIndex([])
+
+        months = pd.period_range(days.min(), days.max(), freq="M")
+        expiries = []
+        for month in months:
+            start = month.start_time
+            # Third Thursday of the month
+            thursday = start + pd.Timedelta(days=(3 - start.weekday()) % 7 + 14)
+
+            # Moved to the previous trading day on holidays
+            while thursday in self.holidays or thursday.weekday() >= 5:
+                thursday -= pd.Timedelta(days=1)
+            expiries.append(thursday)
+        return pd.DatetimeIndex(expiries)
@@ -0,0 +1,126 @@
+from multiprocessing import shared_memory, resource_tracker
+from typing import Dict
+import numpy as np
+import pandas as pd
+
+
+class SharedFrame:
+    """
+        Numeric DataFrame with a DatetimeIndex held in one shared memory block.
+        - The columns are stored as a single float64 (columns x rows) block
+          and the index as int64 epoch nanoseconds right after it
+        - `spec` is a small picklable description used by other processes to attach
+        - Attached frames are zero-copy read-only views of the block
+        The process that creates the block owns it and must unlink it.
+    """
+    def __init__(self, data: pd.DataFrame = None, spec: dict = None, forked: bool = True):
+        assert (data is None) != (spec is None), "Either data or spec must be provided"
+
+        if data is not None:
+            n, k = data.shape
+            self.spec = {"name": None, "rows": n, "columns": list(data.columns), "index_name": data.index.name}
+            self._shm = shared_memory.SharedMemory(create=True, size=max(8 * n * (k + 1), 1))
+            self.spec["name"] = self._shm.name
+            self.owner = True
+
+            values, index = self._views(writeable=True)
+            values[:] = data.to_numpy(dtype=np.float64).T
+            index[:] = data.index.values.astype("datetime64[ns]").view(np.int64)
+        else:
+            self.spec = spec
+            self._shm = shared_memory.SharedMemory(name=spec["name"])
+            self.owner = False
+
+            # A spawned process has its own resource tracker, which would unlink
+            # the block when the process exits, the creating process owns it
+            if not forked:
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+
+    def _views(self, writeable=False):
+        n, k = self.spec["rows"], len(self.spec["columns"])
+        values = np.ndarray((k, n), dtype=np.float64, buffer=self._shm.buf)
+        index = np.ndarray(n, dtype=np.int64, buffer=self._shm.buf, offset=8 * n * k)
+        values.flags.writeable = writeable
+        index.flags.writeable = writeable
+        return values, index
+
+    @classmethod
+    def attach(cls, spec: dict, forked: bool = True) -> "SharedFrame":
+        """Attach to the block of `spec`, `forked` tells if this process was forked from its creator."""
+        return cls(spec=spec, forked=forked)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Read-only DataFrame backed by the shared block."""
+        values, index = self._views()
+        index = pd.DatetimeIndex(index.view("datetime64[ns]"), name=self.spec["index_name"])
+        return pd.DataFrame(values.T, index=index, columns=self.spec["columns"], copy=False)
+
+    def close(self):
+        """Release the block, unlinking it in the owning process."""
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
+
+
+class SharedArrays:
+    """
+        Named NumPy arrays of any dtype held in one shared memory block.
+        - Every array starts on an 8-byte boundary of the block
+        - `spec` is a small picklable description used by other processes to attach,
+          `meta` carries small picklable values along with it
+        - Attached arrays are zero-copy read-only views of the block
+        The process that creates the block owns it and must unlink it.
+    """
+    def __init__(self, arrays: Dict[str, np.ndarray] = None, meta: dict = None, spec: dict = None, forked: bool = True):
+        assert (arrays is None) != (spec is None), "Either arrays or spec must be provided"
+
+        if arrays is not None:
+            layout, offset = [], 0
+            for name, array in arrays.items():
+                layout.append((name, array.dtype.str, array.shape, offset))
+                offset += -(-array.nbytes // 8) * 8
+
+            self.spec = {"name": None, "layout": layout, "meta": meta or {}}
+            self._shm = shared_memory.SharedMemory(create=True, size=max(offset, 1))
+            self.spec["name"] = self._shm.name
+            self.owner = True
+
+            for view, array in zip(self._views(writeable=True).values(), arrays.values()):
+                view[...] = array
+        else:
+            self.spec = spec
+            self._shm = shared_memory.SharedMemory(name=spec["name"])
+            self.owner = False
+
+            # As in SharedFrame, the creating process owns the block
+            if not forked:
+                resource_tracker.unregister(self._shm._name, "shared_memory")
+
+    def _views(self, writeable=False) -> Dict[str, np.ndarray]:
+        views = {}
+        for name, dtype, shape, offset in self.spec["layout"]:
+            view = np.ndarray(shape, dtype=np.dtype(dtype), buffer=self._shm.buf, offset=offset)
+            view.flags.writeable = writeable
+            views[name] = view
+        return views
+
+    @classmethod
+    def attach(cls, spec: dict, forked: bool = True) -> "SharedArrays":
+        """Attach to the block of `spec`, `forked` tells if this process was forked from its creator."""
+        return cls(spec=spec, forked=forked)
+
+    @property
+    def arrays(self) -> Dict[str, np.ndarray]:
+        """Read-only views of the arrays in the block."""
+        return self._views()
+
+    @property
+    def meta(self) -> dict:
+        return self.spec["meta"]
+
+    def close(self):
+        """Release the block, unlinking it in the owning process."""
+        self._shm.close()
+        if self.owner:
+            self._shm.unlink()
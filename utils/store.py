@@ -0,0 +1,182 @@
+from typing import Dict
+
+import numpy as np
+import pandas as pd
+
+from .archive import TickArchive, decode, encodable, encode, missing
+from .cache import fingerprint as _fingerprint
+from .session import SessionCalendar
+from .shared import SharedArrays
+
+
+class TickStore:
+    """
+        Immutable tick data shared by every backtest of a search.
+        - The columns (price, bid_price, ask_price, volume) are held once as read-only arrays
+          in the compact dtypes of the TickArchive: int32 ticks of 0.1 point and uint32 volume,
+          a column that is not exactly representable stays float64
+        - Columns are decoded to float64 only for the window of ticks a backtest reads
+        - The position of the next quote is computed once, so the bid/ask of a window
+          are backward filled without a filled copy of the columns
+        - The session calendar and the fingerprint of the ticks are computed once
+        - share() puts every array of the store in one shared memory block,
+          attach() rebuilds the store in another process around views of it
+        It can be passed wherever a tick DataFrame is read: it has the index,
+        the columns and the length of the frame it was built from.
+    """
+    COLUMNS = list(TickArchive.COLUMNS)
+    SCALE = TickArchive.SCALE
+
+    def __init__(self, data: pd.DataFrame = None, arrays: Dict[str, np.ndarray] = None,
+                 calendar: SessionCalendar = None, fingerprint: str = None, index_name: str = "datetime"):
+        """Built from the tick DataFrame `data`, or around the `arrays` of another store (see attach)."""
+        assert (data is None) != (arrays is None), "Either data or arrays must be provided"
+
+        if data is not None:
+            assert all(column in data.columns for column in self.COLUMNS), f"Data must have the columns {self.COLUMNS}"
+            arrays = self._arrays(data)
+            index_name = data.index.name
+
+        self.arrays = arrays
+        self.times = arrays["times"]
+
+        # Position of the next tick with a quote, len(self) when there is none
+        self._bid_sources = arrays["bid_sources"]
+        self._ask_sources = arrays["ask_sources"]
+
+        self.index = pd.DatetimeIndex(self.times.view("datetime64[ns]"), name=index_name)
+        self.calendar = calendar if calendar is not None else SessionCalendar(self.index)
+        self.fingerprint = fingerprint if fingerprint is not None else _fingerprint(self)
+
+    @classmethod
+    def _arrays(cls, data: pd.DataFrame) -> Dict[str, np.ndarray]:
+        arrays = {"times": cls._read_only(data.index.values.astype("datetime64[ns]", copy=False).view(np.int64))}
+        for column in cls.COLUMNS:
+            values = data[column].to_numpy(dtype=np.float64)
+            dtype = TickArchive.COLUMNS[column]
+            if encodable(values, dtype, cls.SCALE[column]):
+                values = encode(values, dtype, cls.SCALE[column])
+            arrays[column] = cls._read_only(values)
+
+        arrays["bid_sources"] = cls._sources(arrays["bid_price"])
+        arrays["ask_sources"] = cls._sources(arrays["ask_price"])
+        return arrays
+
+    @staticmethod
+    def _read_only(values: np.ndarray) -> np.ndarray:
+        """`values` when already read-only, a read-only copy otherwise."""
+        if not values.flags.writeable:
+            return values
+        values = np.array(values)
+        values.flags.writeable = False
+        return values
+
+    @staticmethod
+    def _present(stored: np.ndarray) -> np.ndarray:
+        if stored.dtype.kind == "f":
+            return ~np.isnan(stored)
+        return stored != missing(stored.dtype)
+
+    @classmethod
+    def _sources(cls, stored: np.ndarray) -> np.ndarray:
+        n = len(stored)
+        dtype = np.int32 if n < np.iinfo(np.int32).max else np.int64
+        positions = np.where(cls._present(stored), np.arange(n, dtype=dtype), dtype(n))
+        sources = np.minimum.accumulate(positions[::-1])[::-1] if n else positions
+        sources = np.ascontiguousarray(sources)
+        sources.flags.writeable = False
+        return sources
+
+    def share(self) -> SharedArrays:
+        """The arrays of the store and of its calendar in one shared memory block, see attach()."""
+        arrays = {**self.arrays, **{f"calendar.{name}": values for name, values in self.calendar.arrays.items()}}
+        return SharedArrays(arrays, meta={
+            "index_name": self.index.name,
+            "fingerprint": self.fingerprint,
+            "holidays": list(self.calendar.holidays)
+        })
+
+    @classmethod
+    def attach(cls, spec: dict, forked: bool = True) -> "TickStore":
+        """Store around the views of the block shared by TickStore.share(), in another process."""
+        shared = SharedArrays.attach(spec, forked=forked)
+        arrays = shared.arrays
+        meta = shared.meta
+
+        index = pd.DatetimeIndex(arrays["times"].view("datetime64[ns]"), name=meta["index_name"])
+        calendar = SessionCalendar.from_arrays(
+            index,
+            {name[len("calendar."):]: values for name, values in arrays.items() if name.startswith("calendar.")},
+            meta["holidays"]
+        )
+        store = cls(
+            arrays={name: values for name, values in arrays.items() if not name.startswith("calendar.")},
+            calendar=calendar,
+            fingerprint=meta["fingerprint"],
+            index_name=meta["index_name"]
+        )
+
+        # The views are only valid while the block stays attached
+        store._shared = shared
+        return store
+
+    def __len__(self) -> int:
+        return len(self.times)
+
+    @property
+    def columns(self) -> pd.Index:
+        return pd.Index(self.COLUMNS)
+
+    @property
+    def nbytes(self) -> int:
+        return sum(values.nbytes for values in self.arrays.values())
+
+    def column(self, name: str, span: slice = slice(None)) -> np.ndarray:
+        """float64 values of the ticks of `span` in column `name`, NaN where missing."""
+        return decode(self.arrays[name][span], self.SCALE[name])
+
+    def __getitem__(self, column) -> pd.Series:
+        return pd.Series(self.column(column), index=self.index, name=column)
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """Decoded float64 DataFrame of the ticks, built on every access."""
+        return pd.DataFrame({column: self.column(column) for column in self.COLUMNS}, index=self.index)
+
+    def bounds(self, name: str, span: slice = slice(None)):
+        """Lowest and highest value of column `name` over `span`, NaN without any, read from the stored column."""
+        stored = self.arrays[name][span]
+        if stored.dtype.kind == "f":
+            return np.fmin.reduce(stored, initial=np.nan), np.fmax.reduce(stored, initial=np.nan)
+
+        present = self._present(stored)
+        if not present.any():
+            return np.nan, np.nan
+        limits = np.iinfo(stored.dtype)
+        low = stored.min(where=present, initial=limits.max)
+        high = stored.max(where=present, initial=limits.min)
+        return low / self.SCALE[name], high / self.SCALE[name]
+
+    def span(self, start, end) -> slice:
+        """Positions of the ticks from `start` to `end`, both included."""
+        return slice(
+            int(np.searchsorted(self.times, pd.Timestamp(start).value, side="left")),
+            int(np.searchsorted(self.times, pd.Timestamp(end).value, side="right"))
+        )
+
+    def next_quotes(self, span: slice, n_ticks: int):
+        """
+            Bid/ask of the tick after each of the first n_ticks ticks of `span`,
+            backward filled within the span as if the span was the whole data.
+        """
+        start, stop = span.start + 1, span.start + n_ticks + 1
+
+        quotes = []
+        for name, sources in [("bid_price", self._bid_sources), ("ask_price", self._ask_sources)]:
+            # Quotes filled from ticks after the span are missing inside it
+            positions = sources[start:stop]
+            inside = positions < span.stop
+            values = decode(self.arrays[name][np.where(inside, positions, start)], self.SCALE[name])
+            values[~inside] = np.nan
+            quotes.append(values)
+        return tuple(quotes)
@@ -0,0 +1,628 @@
+"""
+    Streaming indicators: the columns of processor updated one bar at a time.
+    Every indicator keeps only the state it needs, update() costs O(1) per bar
+    (O(window) for the standard and mean absolute deviations), and returns NaN
+    until the indicator is defined. Values follow the definitions of the ta
+    library used by processor, so a stream and the batch pipeline agree on every
+    bar after the warm-up.
+"""
+from collections import deque
+import math
+from typing import Iterable, NamedTuple
+
+import numpy as np
+import pandas as pd
+
+from .processor import INDICATORS
+
+nan = math.nan
+
+
+class Bar(NamedTuple):
+    time: pd.Timestamp
+    open: float
+    high: float
+    low: float
+    close: float
+    volume: float
+
+
+class EMA:
+    """pandas ewm(adjust=False).mean() of the values pushed so far, NaN inputs are skipped."""
+    def __init__(self, span: float = None, alpha: float = None, min_periods: int = 0):
+        self.alpha = 2.0 / (span + 1.0) if alpha is None else alpha
+        self.factor = 1.0 - self.alpha
+        self.min_periods = max(min_periods, 1)
+        self.value = nan
+        self.weight = 1.0
+        self.nobs = 0
+
+    def update(self, value: float) -> float:
+        observed = value == value
+        self.nobs += observed
+        if self.value == self.value:
+            self.weight *= self.factor
+            if observed:
+                if self.value != value:
+                    self.value = (self.weight * self.value + self.alpha * value) / (self.weight + self.alpha)
+                self.weight = 1.0
+        elif observed:
+            self.value = value
+        return self.value if self.nobs >= self.min_periods else nan
+
+
+class Window:
+    """
+        Last `size` values with a running sum and NaN count.
+        - The sum is compensated on every add and remove, as pandas rolling windows do
+        - A window of one repeated value averages to that value exactly, so ties
+          between averages (ma5 == ma20 on a flat market) are kept, and the mean of
+          a window without negative values is never negative
+        - sum / mean are NaN until the window is full or while it holds a NaN
+        - partial_mean averages the values available, as a rolling mean with min_periods=0
+    """
+    def __init__(self, size: int):
+        self.size = size
+        self.values = deque(maxlen=size)
+        self.total = 0.0
+        self.compensation = [0.0, 0.0]
+        self.missing = 0
+        self.negative = 0
+        self.repeated = 0
+
+    def _add(self, value: float, slot: int):
+        y = value - self.compensation[slot]
+        t = self.total + y
+        self.compensation[slot] = t - self.total - y
+        self.total = t
+
+    def push(self, value: float):
+        if len(self.values) == self.size:
+            old = self.values[0]
+            if old == old:
+                self._add(-old, 1)
+                self.negative -= old < 0
+            else:
+                self.missing -= 1
+        self.repeated = self.repeated + 1 if self.values and value == self.values[-1] else 1
+        self.values.append(value)
+        if value == value:
+            self._add(value, 0)
+            self.negative += value < 0
+        else:
+            self.missing += 1
+
+    @property
+    def ready(self) -> bool:
+        return len(self.values) == self.size and not self.missing
+
+    def sum(self) -> float:
+        return self.total if self.ready else nan
+
+    def mean(self) -> float:
+        if not self.ready:
+            return nan
+        if self.repeated >= self.size:
+            return self.values[-1]
+        mean = self.total / self.size
+        return 0.0 if mean < 0 and not self.negative else mean
+
+    def partial_mean(self) -> float:
+        if self.repeated >= len(self.values):
+            return self.values[-1]
+        return self.total / len(self.values)
+
+    def std(self) -> float:
+        """Population standard deviation, two passes over the window."""
+        if not self.ready:
+            return nan
+        mean = self.total / self.size
+        return math.sqrt(sum((value - mean) ** 2 for value in self.values) / self.size)
+
+    def mad(self) -> float:
+        """Mean absolute deviation from the window mean."""
+        if not self.ready:
+            return nan
+        mean = self.total / self.size
+        return sum(abs(value - mean) for value in self.values) / self.size
+
+
+class Extremum:
+    """Rolling max (or min) over `size` values, a monotonic deque gives O(1) amortized updates."""
+    def __init__(self, size: int, maximum: bool = True):
+        self.size = size
+        self.sign = 1.0 if maximum else -1.0
+        self.candidates = deque()
+        self.count = 0
+        self.last_missing = -1
+
+    def update(self, value: float) -> float:
+        if value != value:
+            self.last_missing = self.count
+        else:
+            key = self.sign * value
+            while self.candidates and self.candidates[-1][1] <= key:
+                self.candidates.pop()
+            self.candidates.append((self.count, key, value))
+        self.count += 1
+
+        start = self.count - self.size
+        while self.candidates and self.candidates[0][0] < start:
+            self.candidates.popleft()
+        if start < 0 or self.last_missing >= start:
+            return nan
+        return self.candidates[0][2]
+
+
+class SMA:
+    def __init__(self, window: int, field: str = "close"):
+        self.field = field
+        self.window = Window(window)
+
+    def update(self, bar: Bar) -> float:
+        self.window.push(getattr(bar, self.field))
+        return self.window.mean()
+
+
+class CloseEMA:
+    def __init__(self, span: int):
+        self.ema = EMA(span)
+
+    def update(self, bar: Bar) -> float:
+        return self.ema.update(bar.close)
+
+
+class RSI:
+    def __init__(self, window: int = 14):
+        self.up = EMA(alpha=1 / window, min_periods=window)
+        self.down = EMA(alpha=1 / window, min_periods=window)
+        self.prev_close = nan
+
+    def update(self, bar: Bar) -> float:
+        return self.push(bar.close)
+
+    def push(self, close: float) -> float:
+        diff = close - self.prev_close
+        self.prev_close = close
+        up = self.up.update(diff if diff > 0 else 0.0)
+        down = self.down.update(-diff if diff < 0 else 0.0)
+        if down == 0:
+            return 100.0
+        return 100 - (100 / (1 + up / down)) if down == down else nan
+
+
+class Bollinger:
+    def __init__(self, window: int = 20, window_dev: int = 2):
+        self.window = Window(window)
+        self.window_dev = window_dev
+
+    def update(self, bar: Bar):
+        self.window.push(bar.close)
+        mean, std = self.window.mean(), self.window.std()
+        return mean + self.window_dev * std, mean - self.window_dev * std
+
+
+class MACD:
+    """MACD line and histogram, or with percent=True the PPO line and histogram."""
+    def __init__(self, window_slow: int = 26, window_fast: int = 12, window_sign: int = 9, percent: bool = False):
+        self.fast = EMA(window_fast, min_periods=window_fast)
+        self.slow = EMA(window_slow, min_periods=window_slow)
+        self.sign = EMA(window_sign, min_periods=window_sign)
+        self.percent = percent
+
+    def update(self, bar: Bar):
+        fast, slow = self.fast.update(bar.close), self.slow.update(bar.close)
+        line = ((fast - slow) / slow) * 100 if self.percent else fast - slow
+        return line, line - self.sign.update(line)
+
+
+class PPO(MACD):
+    def __init__(self, **kwargs):
+        super().__init__(percent=True, **kwargs)
+
+    def update(self, bar: Bar) -> float:
+        return super().update(bar)[1]
+
+
+class VWAP:
+    def __init__(self, window: int = 14):
+        self.pv = Window(window)
+        self.volume = Window(window)
+
+    def update(self, bar: Bar) -> float:
+        self.pv.push((bar.high + bar.low + bar.close) / 3.0 * bar.volume)
+        self.volume.push(bar.volume)
+        return self.pv.sum() / self.volume.sum() if self.volume.ready and self.volume.total else nan
+
+
+class TSI:
+    def __init__(self, window_slow: int = 25, window_fast: int = 13):
+        self.slow = EMA(window_slow, min_periods=window_slow)
+        self.fast = EMA(window_fast, min_periods=window_fast)
+        self.slow_abs = EMA(window_slow, min_periods=window_slow)
+        self.fast_abs = EMA(window_fast, min_periods=window_fast)
+        self.prev_close = nan
+
+    def update(self, bar: Bar) -> float:
+        diff = bar.close - self.prev_close
+        self.prev_close = bar.close
+        smoothed = self.fast.update(self.slow.update(diff))
+        smoothed_abs = self.fast_abs.update(self.slow_abs.update(abs(diff)))
+        return smoothed / smoothed_abs * 100 if smoothed_abs else nan
+
+
+class ROC:
+    def __init__(self, window: int = 12):
+        self.closes = deque(maxlen=window + 1)
+
+    def update(self, bar: Bar) -> float:
+        self.closes.append(bar.close)
+        if len(self.closes) < self.closes.maxlen or not self.closes[0]:
+            return nan
+        return ((bar.close - self.closes[0]) / self.closes[0]) * 100
+
+
+def _true_range(bar: Bar, prev_close: float) -> float:
+    if prev_close != prev_close:
+        return bar.high - bar.low
+    return max(bar.high - bar.low, abs(bar.high - prev_close), abs(bar.low - prev_close))
+
+
+class ATR:
+    """Wilder average of the true range, seeded with the mean of the first window."""
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.seed = []
+        self.value = nan
+        self.prev_close = nan
+
+    def update(self, bar: Bar) -> float:
+        tr = _true_range(bar, self.prev_close)
+        self.prev_close = bar.close
+        if len(self.seed) < self.window:
+            self.seed.append(tr)
+            if len(self.seed) == self.window:
+                self.value = sum(self.seed) / self.window
+            return self.value
+        self.value = (self.value * (self.window - 1) + tr) / float(self.window)
+        return self.value
+
+
+class ADX:
+    """
+        ADX, +DI and -DI as in ta: Wilder sums of the range and the directional
+        movements from the second bar, +DI/-DI from window + 1 bars, ADX seeded
+        with the mean of the first `window` directional indices.
+    """
+    def __init__(self, window: int = 14):
+        self.window = window
+        self.count = 0
+        self.prev = None
+        self.sums = [0.0, 0.0, 0.0]
+        self.dx = []
+        self.adx = nan
+
+    def update(self, bar: Bar):
+        prev, self.prev = self.prev, bar
+        self.count += 1
+        if prev is None:
+            return nan, nan, nan
+
+        up, down = bar.high - prev.high, prev.low - bar.low
+        moves = (
+            max(bar.high, prev.close) - min(bar.low, prev.close),
+            up if up > down and up > 0 else 0.0,
+            down if down > up and down > 0 else 0.0
+        )
+        w = self.window
+        steps = self.count - 1
+        if steps <= w:
+            self.sums = [total + move for total, move in zip(self.sums, moves)]
+        else:
+            self.sums = [total - (total / float(w)) + move for total, move in zip(self.sums, moves)]
+        if steps < w:
+            return nan, nan, nan
+
+        trs, dip, din = self.sums
+        di_plus = 100 * (dip / trs) if trs != 0 else 0
+        di_minus = 100 * (din / trs) if trs != 0 else 0
+        dx = 100 * abs((di_plus - di_minus) / (di_plus + di_minus)) if di_plus + di_minus != 0 else 0
+
+        if len(self.dx) < w:
+            self.dx.append(dx)
+            if len(self.dx) == w:
+                self.adx = sum(self.dx) / w
+        else:
+            self.adx = ((self.adx * (w - 1)) + dx) / float(w)
+
+        if steps == w:
+            return self.adx, nan, nan
+        return self.adx, di_plus, di_minus
+
+
+class CCI:
+    def __init__(self, window: int = 20, constant: float = 0.015):
+        self.window = Window(window)
+        self.constant = constant
+
+    def update(self, bar: Bar) -> float:
+        typical = (bar.high + bar.low + bar.close) / 3.0
+        self.window.push(typical)
+        mad = self.window.mad()
+        return (typical - self.window.mean()) / (self.constant * mad) if mad else nan
+
+
+class StochRSI:
+    def __init__(self, window: int = 14, smooth1: int = 3, smooth2: int = 3):
+        self.rsi = RSI(window)
+        self.lowest = Extremum(window, maximum=False)
+        self.highest = Extremum(window, maximum=True)
+        self.k = Window(smooth1)
+        self.d = Window(smooth2)
+
+    def update(self, bar: Bar):
+        rsi = self.rsi.push(bar.close)
+        lowest, highest = self.lowest.update(rsi), self.highest.update(rsi)
+        self.k.push((rsi - lowest) / (highest - lowest) if highest != lowest else nan)
+        k = self.k.mean()
+        self.d.push(k)
+        return k, self.d.mean()
+
+
+class WilliamsR:
+    def __init__(self, lbp: int = 14):
+        self.highest = Extremum(lbp, maximum=True)
+        self.lowest = Extremum(lbp, maximum=False)
+
+    def update(self, bar: Bar) -> float:
+        highest, lowest = self.highest.update(bar.high), self.lowest.update(bar.low)
+        return -100 * (highest - bar.close) / (highest - lowest) if highest != lowest else nan
+
+
+class PSAR:
+    """Parabolic SAR, the state machine of ta's PSARIndicator."""
+    def __init__(self, step: float = 0.02, max_step: float = 0.20):
+        self.step = step
+        self.max_step = max_step
+        self.count = 0
+        self.up_trend = True
+        self.acceleration = step
+        self.value = nan
+        self.highs = deque(maxlen=2)
+        self.lows = deque(maxlen=2)
+
+    def update(self, bar: Bar) -> float:
+        self.count += 1
+        if self.count == 1:
+            self.up_trend_high, self.down_trend_low = bar.high, bar.low
+        if self.count <= 2:
+            self.value = bar.close
+            self.highs.append(bar.high)
+            self.lows.append(bar.low)
+            return self.value
+
+        reversal = False
+        if self.up_trend:
+            value = self.value + (self.acceleration * (self.up_trend_high - self.value))
+            if bar.low < value:
+                reversal = True
+                value = self.up_trend_high
+                self.down_trend_low = bar.low
+                self.acceleration = self.step
+            else:
+                if bar.high > self.up_trend_high:
+                    self.up_trend_high = bar.high
+                    self.acceleration = min(self.acceleration + self.step, self.max_step)
+                if self.lows[0] < value:
+                    value = self.lows[0]
+                elif self.lows[1] < value:
+                    value = self.lows[1]
+        else:
+            value = self.value - (self.acceleration * (self.value - self.down_trend_low))
+            if bar.high > value:
+                reversal = True
+                value = self.down_trend_low
+                self.up_trend_high = bar.high
+                self.acceleration = self.step
+            else:
+                if bar.low < self.down_trend_low:
+                    self.down_trend_low = bar.low
+                    self.acceleration = min(self.acceleration + self.step, self.max_step)
+                if self.highs[0] > value:
+                    value = self.highs[0]
+                elif self.highs[1] > value:
+                    value = self.highs[1]
+
+        self.value = value
+        self.up_trend = self.up_trend != reversal
+        self.highs.append(bar.high)
+        self.lows.append(bar.low)
+        return self.value
+
+
+class OBV:
+    def __init__(self):
+        self.value = 0.0
+        self.prev_close = nan
+
+    def update(self, bar: Bar) -> float:
+        self.value += -bar.volume if bar.close < self.prev_close else bar.volume
+        self.prev_close = bar.close
+        return self.value
+
+
+class ForceIndex:
+    def __init__(self, window: int = 13):
+        self.ema = EMA(window, min_periods=window)
+        self.prev_close = nan
+
+    def update(self, bar: Bar) -> float:
+        force = (bar.close - self.prev_close) * bar.volume
+        self.prev_close = bar.close
+        return self.ema.update(force)
+
+
+class Donchian:
+    def __init__(self, window: int = 20):
+        self.highest = Extremum(window, maximum=True)
+        self.lowest = Extremum(window, maximum=False)
+
+    def update(self, bar: Bar):
+        return self.highest.update(bar.high), self.lowest.update(bar.low)
+
+
+class Keltner:
+    """Bands of the original Keltner channel, averaged from the first bar."""
+    def __init__(self, window: int = 20):
+        self.high = Window(window)
+        self.low = Window(window)
+
+    def update(self, bar: Bar):
+        self.high.push(((4 * bar.high) - (2 * bar.low) + bar.close) / 3.0)
+        self.low.push(((-2 * bar.high) + (4 * bar.low) + bar.close) / 3.0)
+        return self.high.partial_mean(), self.low.partial_mean()
+
+
+class UltimateOscillator:
+    def __init__(self, windows=(7, 14, 28), weights=(4.0, 2.0, 1.0)):
+        self.pressure = [Window(window) for window in windows]
+        self.ranges = [Window(window) for window in windows]
+        self.weights = weights
+        self.prev_close = nan
+
+    def update(self, bar: Bar) -> float:
+        prev_close, self.prev_close = self.prev_close, bar.close
+        tr = _true_range(bar, prev_close)
+        pressure = bar.close - min(bar.low, prev_close) if prev_close == prev_close else nan
+        for window in self.pressure:
+            window.push(pressure)
+        for window in self.ranges:
+            window.push(tr)
+        if not all(window.ready and window.total for window in self.ranges):
+            return nan
+        averages = [p.sum() / r.sum() for p, r in zip(self.pressure, self.ranges)]
+        return 100.0 * sum(weight * average for weight, average in zip(self.weights, averages)) / sum(self.weights)
+
+
+class Vortex:
+    def __init__(self, window: int = 14):
+        self.ranges = Window(window)
+        self.plus = Window(window)
+        self.minus = Window(window)
+        self.prev = None
+
+    def update(self, bar: Bar):
+        prev, self.prev = self.prev, bar
+        self.ranges.push(_true_range(bar, prev.close if prev else nan))
+        self.plus.push(abs(bar.high - prev.low) if prev else nan)
+        self.minus.push(abs(bar.low - prev.high) if prev else nan)
+        trn = self.ranges.sum()
+        if not trn:
+            return nan, nan
+        return self.plus.sum() / trn, self.minus.sum() / trn
+
+
+# Streams of the columns of processor, each updated once per bar
+STREAMS = [
+    (('rsi_5',), lambda: RSI(5)),
+    (('rsi_14',), lambda: RSI(14)),
+    (('rsi_30',), lambda: RSI(30)),
+    (('upper_band', 'lower_band'), lambda: Bollinger(20)),
+    *[((f'ma{window}',), lambda window=window: SMA(window)) for window in (5, 10, 15, 20, 25, 50)],
+    *[((f'ema{window}',), lambda window=window: CloseEMA(window)) for window in (5, 10, 15, 20, 25, 50)],
+    (('macd', 'macd_hist'), MACD),
+    (('vwap',), VWAP),
+    (('ppo',), PPO),
+    (('tsi',), TSI),
+    (('roc',), ROC),
+    (('atr',), ATR),
+    (('adx', 'di_plus', 'di_minus'), ADX),
+    (('cci',), CCI),
+    (('volume_ma5',), lambda: SMA(5, "volume")),
+    (('volume_ma10',), lambda: SMA(10, "volume")),
+    (('stoch_k', 'stoch_d'), StochRSI),
+    (('williams_r',), WilliamsR),
+    (('psar',), PSAR),
+    (('obv',), OBV),
+    (('donchian_hband', 'donchian_lband'), Donchian),
+    (('uo',), UltimateOscillator),
+    (('force_index',), ForceIndex),
+    (('keltner_hband', 'keltner_lband'), Keltner),
+    (('vi_plus', 'vi_minus'), Vortex),
+]
+
+
+class RingBuffer:
+    """Fixed number of the latest rows of float64 columns, with their times."""
+    def __init__(self, columns: Iterable[str], size: int = 20):
+        self.columns = list(columns)
+        self.size = size
+        self.values = np.full((size, len(self.columns)), np.nan)
+        self.times = np.zeros(size, dtype="datetime64[ns]")
+        self.count = 0
+
+    def __len__(self) -> int:
+        return min(self.count, self.size)
+
+    def append(self, time, row):
+        slot = self.count % self.size
+        self.values[slot] = row
+        self.times[slot] = np.datetime64(pd.Timestamp(time), "ns")
+        self.count += 1
+
+    def last(self) -> np.ndarray:
+        """Latest row."""
+        return self.values[(self.count - 1) % self.size]
+
+    def frame(self) -> pd.DataFrame:
+        """Rows from the oldest to the latest."""
+        order = (np.arange(len(self)) + self.count - len(self)) % self.size
+        return pd.DataFrame(self.values[order], index=pd.DatetimeIndex(self.times[order]), columns=self.columns)
+
+
+class StreamingProcessor:
+    """
+        Incremental counterpart of processor.
+        - update() takes one OHLCV bar and advances every selected indicator
+        - Bars on which a selected column is still undefined are left out, as processor drops them
+        - frame() returns the last `window` bars in the layout of processor,
+          the DataFrame the strategy functions read
+    """
+    def __init__(self, columns: Iterable[str] = None, window: int = 20):
+        selected = set(INDICATORS) if columns is None else set(columns)
+        self.streams = [(names, factory()) for names, factory in STREAMS if selected & set(names)]
+
+        computed = {name for names, _ in self.streams for name in names}
+        self.columns = ['open', 'high', 'low', 'close', 'volume'] + [column for column in INDICATORS if column in computed]
+        self._positions = [self.columns.index(name) for names, _ in self.streams for name in names]
+        self.buffer = RingBuffer(self.columns, window)
+
+    def update(self, time, open: float, high: float, low: float, close: float, volume: float) -> bool:
+        """Advance the indicators by one bar, True when the bar entered the window."""
+        bar = Bar(time, float(open), float(high), float(low), float(close), float(volume))
+
+        values = []
+        for names, stream in self.streams:
+            value = stream.update(bar)
+            values.extend(value if len(names) > 1 else (value,))
+
+        row = np.empty(len(self.columns))
+        row[:5] = bar[1:]
+        row[self._positions] = values
+        if np.isnan(row).any():
+            return False
+
+        self.buffer.append(time, row)
+        return True
+
+    def update_frame(self, bars: pd.DataFrame):
+        """Feed every bar of an OHLCV DataFrame."""
+        for time, open, high, low, close, volume in bars[['open', 'high', 'low', 'close', 'volume']].itertuples():
+            self.update(time, open, high, low, close, volume)
+
+    @property
+    def ready(self) -> bool:
+        return len(self.buffer) > 0
+
+    def frame(self) -> pd.DataFrame:
+        return self.buffer.frame()
@@ -1,6 +1,8 @@
 import plotly.graph_objects as go
 import pandas as pd
 
+from .cache import bar_pyramid
+
 def highlight_max_second_max(s):
     is_max = s == s.max()
     is_second_max = s == s.nlargest(2).iloc[-1]  # Get the second largest value
@@ -34,12 +36,7 @@ def plot_price_and_signals(data: pd.DataFrame, history: pd.DataFrame) -> None:
     close['close_time'] = pd.to_datetime(close['close_time'])
 
     # Create a DataFrame for candlestick plotting
-    candlestick_data = data.resample('5min').agg({
-        'price': 'ohlc',
-        'volume': 'sum'
-    })
-
-    candlestick_data.columns = candlestick_data.columns.droplevel(0)
+    candlestick_data = bar_pyramid(data).bars(5)
 
     # Create the candlestick figure
     fig = go.Figure(data=[go.Candlestick(x=candlestick_data.index,